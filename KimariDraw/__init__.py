@@ -1,4 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+__init__.py
+Library API of KimariDraw: build spectra from TOML files, configs or NumPy arrays and render them to memory or files.
 
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
 
+@author:
+Kimariyb (kimariyb@163.com)
 
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
 
+@Data:
+2023-09-01
+"""
+from KimariDraw.kimaridraw import Spectrum, __version__, create_job, job_from_config, render
+from KimariDraw.grid import Grid
+
+__all__ = ["Spectrum", "Grid", "create_job", "job_from_config", "render", "__version__"]
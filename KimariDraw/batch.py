@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+batch.py
+Headless batch rendering of many TOML jobs, i.e. the `kimaridraw render` subcommand.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import argparse
+import glob
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from KimariDraw import cache, naming, profiling
+from KimariDraw.kimaridraw import job_from_config, load_config, validate
+
+
+def expand_inputs(patterns):
+    """
+    将命令行中输入的 toml 文件、通配符以及文件夹展开为 toml 文件列表
+
+    Notes:
+        1. 如果输入的是文件夹，则取该文件夹下所有的 toml 文件
+        2. 如果输入的是通配符，例如 jobs/*.toml，则按照通配符匹配
+        3. 重复的文件只会保留第一次出现的那一个
+
+    Args:
+        patterns(list[str]): 命令行中输入的文件、通配符或文件夹
+
+    Returns:
+        files(list[str]): 展开后的 toml 文件列表
+    """
+    files = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            # 文件夹，取其中所有的 toml 文件
+            matches = sorted(glob.glob(os.path.join(pattern, "*.toml")))
+        elif glob.has_magic(pattern):
+            # 通配符，支持 ** 递归匹配
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern]
+
+        for match in matches:
+            key = os.path.abspath(match)
+            if key not in seen:
+                seen.add(key)
+                files.append(match)
+
+    return files
+
+
+def render_job(toml_file, save_dir=None, overwrite=None, variants=None):
+    """
+    根据一个 toml 文件创建 Spectrum 对象并保存光谱，不需要任何交互。toml 文件中有 [grid] 表时保存多子图的图片，
+    有 [sweep] 表时保存参数扫描的每一种组合
+
+    Args:
+        toml_file(str): toml 文件路径
+        save_dir(str): 保存光谱的文件夹，默认为 None，即当前文件夹
+        overwrite(bool): 是否覆盖已有的同名文件，默认为 None，即使用 toml 文件中的设置
+        variants(list[int]): 参数扫描中需要绘制的组合的下标，默认为 None，即全部的组合
+
+    Returns:
+        save_name(str or list[str]): 保存的光谱文件路径，保存了多个格式或者多个组合时为列表
+    """
+    toml_data = load_config(toml_file)
+    current_folder, name = os.path.dirname(os.path.abspath(toml_file)), Path(toml_file).stem
+    if 'sweep' in toml_data:
+        from KimariDraw.sweep import render_variants
+
+        return render_variants(toml_data, current_folder, name=name, indices=variants, save_dir=save_dir,
+                               overwrite=overwrite)
+
+    spectrum = job_from_config(toml_data, current_folder, name=name)
+    if overwrite is not None:
+        spectrum.overwrite = overwrite
+    try:
+        return spectrum.draw_spectrum(save_dir=save_dir, verbose=False)
+    finally:
+        # 关闭保留的图片，避免批量绘制时占用内存
+        spectrum.close()
+
+
+def _timed_job(toml_file, save_dir, overwrite=None, variants=None, label=None, ledger=None):
+    # 在子进程或者线程中执行一个任务，并记录耗时。开启性能记录时同时返回每个阶段的记录
+    # ledger 为这个任务上一次绘制分配的文件路径，同时返回这一次的 Ledger
+    start = time.perf_counter()
+    with profiling.job(label or toml_file) as record, naming.reuse(ledger) as used:
+        save_name = render_job(toml_file, save_dir, overwrite, variants)
+    return save_name, time.perf_counter() - start, record, used
+
+
+def _task_key(toml_file, variants):
+    # 任务在 ledgers 中的键
+    return os.path.abspath(toml_file), None if variants is None else tuple(variants)
+
+
+def _tasks(files):
+    # 每个 toml 文件为一个任务，参数扫描按照数据分为多组时每一组为一个任务。返回 (toml 文件, 组合的下标, 名称) 的列表，
+    # 以及 [sweep] 表无效的文件和对应的异常
+    import toml
+
+    from KimariDraw.sweep import file_groups
+
+    tasks, invalid = [], []
+    for toml_file in files:
+        try:
+            groups = file_groups(toml_file)
+        except (toml.TomlDecodeError, OSError):
+            # 无法读取或解析的文件作为一个任务，错误在绘制时报告
+            groups = None
+        except ValueError as e:
+            # [sweep] 表无效，不需要绘制，直接报告
+            invalid.append((toml_file, e))
+            continue
+        if groups is None or len(groups) == 1:
+            tasks.append((toml_file, None, toml_file))
+        else:
+            tasks.extend((toml_file, group, f"{toml_file} (group {i} of {len(groups)})")
+                         for i, group in enumerate(groups, start=1))
+    return tasks, invalid
+
+
+def _names(save_name):
+    # 保存了多个格式时，将文件路径用逗号连接
+    return save_name if isinstance(save_name, str) else ", ".join(save_name)
+
+
+def render_batch(files, workers=None, save_dir=None, report=None, threads=False, executor=None, overwrite=None,
+                 ledgers=None):
+    """
+    使用进程池或者线程池批量绘制光谱，每个 toml 文件为一个任务
+
+    Notes:
+        1. 进程池中每个进程都需要导入 proplot 并加载字体，适合任务较少、每个任务的绘制都很耗时的情况
+        2. 线程池中的任务共用一个进程中已经导入的模块以及字体缓存，读取、解析以及展宽数据可以同时进行，
+           绘制以及保存图片由 style_context 中的锁依次进行，适合大量的小任务
+        3. 使用线程池并开启性能记录时，tracemalloc 由整个批次开启一次，每个任务的内存峰值包含同时运行的其它任务
+        4. 包含 [sweep] 表的 toml 文件按照影响数据的参数分组，每一组为一个任务，同一个文件的不同组也可以同时绘制
+
+    Args:
+        files(list[str]): toml 文件列表
+        workers(int): 进程池的进程数或者线程池的线程数，默认为 None，即 CPU 的核数。当 workers 为 1 时，直接在当前进程中绘制
+        save_dir(str): 保存光谱的文件夹，默认为 None，即当前文件夹
+        report(profiling.Report): 收集每个任务的性能记录，默认为 None，即不收集
+        threads(bool): 是否使用线程池代替进程池，默认为 False
+        executor(concurrent.futures.Executor): 已经创建的进程池或者线程池，例如监视模式中多次绘制共用的进程池，
+            默认为 None，即创建一个新的进程池并在绘制完成后关闭
+        overwrite(bool): 是否覆盖已有的同名文件，默认为 None，即使用 toml 文件中的设置
+        ledgers(dict): 每个任务上一次绘制分配的文件路径，默认为 None，即不记录。传入时任务直接覆盖上一次保存的文件，
+            并将这一次分配的路径写回其中，用于监视模式的重新绘制
+
+    Returns:
+        failed(list[tuple[str, Exception]]): 绘制失败的 toml 文件以及对应的异常，参数扫描的每一组各占一项
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    tasks, failed = _tasks(files)
+    for toml_file, e in failed:
+        print(f"[FAILED] {toml_file}: {e}")
+
+    # 只有一个进程时，没有必要启动进程池
+    if executor is None and (workers == 1 or len(tasks) == 1):
+        for toml_file, variants, label in tasks:
+            key = _task_key(toml_file, variants)
+            try:
+                save_name, elapsed, record, ledger = _timed_job(toml_file, save_dir, overwrite, variants, label,
+                                                                None if ledgers is None else ledgers.get(key))
+            except Exception as e:
+                failed.append((toml_file, e))
+                print(f"[FAILED] {label}: {e}")
+            else:
+                print(f"[OK] {label} -> {_names(save_name)} ({elapsed:.2f} s)")
+                if ledgers is not None:
+                    ledgers[key] = ledger
+                if report is not None:
+                    report.add(record)
+        return failed
+
+    import tracemalloc
+
+    # 线程共用同一个 tracemalloc，由整个批次开启，避免一个任务结束时关闭其它任务的内存统计
+    tracing = threads and report is not None and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+
+    pool = executor
+    if pool is None:
+        pool = (ThreadPoolExecutor if threads else ProcessPoolExecutor)(max_workers=workers)
+    try:
+        futures = {}
+        for toml_file, variants, label in tasks:
+            key = _task_key(toml_file, variants)
+            future = pool.submit(_timed_job, toml_file, save_dir, overwrite, variants, label,
+                                 None if ledgers is None else ledgers.get(key))
+            futures[future] = (toml_file, label, key)
+        for future in as_completed(futures):
+            toml_file, label, key = futures[future]
+            try:
+                save_name, elapsed, record, ledger = future.result()
+            except Exception as e:
+                failed.append((toml_file, e))
+                print(f"[FAILED] {label}: {e}")
+            else:
+                print(f"[OK] {label} -> {_names(save_name)} ({elapsed:.2f} s)")
+                if ledgers is not None:
+                    ledgers[key] = ledger
+                if report is not None:
+                    report.add(record)
+    finally:
+        # 传入的进程池由调用者关闭
+        if executor is None:
+            pool.shutdown()
+        if tracing:
+            tracemalloc.stop()
+
+    return failed
+
+
+def add_profile_arguments(parser):
+    """
+    为 render 以及 serve 子命令添加性能记录的命令行参数
+
+    Args:
+        parser(argparse.ArgumentParser): 子命令的参数解析器
+    """
+    parser.add_argument('--profile', action='store_true',
+                        help='Record the wall time and peak memory of every stage of every job and print a summary, '
+                             'same as setting KIMARIDRAW_PROFILE=1')
+    parser.add_argument('--profile-jsonl', default=None, metavar='FILE',
+                        help='Append the profile of every job to this JSON lines file, implies --profile')
+    parser.add_argument('--profile-dir', default=None, metavar='DIR',
+                        help='Save a cProfile dump of every job to this folder, implies --profile')
+
+
+def profile_report(args):
+    """
+    根据命令行参数以及环境变量开启性能记录
+
+    Args:
+        args(argparse.Namespace): 包含 add_profile_arguments 添加的参数
+
+    Returns:
+        report(profiling.Report): 收集性能记录的对象，没有开启性能记录时为 None
+    """
+    if args.profile or args.profile_jsonl is not None or args.profile_dir is not None:
+        profiling.set_enabled(True, jsonl=args.profile_jsonl, cprofile_dir=args.profile_dir)
+    if not profiling.is_enabled():
+        return None
+    return profiling.Report(profiling.jsonl_path())
+
+
+def render_main(argv):
+    """
+    kimaridraw render 子命令的入口
+
+    Args:
+        argv(list[str]): render 之后的命令行参数
+
+    Returns:
+        exit_code(int): 全部成功返回 0，存在失败的任务返回 1，输入有误返回 2
+    """
+    parser = argparse.ArgumentParser(prog='KimariDraw render',
+                                     description='Render spectra of many TOML files without any interaction.')
+    parser.add_argument('inputs', nargs='+', help='TOML files, glob patterns or folders containing TOML files')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Number of worker processes (or threads with --threads), default is the number of CPUs')
+    parser.add_argument('--threads', action='store_true',
+                        help='Render in a thread pool inside one process, sharing the imported libraries and font cache')
+    parser.add_argument('--output-dir', '-o', default=None,
+                        help='Folder to save the spectra, default is the current folder')
+    parser.add_argument('--no-cache', action='store_true', help='Do not use the cache of parsed spectral data')
+    parser.add_argument('--watch', '-w', action='store_true',
+                        help='Keep running and re-render the jobs whose TOML or data files change')
+    parser.add_argument('--poll', action='store_true',
+                        help='Watch by polling file times instead of inotify, e.g. on network file systems')
+    parser.add_argument('--debounce', type=float, default=None, metavar='SECONDS',
+                        help='Wait this long after a change for further writes before re-rendering, default is 0.3')
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # 通过环境变量关闭缓存，进程池中的子进程也会继承这个设置
+    if args.no_cache:
+        cache.set_enabled(False)
+    # 同样通过环境变量开启性能记录
+    report = profile_report(args)
+
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be a positive integer")
+    if args.debounce is not None and args.debounce < 0:
+        parser.error("--debounce must not be negative")
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("Error: No TOML file matched the inputs.")
+        return 2
+
+    # 在开始绘制之前检查全部的输入，避免绘制到一半才发现错误
+    invalid = False
+    for toml_file in files:
+        try:
+            validate(toml_file)
+        except (ValueError, FileNotFoundError) as e:
+            invalid = True
+            print(f"{toml_file}: {str(e).strip()}")
+    if invalid:
+        return 2
+
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    if args.watch:
+        from KimariDraw import watch
+
+        debounce = watch.DEBOUNCE if args.debounce is None else args.debounce
+        exit_code = watch.watch(args.inputs, workers=args.jobs, save_dir=args.output_dir, threads=args.threads,
+                                polling=args.poll, debounce=debounce, report=report)
+        if report is not None:
+            print(f"\n{report.summary()}")
+        return exit_code
+
+    failed = render_batch(files, workers=args.jobs, save_dir=args.output_dir, report=report, threads=args.threads)
+    # 参数扫描的多个组失败时只计一次
+    failed_files = {os.path.abspath(toml_file) for toml_file, _ in failed}
+    print(f"\nRendered {len(files) - len(failed_files)} of {len(files)} spectra.")
+    if report is not None:
+        print(f"\n{report.summary()}")
+
+    return 1 if failed else 0
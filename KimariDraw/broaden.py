@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+broaden.py
+Vectorized spectral broadening of stick (line) data into curves, without a Multiwfn round-trip.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import numpy as np
+
+from KimariDraw import units
+
+# 支持的线型
+PROFILES = ("gaussian", "lorentzian", "pseudo-voigt")
+# 线型的归一化方式：height 为峰高等于跃迁强度，area 为峰面积等于跃迁强度
+NORMALIZATIONS = ("height", "area")
+
+# 高斯线型自动截断时的截断半径 (半峰全宽的倍数)，5 倍半峰全宽处约为峰高的 1e-30，截断不改变结果。
+# 洛伦兹线型的尾部按照距离的平方衰减，50 倍半峰全宽处仍有峰高的 1e-4，大量跃迁累加后截断的误差可以达到峰高的 0.1%，
+# 因此洛伦兹以及 pseudo-voigt 线型只在指定了 cutoff 时截断
+GAUSSIAN_CUTOFF = 5.0
+# 网格点数与跃迁数的乘积不超过这个值时，直接计算完整的线型矩阵 (float64 约 32 MB)
+DENSE_LIMIT = 1 << 22
+# 截断展宽时每一块线型矩阵的元素个数上限 (float64 约 8 MB)
+BLOCK_SIZE = 1 << 20
+
+# 高斯函数中的 4ln2
+_FOUR_LN2 = 4.0 * np.log(2.0)
+
+
+def sticks_from_line(line):
+    """
+    从 Multiwfn 输出的直线数据中得到跃迁的位置和强度
+
+    Notes:
+        Multiwfn 的 spectrum_line.txt 中每个跃迁写三行：(x, 0)、(x, 强度)、(x, 0)，此时只取中间的一行。
+        其他格式的直线数据则认为每一行就是一个跃迁
+
+    Args:
+        line(numpy.ndarray): 直线数据，第一列为 x，第二列为强度
+
+    Returns:
+        positions(numpy.ndarray): 跃迁的位置
+        strengths(numpy.ndarray): 跃迁的强度
+    """
+    line = np.asarray(line, dtype=np.float64)
+    if line.ndim != 2 or line.shape[1] < 2:
+        raise ValueError("The line data must have at least two columns (position, strength).")
+
+    if len(line) % 3 == 0 and len(line) > 0:
+        triplets = line[:, :2].reshape(-1, 3, 2)
+        if np.all(triplets[:, :, 0] == triplets[:, :1, 0]) and not np.any(triplets[:, [0, 2], 1]):
+            return triplets[:, 1, 0].copy(), triplets[:, 1, 1].copy()
+
+    return line[:, 0].copy(), line[:, 1].copy()
+
+
+def line_shape(grid, centers, fwhm, profile="gaussian", eta=0.5, normalize="height"):
+    """
+    计算每个跃迁在网格上的线型，结果为一个 (网格点数, 跃迁数) 的矩阵
+
+    Args:
+        grid(numpy.ndarray): 网格
+        centers(numpy.ndarray): 跃迁的位置
+        fwhm(float): 半峰全宽，与 grid 的单位相同
+        profile(str): 线型，gaussian、lorentzian 或者 pseudo-voigt
+        eta(float): pseudo-voigt 中洛伦兹线型所占的比例
+        normalize(str): height 为峰高为 1，area 为峰面积为 1
+
+    Returns:
+        shape(numpy.ndarray): 线型矩阵
+    """
+    offset = (np.asarray(grid, dtype=np.float64)[:, None] - np.asarray(centers, dtype=np.float64)[None, :]) / fwhm
+    offset *= offset
+
+    if profile == "gaussian":
+        shape = np.exp(-_FOUR_LN2 * offset)
+        if normalize == "area":
+            shape *= np.sqrt(_FOUR_LN2 / np.pi) / fwhm
+    elif profile == "lorentzian":
+        shape = 1.0 / (1.0 + 4.0 * offset)
+        if normalize == "area":
+            shape *= 2.0 / (np.pi * fwhm)
+    elif profile == "pseudo-voigt":
+        gaussian = np.exp(-_FOUR_LN2 * offset)
+        lorentzian = 1.0 / (1.0 + 4.0 * offset)
+        if normalize == "area":
+            gaussian *= np.sqrt(_FOUR_LN2 / np.pi) / fwhm
+            lorentzian *= 2.0 / (np.pi * fwhm)
+        shape = eta * lorentzian + (1.0 - eta) * gaussian
+    else:
+        raise ValueError(f"Unsupported profile '{profile}'. Supported profiles are: {', '.join(PROFILES)}")
+
+    return shape
+
+
+def broaden(positions, strengths, fwhm, profile="gaussian", points=3000, x_range=None, x_unit=None,
+            fwhm_unit=None, eta=0.5, normalize="height", scale=1.0, states=None, cutoff=None, chunk=None):
+    """
+    将跃迁展宽为曲线，结果的布局与 Multiwfn 的 spectrum_curve.txt 相同：第一列为 x，第二列为总的曲线，其余列为所选跃迁的贡献
+
+    Notes:
+        1. 展宽在 fwhm_unit 单位下进行，例如 UV-Vis 光谱通常以 nm 为 x 轴，但是以 eV 为单位展宽
+        2. 网格在 x_unit 单位下是均匀的，默认的范围为跃迁位置向两侧各延伸 3 个半峰全宽
+        3. 网格点数与跃迁数的乘积超过 DENSE_LIMIT 时分块计算，内存占用与跃迁数无关。高斯线型同时只计算每个跃迁
+           GAUSSIAN_CUTOFF 倍半峰全宽以内的线型；洛伦兹以及 pseudo-voigt 线型的尾部很长，仍然计算全部的跃迁，结果与完整的计算相同
+        4. 指定了 cutoff 时，任何线型都只计算每个跃迁 cutoff 倍半峰全宽以内的线型，是以精度换取速度的近似
+
+    Args:
+        positions(numpy.ndarray): 跃迁的位置，单位为 x_unit
+        strengths(numpy.ndarray): 跃迁的强度
+        fwhm(float): 半峰全宽，单位为 fwhm_unit
+        profile(str): 线型，gaussian、lorentzian 或者 pseudo-voigt
+        points(int): 网格点数
+        x_range(list[float, float]): x 的范围，单位为 x_unit
+        x_unit(str): x 的单位，nm、eV 或者 cm-1，默认为 None，即与 fwhm_unit 相同
+        fwhm_unit(str): 半峰全宽的单位，默认为 None，即与 x_unit 相同
+        eta(float): pseudo-voigt 中洛伦兹线型所占的比例
+        normalize(str): height 为峰高等于跃迁强度，area 为峰面积等于跃迁强度
+        scale(float): 曲线的缩放系数，例如将振子强度换算为摩尔吸光系数
+        states(list[int]): 需要单独输出贡献的跃迁，从 1 开始编号
+        cutoff(float): 截断半径，为半峰全宽的倍数，默认为 None，即只在数据量较大时截断高斯线型
+        chunk(int): 截断展宽时每一块的网格点数，默认为 None，即根据 BLOCK_SIZE 自动选择
+
+    Returns:
+        curve(numpy.ndarray): 形状为 (points, 2 + len(states)) 的数组
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    strengths = np.asarray(strengths, dtype=np.float64)
+    if positions.shape != strengths.shape or positions.ndim != 1:
+        raise ValueError("positions and strengths must be one-dimensional arrays of the same length.")
+    if positions.size == 0:
+        raise ValueError("There is no transition to broaden.")
+    if not fwhm > 0:
+        raise ValueError("fwhm must be a positive number.")
+    if normalize not in NORMALIZATIONS:
+        raise ValueError(f"normalize must be one of: {', '.join(NORMALIZATIONS)}")
+    if profile not in PROFILES:
+        raise ValueError(f"Unsupported profile '{profile}'. Supported profiles are: {', '.join(PROFILES)}")
+
+    # 没有指定单位时，认为 x 与半峰全宽的单位相同，不需要转换
+    x_unit = x_unit or fwhm_unit
+    fwhm_unit = fwhm_unit or x_unit
+    convert = x_unit is not None and units.normalize_unit(x_unit) != units.normalize_unit(fwhm_unit)
+    centers = units.convert(positions, x_unit, fwhm_unit) if convert else positions
+
+    # 生成 x_unit 下均匀的网格
+    if x_range is None:
+        low, high = centers.min() - 3 * fwhm, centers.max() + 3 * fwhm
+        if convert:
+            # 倒数关系的单位不能取到 0 或负数
+            low = max(low, centers.min() / 10)
+            low, high = sorted(units.convert([low, high], fwhm_unit, x_unit))
+        x_range = (low, high)
+    grid = np.linspace(float(x_range[0]), float(x_range[1]), int(points))
+    shape_grid = units.convert(grid, x_unit, fwhm_unit) if convert else grid
+
+    weights = strengths * scale
+    index = _state_index(states, positions.size) if states is not None else None
+
+    if cutoff is None and grid.size * centers.size <= DENSE_LIMIT:
+        # 数据量较小时直接计算完整的线型矩阵
+        shape = line_shape(shape_grid, centers, fwhm, profile=profile, eta=eta, normalize=normalize)
+        columns = [grid, shape @ weights]
+        if index is not None:
+            columns.extend((shape[:, index] * weights[index]).T)
+        return np.column_stack(columns)
+
+    if cutoff is None:
+        # 自动分块时只截断高斯线型，其他线型的截断半径为无穷大，即每一块网格计算全部的跃迁
+        cutoff = GAUSSIAN_CUTOFF if profile == "gaussian" else np.inf
+    else:
+        cutoff = float(cutoff)
+        if not cutoff > 0:
+            raise ValueError("cutoff must be a positive number.")
+    total = _broaden_windowed(shape_grid, centers, weights, fwhm, cutoff, chunk,
+                              profile=profile, eta=eta, normalize=normalize)
+
+    columns = [grid, total]
+    if index is not None:
+        # 单独输出的跃迁通常很少，直接计算完整的线型
+        shape = line_shape(shape_grid, centers[index], fwhm, profile=profile, eta=eta, normalize=normalize)
+        columns.extend((shape * weights[index]).T)
+
+    return np.column_stack(columns)
+
+
+def _broaden_windowed(grid, centers, weights, fwhm, cutoff, chunk=None, **shape_options):
+    """
+    截断展宽：将网格分块，每一块只计算位于该块 cutoff 倍半峰全宽以内的跃迁的线型
+
+    Notes:
+        1. 跃迁按照位置排序后，每一块网格对应的跃迁是一个连续的区间，使用 searchsorted 得到区间的起止下标
+        2. 跃迁过于密集时，区间内的跃迁再分块，每一块线型矩阵的元素个数不超过 BLOCK_SIZE
+
+    Args:
+        grid(numpy.ndarray): 网格，单位与 fwhm 相同，需要是单调的
+        centers(numpy.ndarray): 跃迁的位置
+        weights(numpy.ndarray): 跃迁的强度
+        fwhm(float): 半峰全宽
+        cutoff(float): 截断半径，为半峰全宽的倍数
+        chunk(int): 每一块的网格点数
+        **shape_options: line_shape 的其他参数
+
+    Returns:
+        total(numpy.ndarray): 总的曲线
+    """
+    order = np.argsort(centers, kind="stable")
+    centers, weights = centers[order], weights[order]
+    radius = cutoff * fwhm
+
+    if chunk is None:
+        # 默认每一块的网格点数使线型矩阵不超过 BLOCK_SIZE，但至少为 256 个点
+        chunk = max(256, BLOCK_SIZE // centers.size)
+    chunk = int(chunk)
+    if chunk < 1:
+        raise ValueError("chunk must be a positive integer.")
+
+    total = np.zeros(grid.size, dtype=np.float64)
+    for start in range(0, grid.size, chunk):
+        part = grid[start:start + chunk]
+        low, high = np.searchsorted(centers, (part.min() - radius, part.max() + radius), side="left")
+        # 区间内的跃迁再分块，限制线型矩阵的大小
+        step = max(1, BLOCK_SIZE // part.size)
+        for first in range(low, high, step):
+            last = min(first + step, high)
+            shape = line_shape(part, centers[first:last], fwhm, **shape_options)
+            total[start:start + chunk] += shape @ weights[first:last]
+
+    return total
+
+
+def broaden_line(line, **options):
+    """
+    根据直线数据展宽得到曲线数据，options 与 broaden 的参数相同，通常来自 toml 文件中的 [broaden] 表
+
+    Args:
+        line(numpy.ndarray): 直线数据
+        **options: broaden 的参数，其中 range 可以代替 x_range
+
+    Returns:
+        curve(numpy.ndarray): 曲线数据
+    """
+    options = dict(options)
+    if "range" in options:
+        options["x_range"] = options.pop("range")
+    if "fwhm" not in options:
+        raise ValueError("Missing 'fwhm' in the 'broaden' configuration. It is required.")
+
+    allowed = {"fwhm", "profile", "points", "x_range", "x_unit", "fwhm_unit", "eta", "normalize", "scale", "states",
+               "cutoff", "chunk"}
+    unknown = set(options) - allowed
+    if unknown:
+        raise ValueError(f"Unknown keys in the 'broaden' configuration: {', '.join(sorted(unknown))}")
+
+    positions, strengths = sticks_from_line(line)
+    return broaden(positions, strengths, **options)
+
+
+def _state_index(states, count):
+    # 将从 1 开始编号的跃迁转换为从 0 开始的下标
+    index = np.asarray(states, dtype=np.int64).ravel() - 1
+    if np.any(index < 0) or np.any(index >= count):
+        raise ValueError(f"states must be between 1 and {count}.")
+    return index
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+cache.py
+On-disk binary cache of parsed spectrum data, so that unchanged text files are not parsed again.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+# 缓存格式的版本，解析器的结果发生变化时需要修改，使旧的缓存失效
+CACHE_VERSION = "3"
+# 默认的缓存大小上限 (MB)
+DEFAULT_CACHE_SIZE = 1024
+
+
+def is_enabled():
+    """
+    判断是否开启缓存，设置环境变量 KIMARIDRAW_NO_CACHE=1 或者使用命令行参数 --no-cache 可以关闭缓存
+
+    Returns:
+        enabled(bool): 是否开启缓存
+    """
+    return os.environ.get("KIMARIDRAW_NO_CACHE", "").strip().lower() in ("", "0", "false", "no")
+
+
+def set_enabled(enabled):
+    """
+    开启或关闭缓存。通过环境变量实现，因此进程池中的子进程也会继承这个设置
+
+    Args:
+        enabled(bool): 是否开启缓存
+    """
+    if enabled:
+        os.environ.pop("KIMARIDRAW_NO_CACHE", None)
+    else:
+        os.environ["KIMARIDRAW_NO_CACHE"] = "1"
+
+
+def cache_dir():
+    """
+    缓存文件夹，默认为 ~/.cache/kimaridraw，可以通过环境变量 KIMARIDRAW_CACHE_DIR 修改
+
+    Returns:
+        directory(str): 缓存文件夹的路径
+    """
+    directory = os.environ.get("KIMARIDRAW_CACHE_DIR")
+    if not directory:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        directory = os.path.join(base, "kimaridraw")
+    return directory
+
+
+def cache_size():
+    """
+    缓存大小的上限 (字节)，默认为 1024 MB，可以通过环境变量 KIMARIDRAW_CACHE_SIZE (MB) 修改
+
+    Returns:
+        size(int): 缓存大小的上限
+    """
+    size = os.environ.get("KIMARIDRAW_CACHE_SIZE")
+    return int(float(size) * 1024 ** 2) if size else DEFAULT_CACHE_SIZE * 1024 ** 2
+
+
+def load(file_path, loader, variant=""):
+    """
+    读取 file_path 解析后的数组。如果缓存中已经存在相同内容的文件，则直接以内存映射的方式读取缓存，否则调用 loader 解析并写入缓存
+
+    Notes:
+        1. 首先根据文件的绝对路径、修改时间以及大小查找缓存，命中时不需要读取原文件
+        2. 文件的修改时间或大小发生变化时，计算文件内容的哈希值，内容相同的文件（例如只是被 touch 过）仍然可以命中缓存
+        3. 从缓存中读取的数组是只读的
+
+    Args:
+        file_path(str): 数据文件的路径
+        loader(callable): 解析函数，接受 file_path，返回一个 NumPy 数组
+        variant(str): 影响解析结果的其他参数，例如读取的列，会作为缓存的键的一部分
+
+    Returns:
+        data(numpy.ndarray): 解析后的数组
+    """
+    if not is_enabled():
+        return loader(file_path)
+
+    directory = cache_dir()
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        # 无法创建缓存文件夹时，直接解析文件
+        return loader(file_path)
+
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    stat_key = _hash(f"{CACHE_VERSION}\0{path}\0{stat.st_mtime_ns}\0{stat.st_size}\0{variant}".encode())
+    index_file = os.path.join(directory, f"{stat_key}.key")
+
+    # 根据路径、修改时间以及大小查找缓存
+    content_key = _read_text(index_file)
+    if content_key:
+        data = _open_entry(directory, content_key)
+        if data is not None:
+            return data
+
+    # 根据文件内容查找缓存
+    content_key = _hash_file(path, f"{CACHE_VERSION}\0{variant}".encode())
+    data = _open_entry(directory, content_key)
+    if data is None:
+        data = loader(file_path)
+        _store_entry(directory, content_key, data)
+        evict(directory)
+    _write_atomic(index_file, content_key.encode())
+
+    return data
+
+
+def clear():
+    """
+    删除缓存文件夹中的所有缓存
+    """
+    directory = cache_dir()
+    if not os.path.isdir(directory):
+        return
+    for entry in os.scandir(directory):
+        if entry.name.endswith((".npy", ".key")):
+            _remove(entry.path)
+
+
+def evict(directory=None, limit=None):
+    """
+    当缓存的总大小超过上限时，按照最近一次使用的时间从旧到新删除缓存
+
+    Args:
+        directory(str): 缓存文件夹，默认为 cache_dir()
+        limit(int): 缓存大小的上限 (字节)，默认为 cache_size()
+    """
+    directory = directory or cache_dir()
+    limit = cache_size() if limit is None else limit
+
+    entries = []
+    keys = []
+    for entry in os.scandir(directory):
+        try:
+            if entry.name.endswith(".npy"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+            elif entry.name.endswith(".key"):
+                keys.append(entry.path)
+        except OSError:
+            continue
+
+    total = sum(size for _, size, _ in entries)
+    if total <= limit:
+        return
+
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        _remove(path)
+        total -= size
+
+    # 删除指向已删除缓存的索引文件
+    for key in keys:
+        content_key = _read_text(key)
+        if not content_key or not os.path.exists(os.path.join(directory, f"{content_key}.npy")):
+            _remove(key)
+
+
+def _hash(data):
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def _hash_file(path, salt):
+    digest = hashlib.blake2b(salt, digest_size=20)
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _open_entry(directory, content_key):
+    # 以内存映射的方式打开缓存，并更新其修改时间，用于按照最近使用的时间淘汰缓存
+    entry = os.path.join(directory, f"{content_key}.npy")
+    try:
+        data = np.load(entry, mmap_mode="r", allow_pickle=False)
+        os.utime(entry)
+    except (OSError, ValueError):
+        return None
+    # 返回普通的 ndarray 视图，数据仍然是内存映射的
+    return np.asarray(data)
+
+
+def _store_entry(directory, content_key, data):
+    # 先写入临时文件再重命名，多个进程同时写入同一个缓存也不会得到不完整的文件
+    try:
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            np.save(file, np.ascontiguousarray(data), allow_pickle=False)
+        os.replace(temp_path, os.path.join(directory, f"{content_key}.npy"))
+    except OSError:
+        _remove(temp_path)
+
+
+def _write_atomic(path, content):
+    try:
+        file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            file.write(content)
+        os.replace(temp_path, path)
+    except OSError:
+        _remove(temp_path)
+
+
+def _read_text(path):
+    try:
+        with open(path, "r") as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+data.py
+Compact columnar containers for curve and line data: a shared x vector and one contiguous y block.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import itertools
+
+import numpy as np
+
+# y 允许使用的精度，x 总是 float64，使得波长、波数这样的大数值不会损失精度
+DTYPES = ('float64', 'float32')
+# 每个新创建的对象得到一个递增的版本号，与 id 不同，对象被回收之后版本号也不会被重复使用
+_VERSIONS = itertools.count()
+
+
+class _Columns:
+    """
+    第一列为 x、其余列为 y 的数据，x 为一维数组，全部的 y 为一块 C 连续的二维数组
+
+    Notes:
+        1. x 不会被复制，多个光谱使用同一个网格时 (例如构象系综插值后的曲线) 可以共用同一个 x
+        2. 只有在需要 DataFrame 的地方 (例如 Spectrum.curveData) 才调用 to_frame 转换，内部的计算都直接使用 x 和 y
+
+    Attributes:
+        x (numpy.ndarray): 形状为 (n,) 的 x
+        y (numpy.ndarray): 形状为 (n, k) 的 y
+        version (int): 对象的版本号，保留的图片根据版本号判断数据是否变化
+    """
+    __slots__ = ('x', 'y', 'version')
+
+    def __init__(self, x, y):
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        y = np.asarray(y)
+        if y.ndim == 1:
+            y = y[:, None]
+        if x.ndim != 1 or y.ndim != 2 or y.shape[0] != x.shape[0]:
+            raise ValueError(f"x of shape {x.shape} does not match y of shape {y.shape}.")
+        if y.shape[1] < 1:
+            raise ValueError("Spectral data must have at least one y column.")
+        # 整数等其他类型的 y 转换为 float64，float32 保持不变
+        dtype = y.dtype if y.dtype.name in DTYPES else np.float64
+        self.x = x
+        self.y = np.ascontiguousarray(y, dtype=dtype)
+        self.version = next(_VERSIONS)
+
+    @classmethod
+    def from_array(cls, array, dtype=None):
+        """
+        从二维数组或者 DataFrame 创建，第一列为 x，其余列为 y
+
+        Args:
+            array(numpy.ndarray or DataFrame): 形状为 (n, k + 1) 的数据
+            dtype(str): y 的精度，float64 或者 float32，默认为 None，即 float32 的输入保持 float32，其他为 float64
+
+        Returns:
+            data(_Columns): 创建的对象
+        """
+        array = np.asarray(array)
+        if array.ndim != 2 or array.shape[1] < 2:
+            raise ValueError("Spectral data must be a 2-D array with x in the first column and y in the others.")
+        if dtype is not None and np.dtype(dtype).name not in DTYPES:
+            raise ValueError(f"dtype must be one of {', '.join(DTYPES)}, got '{dtype}'.")
+        if dtype is None:
+            dtype = array.dtype if array.dtype.name in DTYPES else np.float64
+        return cls(array[:, 0], np.ascontiguousarray(array[:, 1:], dtype=dtype))
+
+    @classmethod
+    def coerce(cls, data, dtype=None):
+        """
+        将 Spectrum 接受的各种数据转换为这个类型，None 原样返回
+
+        Args:
+            data(_Columns or DataFrame or numpy.ndarray): 数据
+            dtype(str): y 的精度，默认为 None，与 from_array 相同
+
+        Returns:
+            data(_Columns): 转换后的数据
+        """
+        if data is None:
+            return None
+        if isinstance(data, _Columns):
+            if dtype is None or data.y.dtype == np.dtype(dtype):
+                return data
+            return cls(data.x, data.y.astype(dtype))
+        return cls.from_array(data, dtype)
+
+    def __len__(self):
+        return self.x.shape[0]
+
+    def __repr__(self):
+        return f"{type(self).__name__}(rows={len(self)}, columns={self.columns}, dtype={self.y.dtype.name}, " \
+               f"nbytes={self.nbytes})"
+
+    @property
+    def columns(self):
+        """
+        列数，包括 x，与 DataFrame 的列数相同
+        """
+        return self.y.shape[1] + 1
+
+    @property
+    def shape(self):
+        """
+        与 DataFrame 相同的形状 (行数, 列数)
+        """
+        return len(self), self.columns
+
+    @property
+    def nbytes(self):
+        """
+        x 和 y 占用的字节数
+        """
+        return self.x.nbytes + self.y.nbytes
+
+    def column(self, index):
+        """
+        返回第 index 列，0 为 x
+
+        Args:
+            index(int): 列的下标
+
+        Returns:
+            column(numpy.ndarray): 这一列的数据，不会复制
+        """
+        return self.x if index == 0 else self.y[:, index - 1]
+
+    def to_numpy(self):
+        """
+        返回第一列为 x 的二维 float64 数组，会复制数据
+
+        Returns:
+            array(numpy.ndarray): 形状为 (n, k + 1) 的数组
+        """
+        array = np.empty(self.shape, dtype=np.float64)
+        array[:, 0] = self.x
+        array[:, 1:] = self.y
+        return array
+
+    def to_frame(self):
+        """
+        转换为列名为 0, 1, 2... 的 DataFrame，与 read_path 返回的格式相同
+
+        Returns:
+            data(DataFrame): 转换后的数据
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self.to_numpy())
+
+    def stats(self):
+        """
+        计算每一列的统计量，x 和 y 分别计算，不会将 y 转换为 float64
+
+        Returns:
+            stats(ColumnStats): 每一列的统计量
+        """
+        from KimariDraw.stats import ColumnStats
+
+        return ColumnStats.stack(ColumnStats(self.x), ColumnStats(self.y))
+
+
+class CurveData(_Columns):
+    """
+    曲线数据，所有的曲线共用同一个 x，y 的每一列为一条曲线
+    """
+    __slots__ = ()
+
+
+class LineData(_Columns):
+    """
+    直线 (跃迁) 数据，x 为每个跃迁的位置，y 的每一列为跃迁的强度，绘制时使用第一列
+    """
+    __slots__ = ()
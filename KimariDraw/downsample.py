@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+downsample.py
+Peak-preserving min/max downsampling of dense curves before they are handed to matplotlib.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import math
+
+import numpy as np
+
+
+def target_buckets(x, figure_width, dpi, x_limit=None):
+    """
+    根据图片的宽度以及 dpi 计算降采样的分组数，每一个像素列对应一个分组
+
+    Notes:
+        1. 整张图片的宽度 figure_width * dpi 一定不小于坐标轴的像素宽度，因此不会损失可见的细节
+        2. 如果数据的范围超出了 x_limit，则按照数据范围与可见范围的比值增加分组数，使得可见部分仍然是每个像素一个分组
+
+    Args:
+        x(numpy.ndarray): 曲线的 x
+        figure_width(float): 图片的宽度，单位为英寸
+        dpi(float): 保存图片的 dpi
+        x_limit(list[float, float, float]): x 轴的刻度，最小值、最大值以及间距
+
+    Returns:
+        buckets(int): 分组数，如果降采样不能减少数据点则返回 None
+    """
+    buckets = float(figure_width) * float(dpi)
+    data_span = float(np.nanmax(x) - np.nanmin(x)) if len(x) else 0.0
+    if x_limit is not None:
+        visible_span = abs(float(x_limit[1]) - float(x_limit[0]))
+        if visible_span > 0 and data_span > visible_span:
+            buckets *= data_span / visible_span
+    buckets = max(1, math.ceil(buckets))
+
+    # 每个分组保留最小值和最大值两个点，数据点不超过 2 倍分组数时降采样没有意义
+    if len(x) <= 2 * buckets:
+        return None
+
+    return buckets
+
+
+def minmax(x, ys, buckets):
+    """
+    按照 x 的顺序将数据等分为 buckets 组，每一组只保留 y 的最小值和最大值所在的点，同时保留第一个点和最后一个点
+
+    Notes:
+        1. 每一条曲线单独选取最小值和最大值，因此返回的 x 也是每条曲线各自一列
+        2. Multiwfn 输出的 x 是等间距的，此时等分数据点就等价于按照像素分组，峰的高度和位置不会改变
+
+    Args:
+        x(numpy.ndarray): 形状为 (n,) 的 x，需要是单调的
+        ys(numpy.ndarray): 形状为 (n, k) 的 y，每一列为一条曲线
+        buckets(int): 分组数
+
+    Returns:
+        x(numpy.ndarray): 形状为 (m, k) 的 x
+        ys(numpy.ndarray): 形状为 (m, k) 的 y
+    """
+    x = np.asarray(x)
+    ys = np.asarray(ys)
+    n, k = ys.shape
+
+    # 每组的点数，最后一组不足时用最后一个点补齐
+    size = -(-n // int(buckets))
+    count = -(-n // size)
+    pad = count * size - n
+    if pad:
+        ys = np.concatenate((ys, np.repeat(ys[-1:], pad, axis=0)))
+    blocks = ys.reshape(count, size, k)
+
+    offsets = (np.arange(count) * size)[:, None]
+    low = blocks.argmin(axis=1) + offsets
+    high = blocks.argmax(axis=1) + offsets
+    # 按照下标排序，使得每一组内的最小值和最大值保持原来的先后顺序
+    index = np.minimum(np.sort(np.concatenate((low, high)), axis=0), n - 1)
+    index = np.concatenate((np.zeros((1, k), dtype=index.dtype), index, np.full((1, k), n - 1, dtype=index.dtype)))
+
+    return x[index], np.take_along_axis(ys, index, axis=0)
+
+
+def downsample_curves(x, ys, figure_width, dpi, x_limit=None):
+    """
+    对曲线数据降采样，如果 x 不是单调的或者数据点不够多，则原样返回
+
+    Args:
+        x(numpy.ndarray): 形状为 (n,) 的 x
+        ys(numpy.ndarray): 形状为 (n, k) 的 y
+        figure_width(float): 图片的宽度，单位为英寸
+        dpi(float): 保存图片的 dpi
+        x_limit(list[float, float, float]): x 轴的刻度
+
+    Returns:
+        x(numpy.ndarray): 形状为 (m, k) 的 x
+        ys(numpy.ndarray): 形状为 (m, k) 的 y
+    """
+    x = np.asarray(x, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+
+    buckets = target_buckets(x, figure_width, dpi, x_limit)
+    step = np.diff(x)
+    if buckets is not None and (np.all(step >= 0) or np.all(step <= 0)):
+        return minmax(x, ys, buckets)
+
+    # 不降采样时，所有曲线共用同一个 x，不需要复制
+    return np.broadcast_to(x[:, None], ys.shape), ys
@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+"""
+ensemble.py
+Boltzmann-weighted aggregation of conformer ensembles, streamed file by file onto a common grid.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import csv
+import glob
+import os
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+# Boltzmann 常数，单位为各能量单位每开尔文
+BOLTZMANN = {
+    'hartree': 3.166811563e-6,
+    'ev': 8.617333262e-5,
+    'kcal/mol': 1.987204259e-3,
+    'kj/mol': 8.314462618e-3,
+}
+# 能量单位的别名
+ENERGY_ALIASES = {
+    'au': 'hartree',
+    'a.u.': 'hartree',
+    'eh': 'hartree',
+    'kcal': 'kcal/mol',
+    'kj': 'kj/mol',
+}
+# 默认的能量单位以及温度 (K)
+DEFAULT_UNIT = 'hartree'
+DEFAULT_TEMPERATURE = 298.15
+
+
+def normalize_energy_unit(unit):
+    """
+    将能量单位统一为 BOLTZMANN 中的写法，例如 "kcal/mol"、"kJ/mol"、"Hartree"
+
+    Args:
+        unit(str): 能量单位
+
+    Returns:
+        unit(str): 统一之后的能量单位
+    """
+    key = str(unit).strip().lower().replace(' ', '')
+    key = ENERGY_ALIASES.get(key, key)
+    if key not in BOLTZMANN:
+        raise ValueError(f"Unsupported energy unit '{unit}'. Supported units are: {', '.join(BOLTZMANN)}")
+    return key
+
+
+def boltzmann_weights(energies, temperature=DEFAULT_TEMPERATURE, unit=DEFAULT_UNIT):
+    """
+    根据每个构象的能量计算 Boltzmann 权重，权重之和为 1
+
+    Notes:
+        能量可以是绝对能量，也可以是相对能量，计算时会减去最低的能量，因此不会溢出
+
+    Args:
+        energies(numpy.ndarray): 每个构象的能量
+        temperature(float): 温度，单位为 K，默认为 298.15
+        unit(str): 能量单位，默认为 hartree
+
+    Returns:
+        weights(numpy.ndarray): 每个构象的权重
+    """
+    energies = np.asarray(energies, dtype=np.float64)
+    if energies.ndim != 1 or energies.size == 0:
+        raise ValueError("The energies of an ensemble must be a non-empty list of numbers.")
+    if not np.all(np.isfinite(energies)):
+        raise ValueError("The energies of an ensemble must be finite.")
+    if temperature <= 0:
+        raise ValueError("The temperature of an ensemble must be positive.")
+
+    exponent = -(energies - energies.min()) / (BOLTZMANN[normalize_energy_unit(unit)] * temperature)
+    weights = np.exp(exponent)
+
+    return weights / weights.sum()
+
+
+def read_energies(csv_file):
+    """
+    读取记录构象能量的 csv 文件，每一行为文件名和能量，第一行可以是表头
+
+    Args:
+        csv_file(str): csv 文件路径
+
+    Returns:
+        energies(dict[str, float]): 文件名到能量的映射，相对路径相对于 csv 文件所在的文件夹
+    """
+    folder = os.path.dirname(os.path.abspath(csv_file))
+    energies = {}
+    with open(csv_file, newline='') as file:
+        for number, row in enumerate(csv.reader(file), start=1):
+            # 跳过空行以及注释
+            if not row or not row[0].strip() or row[0].lstrip().startswith('#'):
+                continue
+            if len(row) < 2:
+                raise ValueError(f"Line {number} of {csv_file} must contain a file name and an energy.")
+            try:
+                energy = float(row[1])
+            except ValueError:
+                # 第一行可以是表头
+                if not energies and number == 1:
+                    continue
+                raise ValueError(f"Line {number} of {csv_file} has an invalid energy '{row[1]}'.")
+            name = row[0].strip()
+            energies[name if os.path.isabs(name) else os.path.join(folder, name)] = energy
+
+    return energies
+
+
+def match_energies(files, energies):
+    """
+    按照文件的顺序取出每个文件的能量
+
+    Notes:
+        先按照完整的路径匹配，再按照不含后缀的文件名匹配，例如 conf1.out 的能量可以用于 conf1.txt
+
+    Args:
+        files(list[str]): 数据文件路径
+        energies(dict[str, float]): 文件名到能量的映射
+
+    Returns:
+        energies(list[float]): 每个文件的能量
+    """
+    by_path = {os.path.abspath(name): energy for name, energy in energies.items()}
+    by_stem = {}
+    for name, energy in energies.items():
+        by_stem.setdefault(Path(name).stem, []).append(energy)
+
+    matched = []
+    for file in files:
+        path = os.path.abspath(file)
+        if path in by_path:
+            matched.append(by_path[path])
+            continue
+        candidates = by_stem.get(Path(file).stem, [])
+        if len(candidates) != 1:
+            reason = "no energy" if not candidates else "more than one energy"
+            raise ValueError(f"Found {reason} for the ensemble file {file}.")
+        matched.append(candidates[0])
+
+    return matched
+
+
+def interpolate(grid, x, ys):
+    """
+    将若干条曲线线性插值到网格上，所有曲线一起向量化计算，超出曲线范围的部分为 0
+
+    Args:
+        grid(numpy.ndarray): 形状为 (m,) 的网格
+        x(numpy.ndarray): 形状为 (n,) 的 x
+        ys(numpy.ndarray): 形状为 (n, k) 的 y
+
+    Returns:
+        values(numpy.ndarray): 形状为 (m, k) 的插值结果
+    """
+    x = np.asarray(x, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    if len(x) < 2:
+        raise ValueError("A curve must contain at least two points to be interpolated.")
+
+    # 与网格相同时不需要插值，这是 Multiwfn 使用相同设置输出的常见情况
+    if len(x) == len(grid) and np.array_equal(x, grid):
+        return ys
+
+    # Multiwfn 输出的 x 通常是单调的，降序时翻转，否则排序
+    if x[0] > x[-1]:
+        x, ys = x[::-1], ys[::-1]
+    if np.any(np.diff(x) < 0):
+        order = np.argsort(x, kind='stable')
+        x, ys = x[order], ys[order]
+
+    # 每个网格点所在的区间以及在区间中的位置
+    index = np.clip(np.searchsorted(x, grid, side='right') - 1, 0, len(x) - 2)
+    x0, x1 = x[index], x[index + 1]
+    span = x1 - x0
+    t = np.divide(grid - x0, span, out=np.zeros_like(span), where=span != 0)[:, None]
+    values = ys[index] * (1 - t) + ys[index + 1] * t
+    values[(grid < x[0]) | (grid > x[-1])] = 0.0
+
+    return values
+
+
+def stream(files, load, workers=None):
+    """
+    按照顺序依次返回每个文件的数据，后台的线程池预先读取之后的文件
+
+    Notes:
+        同时最多只持有 2 * workers 个文件的数据，因此几百个文件也不会同时占用内存
+
+    Args:
+        files(list[str]): 文件路径
+        load(callable): 读取一个文件的函数
+        workers(int): 线程数，默认为 None，即 CPU 的核数
+
+    Yields:
+        data: 每个文件的数据，与 files 的顺序相同
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(files) <= 1:
+        for file in files:
+            yield load(file)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        remaining = iter(files)
+        pending = deque(executor.submit(load, file) for _, file in zip(range(2 * workers), remaining))
+        try:
+            while pending:
+                data = pending.popleft().result()
+                # 取走一个结果后再提交一个文件，保持预读取的数量不变
+                file = next(remaining, None)
+                if file is not None:
+                    pending.append(executor.submit(load, file))
+                yield data
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def load_array(file, columns=None, xrange=None, cached=False):
+    """
+    读取一个曲线或直线文件为 NumPy 数组，与 [curve] 中的 path 使用相同的读取方式
+
+    Notes:
+        构象的文件通常只参与一次加权，默认不写入磁盘缓存，避免几百个构象的数组挤掉缓存中其他光谱的数据
+
+    Args:
+        file(str): 文件路径
+        columns(list[int]): 需要读取的列的下标，默认为 None，即全部的列
+        xrange(list[float, float]): 只读取 x 在这个范围内的行，默认为 None
+        cached(bool): 是否使用磁盘缓存，默认为 False
+
+    Returns:
+        data(numpy.ndarray): 文件中的数据
+    """
+    from KimariDraw.kimaridraw import read_array
+
+    return np.asarray(read_array(file, columns=columns, xrange=xrange, cached=cached), dtype=np.float64)
+
+
+def aggregate_curves(files, weights, grid=None, columns=None, xrange=None, workers=None, cached=False):
+    """
+    逐个读取曲线文件，插值到同一个网格上并按照权重求和
+
+    Args:
+        files(list[str]): 曲线文件路径
+        weights(numpy.ndarray): 每个文件的权重
+        grid(numpy.ndarray): 网格，默认为 None，即第一个文件的 x
+        columns(list[int]): 需要读取的列的下标，0 为 x，默认为 None，即全部的列
+        xrange(list[float, float]): 只读取 x 在这个范围内的行，默认为 None
+        workers(int): 读取文件的线程数，默认为 None，即 CPU 的核数
+        cached(bool): 是否使用磁盘缓存，默认为 False
+
+    Returns:
+        curve(numpy.ndarray): 第一列为网格，其他列为加权求和的曲线
+    """
+    if len(files) != len(weights):
+        raise ValueError(f"The ensemble has {len(files)} curve files but {len(weights)} weights.")
+
+    def load(file):
+        return load_array(file, columns, xrange, cached)
+
+    total = None
+    for file, weight, data in zip(files, weights, stream(files, load, workers)):
+        x, ys = data[:, 0], data[:, 1:]
+        if total is None:
+            grid = x.copy() if grid is None else np.asarray(grid, dtype=np.float64)
+            total = np.zeros((len(grid), ys.shape[1]))
+        elif ys.shape[1] != total.shape[1]:
+            raise ValueError(f"The curve file {file} has {ys.shape[1]} curves, but the first file has "
+                             f"{total.shape[1]}. Select the common curves with 'columns' in the 'curve' configuration.")
+        total += weight * interpolate(grid, x, ys)
+
+    if total is None:
+        raise ValueError("The ensemble does not contain any curve file.")
+
+    return np.column_stack((grid, total))
+
+
+def aggregate_lines(files, weights, workers=None, cached=False):
+    """
+    逐个读取直线文件，将每个跃迁的强度乘以对应的权重后合并在一起
+
+    Args:
+        files(list[str]): 直线文件路径
+        weights(numpy.ndarray): 每个文件的权重
+        workers(int): 读取文件的线程数，默认为 None，即 CPU 的核数
+        cached(bool): 是否使用磁盘缓存，默认为 False
+
+    Returns:
+        line(numpy.ndarray): 合并后的直线数据，第一列为 x，第二列为加权的强度
+    """
+    if len(files) != len(weights):
+        raise ValueError(f"The ensemble has {len(files)} line files but {len(weights)} weights.")
+
+    def load(file):
+        return load_array(file, cached=cached)
+
+    blocks = []
+    for weight, data in zip(weights, stream(files, load, workers)):
+        blocks.append(np.column_stack((data[:, 0], data[:, 1] * weight)))
+
+    return np.concatenate(blocks)
+
+
+def _expand(patterns, current_folder):
+    # 将文件列表以及通配符展开为文件路径，相对路径相对于 current_folder
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    files = []
+    for pattern in patterns:
+        pattern = pattern if os.path.isabs(pattern) else os.path.join(current_folder, pattern)
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if not matches:
+                raise ValueError(f"No ensemble file matches '{pattern}'.")
+            files.extend(matches)
+        else:
+            files.append(pattern)
+    return files
+
+
+def ensemble_from_config(ensemble, current_folder, columns=None, xrange=None):
+    """
+    根据 toml 文件中 ensemble 表的内容计算 Boltzmann 加权的曲线以及直线
+
+    Notes:
+        1. files 以及 lines 为曲线文件以及直线文件，可以使用通配符，两者至少需要一个。同时存在时按照顺序一一对应
+        2. energies 为每个构象的能量，可以是与文件顺序相同的列表，也可以是文件名到能量的表，或者一个 csv 文件。
+           没有 files 以及 lines 时，csv 文件中的文件名就是曲线文件
+        3. 曲线插值到同一个网格上，网格默认为第一个曲线文件的 x，也可以使用 range 以及 points 指定
+        4. 构象的文件默认不使用磁盘缓存，cache = true 时与 [curve] 中的 path 一样缓存
+
+    Args:
+        ensemble(dict): ensemble 表的内容
+        current_folder(str): 相对路径所相对的文件夹
+        columns(list[int]): 曲线文件中需要读取的列的下标，默认为 None，即全部的列
+        xrange(list[float, float]): 曲线文件中只读取 x 在这个范围内的行，默认为 None
+
+    Returns:
+        curve(numpy.ndarray): 加权的曲线，没有曲线文件时为 None
+        line(numpy.ndarray): 加权的直线，没有直线文件时为 None
+    """
+    allowed = {'files', 'lines', 'energies', 'energy_unit', 'temperature', 'range', 'points', 'workers', 'cache'}
+    unknown = set(ensemble) - allowed
+    if unknown:
+        raise ValueError(f"Unknown keys in the 'ensemble' configuration: {', '.join(sorted(unknown))}")
+    if 'energies' not in ensemble:
+        raise ValueError("The 'ensemble' configuration requires 'energies'.")
+
+    energies = ensemble['energies']
+    if isinstance(energies, str):
+        csv_file = energies if os.path.isabs(energies) else os.path.join(current_folder, energies)
+        energies = read_energies(csv_file)
+    elif isinstance(energies, dict):
+        energies = {name if os.path.isabs(name) else os.path.join(current_folder, name): energy
+                    for name, energy in energies.items()}
+
+    curve_files = _expand(ensemble['files'], current_folder) if 'files' in ensemble else None
+    line_files = _expand(ensemble['lines'], current_folder) if 'lines' in ensemble else None
+    if curve_files is None and line_files is None:
+        if not isinstance(energies, dict):
+            raise ValueError("The 'ensemble' configuration requires 'files' or 'lines'.")
+        # 只有 csv 文件时，其中的文件名就是曲线文件
+        curve_files = list(energies)
+    if curve_files is not None and line_files is not None and len(curve_files) != len(line_files):
+        raise ValueError(f"The ensemble has {len(curve_files)} curve files but {len(line_files)} line files.")
+
+    # 按照文件的顺序得到每个构象的能量
+    files = curve_files if curve_files is not None else line_files
+    if isinstance(energies, dict):
+        energies = match_energies(files, energies)
+    weights = boltzmann_weights(energies, ensemble.get('temperature', DEFAULT_TEMPERATURE),
+                                ensemble.get('energy_unit', DEFAULT_UNIT))
+
+    # 指定了范围时使用均匀的网格
+    grid = None
+    if 'range' in ensemble:
+        low, high = ensemble['range']
+        grid = np.linspace(low, high, int(ensemble.get('points', 3000)))
+    elif 'points' in ensemble:
+        raise ValueError("'points' of the 'ensemble' configuration requires 'range'.")
+
+    workers, cached = ensemble.get('workers'), bool(ensemble.get('cache', False))
+    curve = None if curve_files is None else aggregate_curves(curve_files, weights, grid, columns, xrange, workers,
+                                                              cached)
+    line = None if line_files is None else aggregate_lines(line_files, weights, workers, cached)
+
+    return curve, line
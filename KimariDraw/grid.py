@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""
+grid.py
+Multi-panel figures: many spectra laid out as a subplot grid, or overlaid on one axes, drawn and saved in one render.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import copy
+import math
+import os
+
+from KimariDraw import profiling
+from KimariDraw.kimaridraw import Spectrum, create_spectrum, new_figure, save_figure, style_context
+
+# [[panels]] 中可以覆盖的 Spectrum 属性，键为 toml 中的名字，值为 Spectrum 的属性名
+PANEL_OPTIONS = {
+    'title': 'title',
+    'x_label': 'x_label',
+    'left_y_label': 'left_y_label',
+    'right_y_label': 'right_y_label',
+    'x_limit': 'x_limit',
+    'left_y_limit': 'left_y_limit',
+    'right_y_limit': 'right_y_limit',
+    'legend': 'is_legend',
+    'zero': 'is_zero',
+    'line': 'is_showLine',
+}
+# [grid] 中允许的属性
+GRID_OPTIONS = {
+    'rows', 'cols', 'figure_size', 'share', 'title', 'font_family', 'font_size', 'save_format', 'save_dpi',
+    'name_template', 'overwrite', 'workers',
+}
+
+
+class Grid:
+    """
+    多子图的图片，每个子图可以叠加若干个光谱
+
+    Notes:
+        1. 每个子图的第一个光谱决定这个子图的坐标轴、标签、图例、零坐标轴以及直线，之后的光谱只叠加曲线
+        2. 全局属性 (字体、字号等) 只在创建图片时设置一次，所有子图共用
+        3. 与 Spectrum 相同，图片在调用 close 之前会一直保留，重复保存时只会原地修改。叠加的光谱的数据或者降采样
+           发生变化时同样原地更新曲线，曲线的数目、颜色、样式或者图例文本发生变化时重新创建整张图片
+
+    Attributes:
+        panels (list[list[Spectrum]]): 每个子图中的光谱
+        rows (int): 行数
+        cols (int): 列数
+        figure_size (tuple(float, float)): 整张图片的大小
+        share (bool or int): 子图之间共享坐标轴的程度，与 proplot 的 share 相同
+        title (str): 整张图片的标题
+        font_family (str): 字体家族
+        font_size (list[float, float, float]): 常规字号、标签字号以及标题字号
+        save_format (str or list[str]): 保存的格式
+        save_dpi (float or dict): 保存的 dpi
+        name (str): 图片的名字，用于生成文件名
+        name_template (str): 文件名模板
+        overwrite (bool): 是否覆盖已有的同名文件
+    """
+
+    def __init__(self, panels, **kwargs):
+        # 每个子图中的光谱，至少有一个子图，每个子图至少有一个光谱
+        self.panels = [list(spectra) if isinstance(spectra, (list, tuple)) else [spectra] for spectra in panels]
+        if not self.panels or not all(self.panels):
+            raise ValueError("A grid must contain at least one panel and each panel at least one spectrum.")
+
+        # 行数和列数，默认排列为接近正方形的网格
+        count = len(self.panels)
+        self.cols = kwargs.get('cols') or (math.ceil(count / kwargs['rows']) if kwargs.get('rows')
+                                           else math.ceil(math.sqrt(count)))
+        self.rows = kwargs.get('rows') or math.ceil(count / self.cols)
+        if self.rows * self.cols < count:
+            raise ValueError(f"A {self.rows}x{self.cols} grid can not hold {count} panels.")
+
+        # 整张图片的大小，默认每个子图 4 x 3.2 英寸
+        self.figure_size = tuple(kwargs.get('figure_size') or (4 * self.cols, 3.2 * self.rows))
+        if len(self.figure_size) != 2:
+            raise ValueError("figure_size must be a tuple of two floats (width, height)")
+
+        # 子图之间共享坐标轴，默认为 True，即共享标签、范围以及刻度
+        self.share = kwargs.get('share', True)
+        # 整张图片的标题，默认为 None
+        self.title = kwargs.get('title', None)
+
+        # 字体家族以及字号，默认与第一个子图的光谱相同
+        primary = self.panels[0][0]
+        self.font_family = kwargs.get('font_family', primary.font_family)
+        self.font_size = kwargs.get('font_size', primary.font_size)
+
+        # 保存的格式、dpi 以及文件名，与 Spectrum 相同
+        self.save_format = kwargs.get('save_format', 'png')
+        self.save_dpi = kwargs.get('save_dpi', 400.0)
+        self.name = kwargs.get('name', 'grid')
+        self.name_template = kwargs.get('name_template', '{name}')
+        self.overwrite = kwargs.get('overwrite', False)
+
+        # 保留的图片，以及每个叠加的光谱绘制的曲线
+        self._figure = None
+        self._overlays = []
+
+    def __str__(self):
+        return f"Grid Object:\n" \
+               f"  panels: {len(self.panels)}\n" \
+               f"  spectra: {sum(len(spectra) for spectra in self.panels)}\n" \
+               f"  rows: {self.rows}\n" \
+               f"  cols: {self.cols}\n" \
+               f"  figure_size: {self.figure_size}\n" \
+               f"  share: {self.share}\n" \
+               f"  title: {self.title}\n" \
+               f"  save_format: {self.save_format}\n" \
+               f"  save_dpi: {self.save_dpi}\n"
+
+    # 保存的格式以及 dpi 与 Spectrum 的处理方式相同
+    save_formats = Spectrum.save_formats
+    dpi_of = Spectrum.dpi_of
+
+    def style(self):
+        """
+        返回应用整张图片风格样式的上下文，所有子图共用同一套样式
+
+        Returns:
+            context(contextmanager): style_context 返回的上下文
+        """
+        return style_context(self.font_family, self.font_size)
+
+    def build_figure(self, dpi):
+        """
+        创建多子图的图片，并在每个子图上绘制光谱
+
+        Args:
+            dpi(float): 保存图片的 dpi，用于曲线的降采样
+        """
+        fig, axs = new_figure(self.figure_size, share=self.share, nrows=self.rows, ncols=self.cols)
+
+        # 降采样按照每个子图的宽度计算
+        panel_size = (self.figure_size[0] / self.cols, self.figure_size[1] / self.rows)
+        self._overlays = []
+        for ax, spectra in zip(axs, self.panels):
+            primary, overlays = spectra[0], spectra[1:]
+            for spectrum in spectra:
+                spectrum.figure_size = panel_size
+            # 先绘制叠加的曲线，使得第一个光谱创建的图例包含所有的曲线
+            for spectrum in overlays:
+                self._overlays.append({
+                    'spectrum': spectrum, 'curves': spectrum.draw_curves(ax, dpi),
+                    'style': self._overlay_style(spectrum), 'curve_key': spectrum._curve_key(dpi),
+                })
+            primary.attach(fig, ax, dpi, panel=True)
+
+        # 隐藏多余的子图
+        for ax in axs[len(self.panels):]:
+            ax.set_visible(False)
+
+        if self.title is not None:
+            fig.format(suptitle=self.title)
+
+        self._figure = fig
+
+    def prepare_figure(self, dpi):
+        """
+        创建或者原地更新保留的图片，与 Spectrum.prepare_figure 相同
+
+        Args:
+            dpi(float): 保存图片的 dpi，用于曲线的降采样
+
+        Returns:
+            fig(proplot.Figure): 保留的图片
+        """
+        with self.style(), profiling.stage('plot'):
+            if self._needs_rebuild():
+                self.close()
+                self.build_figure(dpi)
+            else:
+                # 图片已经存在时，只原地更新每个子图以及叠加的曲线
+                for overlay in self._overlays:
+                    spectrum = overlay['spectrum']
+                    curve_key = spectrum._curve_key(dpi)
+                    if curve_key != overlay['curve_key']:
+                        curve_x, curve_y = spectrum.plot_curves(dpi)
+                        for i, curve in enumerate(overlay['curves']):
+                            curve.set_data(curve_x[:, i], curve_y[:, i])
+                        overlay['curve_key'] = curve_key
+                for spectra in self.panels:
+                    spectra[0].update_figure(dpi)
+
+        return self._figure
+
+    @staticmethod
+    def _overlay_style(spectrum):
+        # 叠加的光谱中无法原地修改的属性，图例文本也包括在内，使得第一个光谱重新创建的图例包含新的文本
+        return spectrum.style_state(), tuple(spectrum.legend_text or ())
+
+    def _needs_rebuild(self):
+        # 没有图片，或者任何一个子图的第一个光谱以及叠加的光谱需要重新创建时，重新创建整张图片
+        return (
+            self._figure is None or any(spectra[0]._needs_rebuild() for spectra in self.panels)
+            or any(overlay['style'] != self._overlay_style(overlay['spectrum']) for overlay in self._overlays)
+        )
+
+    def close(self):
+        """
+        关闭保留的图片，释放其占用的内存
+        """
+        if self._figure is not None:
+            for spectra in self.panels:
+                for spectrum in spectra:
+                    spectrum.close()
+            # 图片没有注册到 pyplot 中，释放引用即可
+            self._figure = None
+            self._overlays = []
+
+    def draw_spectrum(self, save_dir=None, verbose=True):
+        """
+        绘制并保存整张图片，与 Spectrum.draw_spectrum 相同
+
+        Args:
+            save_dir(str): 保存的文件夹，默认为 None，即当前文件夹
+            verbose(bool): 是否在屏幕上打印保存成功的信息，默认为 True
+
+        Returns:
+            save_name(str or list[str]): 保存的文件路径，save_format 为列表时返回每个格式的文件路径
+        """
+        formats = self.save_formats()
+        if not formats:
+            raise ValueError("save_format must contain at least one format.")
+        # 降采样按照最高的 dpi 计算
+        dpi = max(self.dpi_of(save_format) for save_format in formats)
+
+        from KimariDraw import naming
+
+        stem = naming.format_stem(self.name_template, name=self.name)
+        with self.style():
+            fig = self.prepare_figure(dpi)
+            save_names = save_figure(fig, save_dir, stem, formats, self.dpi_of, overwrite=self.overwrite)
+        if verbose:
+            print("Saving successful!\n")
+
+        return save_names[0] if isinstance(self.save_format, str) else save_names
+
+
+def overlay_limits(spectra):
+    """
+    根据叠加在同一个子图上的所有光谱计算整齐的 x 轴以及左 y 轴刻度
+
+    Args:
+        spectra(list[Spectrum]): 叠加的光谱，第一个光谱的 limit_padding 用于所有光谱
+
+    Returns:
+        x_limit(list[float, float, float]): x 轴的刻度
+        left_y_limit(list[float, float, float]): 左 y 轴的刻度
+    """
+    # 直接使用每个光谱预先计算好的统计量
+    x_ranges = [spectrum.curve_stats.range(0) for spectrum in spectra]
+    y_ranges = [spectrum.curve_stats.range(slice(1, None)) for spectrum in spectra]
+    padding = spectra[0].limit_padding
+
+    x_limit = Spectrum.limit_from_range(min(low for low, _ in x_ranges), max(high for _, high in x_ranges), padding)
+    left_y_limit = Spectrum.limit_from_range(min(low for low, _ in y_ranges), max(high for _, high in y_ranges),
+                                             padding)
+
+    return x_limit, left_y_limit
+
+
+def load_jobs(files, workers=None):
+    """
+    使用线程池并行读取若干个 toml 文件以及其中的数据，重复的文件只读取一次
+
+    Args:
+        files(list[str]): toml 文件路径
+        workers(int): 线程数，默认为 None，即 CPU 的核数与文件数中较小的一个
+
+    Returns:
+        spectra(dict[str, Spectrum]): 文件的绝对路径到 Spectrum 对象的映射
+    """
+    unique = list(dict.fromkeys(os.path.abspath(file) for file in files))
+    if workers is None:
+        workers = min(os.cpu_count() or 1, len(unique))
+
+    # 读取数据的时间主要花在文件读取以及 NumPy 解析上，线程池可以并行，并且不需要在进程之间传递数据
+    if workers <= 1:
+        return {file: create_spectrum(file) for file in unique}
+
+    # concurrent.futures 的导入需要十几毫秒，只在需要并行读取时导入
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(unique, executor.map(create_spectrum, unique)))
+
+
+def grid_from_config(toml_data, current_folder, name=None):
+    """
+    根据包含 [grid] 表的 toml 文件的内容创建 Grid 对象
+
+    Notes:
+        1. [grid] 表设置整张图片：rows、cols、figure_size、share、title、font_family、font_size、save_format、
+           save_dpi、name_template、overwrite 以及读取数据的线程数 workers
+        2. 每个 [[panels]] 表为一个子图，jobs 为叠加在这个子图上的光谱的 toml 文件，相对路径相对于 current_folder。
+           第一个 toml 文件决定子图的坐标轴，可以使用 title、x_label、left_y_label、right_y_label、x_limit、
+           left_y_limit、right_y_limit、legend、zero 以及 line 覆盖
+        3. 叠加了多个光谱的子图，没有指定的 x 轴以及左 y 轴刻度根据所有光谱计算，默认显示图例，
+           没有图例文本的光谱以 toml 文件的文件名作为图例
+
+    Args:
+        toml_data(dict): toml 文件的内容
+        current_folder(str): 相对路径所相对的文件夹
+        name(str): 图片的名字，用于生成文件名，默认为 None，即 grid
+
+    Returns:
+        grid(Grid): 初始化好的 Grid 对象
+    """
+    options = dict(toml_data.get('grid') or {})
+    unknown = set(options) - GRID_OPTIONS
+    if unknown:
+        raise ValueError(f"Unknown keys in the 'grid' configuration: {', '.join(sorted(unknown))}")
+    panels = toml_data.get('panels')
+    if not panels:
+        raise ValueError("Missing 'panels' configuration. A grid requires at least one [[panels]] table.")
+
+    def resolve(file):
+        return file if os.path.isabs(file) else os.path.join(current_folder, file)
+
+    # 每个子图的 toml 文件
+    panel_files = []
+    for panel in panels:
+        unknown = set(panel) - set(PANEL_OPTIONS) - {'jobs', 'job'}
+        if unknown:
+            raise ValueError(f"Unknown keys in the 'panels' configuration: {', '.join(sorted(unknown))}")
+        jobs = panel.get('jobs', panel.get('job'))
+        if not jobs:
+            raise ValueError("Each [[panels]] table must contain 'jobs'.")
+        panel_files.append([resolve(file) for file in ([jobs] if isinstance(jobs, str) else jobs)])
+
+    # 所有子图的数据一起并行读取
+    with profiling.stage('load'):
+        loaded = load_jobs([file for files in panel_files for file in files], options.pop('workers', None))
+
+    spectra_panels = []
+    for panel, files in zip(panels, panel_files):
+        # 每个子图使用 Spectrum 的浅复制，同一个 toml 文件出现在多个子图中时，数据仍然只有一份，而刻度等属性互不影响
+        spectra = [copy.copy(loaded[os.path.abspath(file)]) for file in files]
+
+        primary = spectra[0]
+        if len(spectra) > 1:
+            # 叠加的光谱共用同一套刻度，并且以文件名作为没有图例文本的光谱的图例
+            x_limit, left_y_limit = overlay_limits(spectra)
+            for spectrum in spectra:
+                spectrum.x_limit = x_limit
+                if not any(spectrum.legend_text or []):
+                    spectrum.legend_text = [spectrum.name] + [None] * (spectrum.curve_stats.columns - 2)
+            primary.left_y_limit = left_y_limit
+            primary.is_legend = True
+
+        for key, attribute in PANEL_OPTIONS.items():
+            if key in panel:
+                setattr(primary, attribute, panel[key])
+        # 手动指定的 x 轴刻度也用于叠加的光谱的降采样
+        for spectrum in spectra[1:]:
+            spectrum.x_limit = primary.x_limit
+        spectra_panels.append(spectra)
+
+    if 'figure_size' in options:
+        options['figure_size'] = tuple(options['figure_size'])
+    options.setdefault('name', name if name is not None else 'grid')
+
+    return Grid(spectra_panels, **options)
@@ -20,18 +20,17 @@ For details, see the LICENSE file.
 """
 import argparse
 import sys
-import wx
-import math
 import os
+import threading
 
-import numpy as np
-import pandas as pd
-import proplot as pplt
-import toml
-
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from proplot import rc
+
+from KimariDraw import profiling
+
+# 注意：wx、numpy、pandas、proplot 以及 toml 的导入都非常耗时，尤其是 wx 和 proplot。
+# 因此这些模块只在真正用到它们的函数中导入，这样 kimaridraw --version 以及无交互的 render 子命令就不需要为 GUI 和绘图付出启动时间
 
 # 获取当前文件被修改的最后一次时间
 time_last = os.path.getmtime(os.path.abspath(__file__))
@@ -42,6 +41,10 @@ __address__ = "XiaMen University, School of Electronic Science and Engineering"
 __website__ = "https://github.com/kimariyb/kimariDraw"
 __release__ = str(datetime.fromtimestamp(time_last).strftime("%b-%d-%Y"))
 
+# proplot 的 rc 以及 matplotlib 的 rcParams 是进程内共享的，创建、修改以及保存图片时都需要持有这个锁，
+# 使得多个线程可以在同一个进程中安全地绘制光谱，见 style_context
+RENDER_LOCK = threading.RLock()
+
 
 class Spectrum:
     """
@@ -52,6 +55,9 @@ class Spectrum:
         left_y_limit (list[float, float, float]): 左 y 轴的刻度，最小值、最大值以及间距
         right_y_limit (list[float, float, float]): 右 y 轴的刻度，最小值、最大值以及间距
         x_label (str): x 轴的标签
+        x_unit (str): x 轴的单位，nm、eV 或者 cm-1，默认为 None，即未知的单位，只用于第二个 x 轴
+        secondary_unit (str): 图片顶部第二个 x 轴的单位，默认为 None，即不显示。需要同时设置 x_unit
+        secondary_label (str): 第二个 x 轴的标签，默认为 None，即根据 secondary_unit 生成
         left_y_label (str): y 轴标签，左 y 轴标签
         right_y_label (str): y 轴标签，右 y 轴标签
         title (str): 标题
@@ -65,23 +71,53 @@ class Spectrum:
         is_legend (bool): 是否开启图例
         is_zero (bool): 是否显示零坐标轴
         is_showLine (bool): 是否显示直线，如果 Spectrum.lineData != None，则为 True
-        save_format (str): 保存光谱的格式，如 png, jpg, svg 等
-        save_dpi (float): 保存光谱的分辨率 dpi
-        lineData (DataFrame): 直线数据
-        curveData (DataFrame): 曲线数据
+        save_format (str or list[str]): 保存光谱的格式，如 png, jpg, svg 等，也可以是多个格式的列表
+        save_dpi (float or dict[str, float]): 保存光谱的分辨率 dpi，也可以是每个格式各自的 dpi
+        downsample (bool): 绘图前是否对过密的曲线降采样
+        name (str): 光谱的名字，通常为 toml 文件的文件名，用于生成保存的文件名
+        name_template (str): 保存的文件名模板，默认为 {name}
+        name_fields (dict[str, str]): 文件名模板中 name 之外的字段，例如参数扫描中每个参数的值
+        overwrite (bool): 是否覆盖已有的同名文件，默认为 False，即在文件名后添加编号
+        lineData (DataFrame): 直线数据，也可以传入 NumPy 数组或者 LineData。读取时才转换为 DataFrame
+        curveData (DataFrame): 曲线数据，也可以传入 NumPy 数组或者 CurveData，第一列为 x，其他列为 y。读取时才转换为 DataFrame
+        curve (CurveData): 内部保存的曲线数据，所有曲线共用一个 x，y 为一块连续的二维数组
+        line (LineData): 内部保存的直线数据，没有直线数据时为 None
+        dtype (str): 曲线 y 的精度，float64 或者 float32，默认为 None，即 float32 的输入保持 float32，其他为 float64
+        curve_stats (ColumnStats): 曲线数据每一列的统计量
+        line_stats (ColumnStats): 直线数据每一列的统计量，没有直线数据时为 None
     """
 
     def __init__(self, **kwargs):
         # 构造函数逻辑
 
-        # 曲线数据 DataFrame，必须传入的参数
-        self.curveData = kwargs.get('curveData')
-        # 直线数据 DataFrame
-        self.lineData = kwargs.get('lineData')
+        from KimariDraw.data import CurveData, LineData
+
+        # 曲线 y 的精度，大量光谱同时保存在内存中时可以使用 float32 减少一半的内存
+        self.dtype = kwargs.get('dtype', None)
+        # 曲线数据，必须传入的参数。可以是 DataFrame、NumPy 数组或者 CurveData，内部保存为 CurveData
+        self.curve = CurveData.coerce(kwargs.get('curveData'), self.dtype)
+        # 直线数据，可以是 DataFrame、NumPy 数组或者 LineData，内部保存为 LineData
+        self.line = LineData.coerce(kwargs.get('lineData'))
+
+        # 每一列数据的最小值、最大值、是否存在负数以及是否全部为有限值，只在读取数据时计算一次，之后的刻度、零坐标轴等都直接使用
+        self.update_stats()
 
         # x 轴的标签 string，默认为 x label，可以为 None
         self.x_label = kwargs.get('x_label', 'X Label')
 
+        # x 轴的单位以及顶部第二个 x 轴的单位 string，第二个 x 轴的刻度由 x 轴换算得到，不需要转换数据
+        self.x_unit = kwargs.get('x_unit', None)
+        self.secondary_unit = kwargs.get('secondary_unit', None)
+        if self.x_unit is not None or self.secondary_unit is not None:
+            from KimariDraw import units
+
+            if self.secondary_unit is not None and self.x_unit is None:
+                raise ValueError("'secondary_unit' requires 'x_unit' to be set.")
+            self.x_unit = units.normalize_unit(self.x_unit)
+            self.secondary_unit = None if self.secondary_unit is None else units.normalize_unit(self.secondary_unit)
+        # 第二个 x 轴的标签 string，默认为 None，即使用单位对应的标签
+        self.secondary_label = kwargs.get('secondary_label', None)
+
         # 左 y 轴标签 string，可以为 None
         self.left_y_label = kwargs.get('left_y_label', 'Left Label')
 
@@ -91,13 +127,23 @@ class Spectrum:
         # 标题 string，默认为 title，可以为 None
         self.title = kwargs.get('title', 'Title')
 
+        # 自动生成刻度时两端额外留出的空白 float，为数据范围的比例，默认为 0
+        self.limit_padding = kwargs.get('limit_padding', 0.0)
+
+        # 自动生成 y 轴刻度时两端各忽略的百分比 float，例如 0.5，用于忽略极端值，默认为 None，即使用最小值和最大值
+        self.limit_clip = kwargs.get('limit_clip', None)
+
+        # 只有需要自动生成刻度时才调用 auto_limit()，并且三个坐标轴只调用一次
+        if not {'x_limit', 'left_y_limit', 'right_y_limit'} <= set(kwargs):
+            auto_x_limit, auto_left_y_limit, auto_right_y_limit = self.auto_limit()
+
         # x 轴的刻度，最小值、最大值以及间距，必须为 list[float, float, float]，默认调用调用 auto_lim() 方法自动生成 x_limit
         if 'x_limit' in kwargs:
             self.x_limit = kwargs.get('x_limit')
             if not isinstance(self.x_limit, list) or len(self.x_limit) != 3:
                 raise ValueError("x_limit must be a list of three floats [min, max, step]")
         else:
-            self.x_limit, _, _ = self.auto_limit()
+            self.x_limit = auto_x_limit
 
         # 左 y 轴的刻度，最小值、最大值以及间距，必须为 list[float, float, float]，默认调用调用 auto_lim() 方法自动生成
         if 'left_y_limit' in kwargs:
@@ -105,7 +151,7 @@ class Spectrum:
             if not isinstance(self.left_y_limit, list) or len(self.left_y_limit) != 3:
                 raise ValueError("left_y_limit must be a list of three floats [min, max, step]")
         else:
-            _, self.left_y_limit, _ = self.auto_limit()
+            self.left_y_limit = auto_left_y_limit
 
         # 右 y 轴的刻度，最小值、最大值以及间距，必须为 list[float, float, float]，默认调用调用 auto_lim() 方法自动生成
         if 'right_y_limit' in kwargs:
@@ -113,7 +159,7 @@ class Spectrum:
             if not isinstance(self.right_y_limit, list) or len(self.right_y_limit) != 3:
                 raise ValueError("right_y_limit must be a list of three floats [min, max, step]")
         else:
-            _, _, self.right_y_limit = self.auto_limit()
+            self.right_y_limit = auto_right_y_limit
 
         # 字体家族 string，默认为 Arial
         self.font_family = kwargs.get('font_family', 'Arial')
@@ -165,35 +211,55 @@ class Spectrum:
             self.legend_text = None
 
         # 是否开启图例 bool，根据 curveData 自动判断
-        if self.curveData.shape[1] >= 3:
+        if self.curve_stats.columns >= 3:
             self.is_legend = kwargs.get('is_legend', True)
         else:
             self.is_legend = kwargs.get('is_legend', False)
 
         # 是否显示零坐标轴 bool，根据 curveData 自动判断
-        if (self.curveData.iloc[:, 1:].values < 0).any():
+        if self.curve_stats.negative[1:].any():
             self.is_zero = kwargs.get('is_zero', True)
         else:
             self.is_zero = kwargs.get('is_zero', False)
 
         # 是否显示直线 bool，根据 lineData 是否为 None 判断
-        if self.lineData is not None:
+        if self.line is not None:
             self.is_showLine = kwargs.get('is_showLine', True)
         else:
             self.is_showLine = kwargs.get('is_showLine', False)
 
-        # 保存光谱的格式 string，分别可以为 png, jpg, svg ...，默认为 png
+        # 保存光谱的格式 string，分别可以为 png, jpg, svg ...，默认为 png。也可以是一个 list[string...]，一次保存多个格式
         self.save_format = kwargs.get('save_format', 'png')
 
-        # 保存光谱的分辨率 dpi float，默认为 400
+        # 保存光谱的分辨率 dpi float，默认为 400。也可以是一个 dict，例如 {'png': 600, 'jpg': 300}，没有指定的格式为 400
         self.save_dpi = kwargs.get('save_dpi', 400.0)
 
+        # 绘图前是否对过密的曲线降采样 bool，默认为 True。降采样保留每个像素内的最大值和最小值，不会改变峰的形状
+        self.downsample = kwargs.get('downsample', True)
+
+        # 光谱的名字 string，默认为 figure。从 toml 文件创建时为 toml 文件的文件名
+        self.name = kwargs.get('name', 'figure')
+
+        # 保存的文件名模板 string，默认为 {name}，例如 {name}_uv
+        self.name_template = kwargs.get('name_template', '{name}')
+
+        # 文件名模板中 name 之外的字段 dict，默认为空，参数扫描中为每个参数的值
+        self.name_fields = kwargs.get('name_fields', {})
+
+        # 是否覆盖已有的同名文件 bool，默认为 False，即依次尝试 name、name_1、name_2 ...
+        self.overwrite = kwargs.get('overwrite', False)
+
+        # 保留的图片，由 draw_spectrum 创建，之后的修改都在这张图片上原地进行
+        self._figure = None
+
     def __str__(self):
         return f"Spectrum Object:\n" \
                f"  x_limit: {self.x_limit}\n" \
                f"  left_y_limit: {self.left_y_limit}\n" \
                f"  right_y_limit: {self.right_y_limit}\n" \
                f"  x_label: {self.x_label}\n" \
+               f"  x_unit: {self.x_unit}\n" \
+               f"  secondary_unit: {self.secondary_unit}\n" \
                f"  left_y_label: {self.left_y_label}\n" \
                f"  right_y_label: {self.right_y_label}\n" \
                f"  title: {self.title}\n" \
@@ -208,8 +274,47 @@ class Spectrum:
                f"  is_zero: {self.is_zero}\n" \
                f"  save_format: {self.save_format}\n" \
                f"  save_dpi: {self.save_dpi}\n" \
-               f"  lineData: {self.lineData}\n" \
-               f"  curveData: {self.curveData}\n"
+               f"  downsample: {self.downsample}\n" \
+               f"  lineData: {self.line}\n" \
+               f"  curveData: {self.curve}\n"
+
+    @property
+    def curveData(self):
+        """
+        曲线数据的 DataFrame，每次读取都会从 curve 转换，内部的计算不使用这个属性
+        """
+        return self.curve.to_frame()
+
+    @curveData.setter
+    def curveData(self, data):
+        from KimariDraw.data import CurveData
+
+        self.curve = CurveData.coerce(data, self.dtype)
+        self.update_stats()
+
+    @property
+    def lineData(self):
+        """
+        直线数据的 DataFrame，没有直线数据时为 None
+        """
+        return None if self.line is None else self.line.to_frame()
+
+    @lineData.setter
+    def lineData(self, data):
+        from KimariDraw.data import LineData
+
+        self.line = LineData.coerce(data)
+        self.update_stats()
+
+    def update_stats(self):
+        """
+        计算 curve 以及 line 每一列的统计量。通过 curveData 或 lineData 替换数据时会自动调用，直接替换 curve 或 line 之后需要调用
+
+        Returns:
+            None
+        """
+        self.curve_stats = self.curve.stats()
+        self.line_stats = self.line.stats() if self.line is not None else None
 
     @staticmethod
     def calculate_limit(array):
@@ -222,18 +327,26 @@ class Spectrum:
         Returns:
             list[float, float, float]: 包含最小值、最大值和间隔的限制列表。
         """
-        # 首先计算最大值和最小值
-        min_value = np.min(array)
-        max_value = np.max(array)
-        # 拿到最大值最小值的间距
-        data_range = max_value - min_value
-        # 生成刻度的最小值、最大值以及间距
-        interval = math.ceil(data_range / 5 / 10) * 10
-        upper_limit = math.ceil(max_value / interval) * interval
-        lower_limit = math.floor(min_value / interval) * interval
-        limit = [lower_limit, upper_limit, interval]
+        import numpy as np
+
+        return Spectrum.limit_from_range(np.min(array), np.max(array))
+
+    @staticmethod
+    def limit_from_range(min_value, max_value, padding=0.0):
+        """
+        根据最小值和最大值计算限制值。间隔为 1、2 或者 5 乘以 10 的整数次幂，因此 1E-3 这样的小数据也能得到合适的刻度
 
-        return limit
+        Args:
+            min_value (float): 最小值。
+            max_value (float): 最大值。
+            padding (float): 两端额外留出的空白，为数据范围的比例。
+
+        Returns:
+            list[float, float, float]: 包含最小值、最大值和间隔的限制列表。
+        """
+        from KimariDraw import ticks
+
+        return ticks.as_limit(ticks.nice_limits(min_value, max_value, padding=padding))
 
     def auto_limit(self):
         """
@@ -244,151 +357,348 @@ class Spectrum:
         Returns:
             limit(list[float, float, float]): 分别返回 x_limit, left_y_limit, right_y_limit
         """
-        # 拿到 curveData x 数据
-        x_array = np.array(self.curveData.iloc[:, 0])
-        x_limit = self.calculate_limit(x_array)
-
-        # 拿到 left_y 数据
-        left_y_array = np.array((self.curveData.iloc[:, 1:]))
-        left_y_limit = self.calculate_limit(left_y_array)
+        import numpy as np
+        from KimariDraw import ticks
+
+        # 直接使用预先计算好的每一列的最小值和最大值，不需要再扫描数据
+        # curveData 的第一列为 x 数据，其他列为 left_y 数据，lineData 除第一列以外为 right_y 数据
+        ranges = [self.curve_stats.range(0), self.curve_stats.range(slice(1, None))]
+        if self.line is not None:
+            ranges.append(self.line_stats.range(slice(1, None)))
+
+        # 按照百分位数忽略 y 数据两端的极端值，此时需要扫描数据
+        if self.limit_clip is not None:
+            low, high = ticks.data_range(self.curve.y, self.limit_clip)
+            ranges[1] = (np.nanmin(low), np.nanmax(high))
+            if self.line is not None:
+                low, high = ticks.data_range(self.line.y, self.limit_clip)
+                ranges[2] = (np.nanmin(low), np.nanmax(high))
+
+        # 三个坐标轴一起计算
+        minimum, maximum = np.array(ranges, dtype=np.float64).T
+        limits = [ticks.as_limit(limit) for limit in ticks.nice_limits(minimum, maximum, padding=self.limit_padding)]
+        x_limit, left_y_limit = limits[0], limits[1]
 
         # 判断 lineData 是否存在，如果为 None 则直接返回 None，如果不为 None 则将自动生成 right_y_limit
-        if self.lineData is not None:
-            # 拿到 right_y 数据
-            right_y_array = np.array((self.lineData.iloc[:, 1:]))
-            right_y_limit = self.calculate_limit(right_y_array)
+        if self.line is not None:
+            right_y_limit = limits[2]
         else:
             right_y_limit = None
             self.right_y_label = None
 
         return x_limit, left_y_limit, right_y_limit
 
-    def draw_spectrum(self):
+    def plot_curves(self, dpi):
         """
-        当实例化一个 Spectrum 对象后，就可以调用 draw_spectrum 方法绘制光谱
+        得到绘图所用的曲线数据。如果开启了降采样，则根据图片的宽度和 dpi 对曲线降采样
 
-        Warnings:
-            调用 draw_spectrum 时会自动保存光谱在当前文件夹下
+        Args:
+            dpi(float): 保存图片的 dpi
 
-        Examples:
-            spectrum = init_spectrum(**kwargs)
-            spectrum.draw_spectrum()
+        Returns:
+            curve_x(numpy.ndarray): 形状为 (点数, 曲线数) 的 x，每一列对应一条曲线
+            curve_y(numpy.ndarray): 形状为 (点数, 曲线数) 的 y
+        """
+        import numpy as np
+        from KimariDraw.downsample import downsample_curves
+
+        x, ys = self.curve.x, self.curve.y
+        if self.downsample:
+            return downsample_curves(x, ys, self.figure_size[0], dpi, self.x_limit)
+
+        return np.broadcast_to(x[:, None], ys.shape), ys
+
+    def style_state(self):
+        """
+        返回创建图片时就已经确定、无法原地修改的属性，这些属性发生变化时需要重新创建图片
 
         Returns:
-            None
+            state(tuple): 字体、图片大小、曲线的数目、颜色和样式以及第二个 x 轴的单位
         """
-        # 设置全局属性，也就是图片的风格样式
-        rc['font.family'] = self.font_family
-        rc['title.size'] = self.font_size[2]
-        rc['label.size'] = self.font_size[1]
-        rc['font.size'] = self.font_size[0]
-        rc['tick.width'] = 1.3
-        rc['meta.width'] = 1.3
-        rc['title.weight'] = 'bold'
-        rc['title.pad'] = 10.0
-        rc['axes.labelpad'] = 8.0
-        rc['label.weight'] = 'bold'
-        rc['tick.labelweight'] = 'bold'
-        rc['ytick.major.size'] = 4.6
-        rc['ytick.minor.size'] = 2.5
-        rc['xtick.major.size'] = 4.6
-        rc['xtick.minor.size'] = 2.5
+        return (
+            self.font_family, tuple(self.font_size), tuple(self.figure_size), self.curve.columns,
+            tuple(self.curve_colors or ()), tuple(self.curve_style or ()), tuple(self.line_colors or ()),
+            self.x_unit if self.secondary_unit is not None else None, self.secondary_unit,
+        )
 
-        # 创建实例用于绘制光谱
-        fig, ax = pplt.subplots(figsize=self.figure_size, share=False)
-
-        # 如果 curveData 的列数比 2 大，则说明绘制的曲线不只一条
-        if len(self.curveData.columns) > 2:
-
-            # 绘制多曲线 curve，从 0 开始循环至 curveData 的列数
-            for i in range(len(self.curveData.columns) - 1):
-                # 第一列作为 x 值，其他列作为 y 值
-                curve_x = self.curveData.iloc[:, 0]
-                curve_y = self.curveData.iloc[:, i + 1]
-                # 绘制多曲线图
-                ax.line(curve_x, curve_y, linewidth=1.3, color=self.curve_colors[i], linestyle=self.curve_style[i],
-                        label=self.legend_text[i])
-
-            # 对 ax 进行格式化处理
-            ax.format(
-                ylocator=self.left_y_limit[2], ylim=(self.left_y_limit[0], self.left_y_limit[1]),
-                yminorlocator=(self.left_y_limit[2] / 2)
-            )
-            if self.is_showLine is True:
-                # 分别拿到 line 的 x 和 y
-                line_x = self.lineData.iloc[:, 0]
-                line_y = self.lineData.iloc[:, 1]
-                # 创建第二个 y 轴
-                ax2 = ax.alty(linewidth=0.8, label=self.right_y_label)
-                # 绘制 line
-                ax2.line(line_x, line_y, color=self.line_colors[0], linewidth=0.8)
-                # 如果开启双 Y 轴，则还需要将 ax2 格式化
-                ax2.format(
-                    ylocator=self.right_y_limit[2],
-                    ylim=(self.right_y_limit[0], self.right_y_limit[1]),
-                    yminorlocator=(self.right_y_limit[2] / 2)
-                )
-
-        # 如果 curveData 的列数等于 2，则说明绘制的曲线为单曲线图
-        elif len(self.curveData.columns) == 2:
-            # 分别拿到 curve 的 x 和 y
-            curve_x = self.curveData.iloc[:, 0]
-            curve_y = self.curveData.iloc[:, 1]
-            # 绘制 curve
-            ax.line(curve_x, curve_y, linewidth=1.3, color=self.curve_colors[0], linestyle=self.curve_style[0],
-                    label=self.legend_text[0])
-            # 对 ax 进行格式化处理
-            ax.format(
-                ylocator=self.left_y_limit[2], ylim=(self.left_y_limit[0], self.left_y_limit[1]),
-                yminorlocator=(self.left_y_limit[2] / 2)
-            )
-            if self.is_showLine is True:
-                # 分别拿到 line 的 x 和 y
-                line_x = self.lineData.iloc[:, 0]
-                line_y = self.lineData.iloc[:, 1]
-                # 创建第二个 y 轴
-                ax2 = ax.alty(linewidth=0.8, label=self.right_y_label)
-                # 绘制 line
-                ax2.line(line_x, line_y, color=self.line_colors[0], linewidth=0.8)
-                # 如果开启双 Y 轴，则还需要将 ax2 格式化
-                ax2.format(
-                    ylocator=self.right_y_limit[2],
-                    ylim=(self.right_y_limit[0], self.right_y_limit[1]),
-                    yminorlocator=(self.right_y_limit[2] / 2)
-                )
+    def style(self):
+        """
+        返回应用图片风格样式的上下文，创建、修改以及保存图片都需要在这个上下文中进行
+
+        Returns:
+            context(contextmanager): style_context 返回的上下文
+        """
+        return style_context(self.font_family, self.font_size)
+
+    def build_figure(self, dpi):
+        """
+        创建图片以及所有的曲线，之后的修改都在这张图片上原地进行
+
+        Args:
+            dpi(float): 保存图片的 dpi，用于曲线的降采样
+        """
         # 如果 curveData 的列数比 2 还小，则说明绘制的曲线数据存在问题
-        else:
+        if self.curve.columns < 2:
             raise Exception(
                 "The curve data has fewer columns than expected (less than 2). "
                 "There is an issue with the plotted curve data."
             )
-        # 如果开启显示图例，则执行下面的代码
+
+        # 创建实例用于绘制光谱
+        fig, ax = new_figure(self.figure_size, share=False)
+        self.attach(fig, ax, dpi)
+
+    def attach(self, fig, ax, dpi, panel=False):
+        """
+        在已有的坐标轴上绘制光谱，用于单独的图片，也用于多子图的图片中的一个子图
+
+        Notes:
+            panel 为 True 时，x 轴标签以及标题只应用到这个坐标轴上
+
+        Args:
+            fig(proplot.Figure): 坐标轴所在的图片
+            ax(proplot.Axes): 绘制光谱的坐标轴
+            dpi(float): 保存图片的 dpi，用于曲线的降采样
+            panel(bool): 是否为多子图的图片中的一个子图，默认为 False
+        """
+        curves = self.draw_curves(ax, dpi)
+
+        # 记录图片中的各个对象，以及已经应用到这些对象上的属性
+        self._figure = {
+            'fig': fig, 'ax': ax, 'curves': curves, 'ax2': None, 'line': None, 'legend': None, 'zero': None,
+            'dual': None, 'style': self.style_state(), 'curve_key': self._curve_key(dpi), 'line_key': None,
+            'legend_key': None, 'panel': panel,
+        }
+        self.update_figure(dpi)
+
+    def draw_curves(self, ax, dpi):
+        """
+        在坐标轴上绘制全部的曲线，多子图的图片中叠加在同一个坐标轴上的光谱也使用这个方法
+
+        Args:
+            ax(proplot.Axes): 绘制曲线的坐标轴
+            dpi(float): 保存图片的 dpi，用于曲线的降采样
+
+        Returns:
+            curves(list[matplotlib.lines.Line2D]): 绘制的曲线
+        """
+        # 绘图所用的曲线数据，默认会根据图片的像素宽度降采样
+        curve_x, curve_y = self.plot_curves(dpi)
+
+        # 绘制曲线 curve，第一列作为 x 值，其他列作为 y 值，从 0 开始循环至 curveData 的列数
+        curves = []
+        for i in range(self.curve.columns - 1):
+            curves.extend(ax.line(curve_x[:, i], curve_y[:, i], linewidth=1.3, color=_pick(self.curve_colors, i),
+                                  linestyle=_pick(self.curve_style, i, '-'), label=_pick(self.legend_text, i)))
+
+        return curves
+
+    def update_figure(self, dpi):
+        """
+        将 Spectrum 的属性原地应用到已经创建的图片上，只修改发生变化的部分
+
+        Notes:
+            1. 坐标轴的范围、刻度、标签以及标题直接原地修改
+            2. 曲线和直线的数据发生变化时，使用 set_data 更新数据，不会重新创建曲线
+            3. 图例、零坐标轴以及直线所在的第二个 y 轴根据开关添加或移除
+            4. 顶部第二个 x 轴只创建一次，刻度由 x 轴的范围通过单位换算得到，x 轴的范围变化时自动更新
+
+        Args:
+            dpi(float): 保存图片的 dpi，用于曲线的降采样
+        """
+        figure = self._figure
+        fig, ax = figure['fig'], figure['ax']
+
+        # 曲线的数据或者降采样的分辨率发生变化时更新曲线的数据
+        curve_key = self._curve_key(dpi)
+        if curve_key != figure['curve_key']:
+            curve_x, curve_y = self.plot_curves(dpi)
+            for i, curve in enumerate(figure['curves']):
+                curve.set_data(curve_x[:, i], curve_y[:, i])
+            figure['curve_key'] = curve_key
+
+        # 对 ax 进行格式化处理
+        ax.format(
+            ylocator=self.left_y_limit[2], ylim=(self.left_y_limit[0], self.left_y_limit[1]),
+            yminorlocator=(self.left_y_limit[2] / 2)
+        )
+
+        if self.is_showLine is True:
+            # 分别拿到 line 的 x 和 y
+            line_x = self.line.x
+            line_y = self.line.y[:, 0]
+            if figure['ax2'] is None:
+                # 创建第二个 y 轴
+                figure['ax2'] = ax.alty(linewidth=0.8, label=self.right_y_label)
+                # 绘制 line
+                figure['line'] = figure['ax2'].line(line_x, line_y, color=self.line_colors[0], linewidth=0.8)[0]
+            elif figure['line_key'] != self.line.version:
+                figure['line'].set_data(line_x, line_y)
+            figure['line_key'] = self.line.version
+            # 如果开启双 Y 轴，则还需要将 ax2 格式化
+            figure['ax2'].format(
+                ylabel=self.right_y_label, ylocator=self.right_y_limit[2],
+                ylim=(self.right_y_limit[0], self.right_y_limit[1]), yminorlocator=(self.right_y_limit[2] / 2)
+            )
+
+        # 如果开启显示图例，则显示图例，图例的文本发生变化时重新创建图例，新的图例会替换掉旧的图例
         if self.is_legend is True:
-            ax.legend(loc='ur', ncols=1, fontweight='bold', fontsize=12.5, frame=False, bbox_to_anchor=(0.95, 0.96))
-        # 如果开启显示 Zero 轴，则执行下面的代码
-        if self.is_zero is True:
-            # 显示 Zero 轴
-            ax.axhline(y=0, color='black', linewidth=1.25)
-
-        # 最后调用 fig.format 处理 x 轴和标题
-        fig.format(
+            legend_key = tuple(self.legend_text or ())
+            if figure['legend'] is None or figure['legend_key'] != legend_key:
+                for curve, text in zip(figure['curves'], self.legend_text or ()):
+                    curve.set_label(text)
+                figure['legend'] = ax.legend(loc='ur', ncols=1, fontweight='bold', fontsize=12.5, frame=False,
+                                             bbox_to_anchor=(0.95, 0.96))
+                figure['legend_key'] = legend_key
+            figure['legend'].set_visible(True)
+        elif figure['legend'] is not None:
+            figure['legend'].set_visible(False)
+
+        # 如果开启显示 Zero 轴，则添加 Zero 轴，否则移除 Zero 轴
+        if self.is_zero is True and figure['zero'] is None:
+            figure['zero'] = ax.axhline(y=0, color='black', linewidth=1.25)
+        elif self.is_zero is not True and figure['zero'] is not None:
+            figure['zero'].remove()
+            figure['zero'] = None
+
+        # 最后调用 fig.format 处理 x 轴和标题，多子图的图片中只处理这个坐标轴
+        target = ax if figure['panel'] else fig
+        target.format(
             xlabel=self.x_label, ylabel=self.left_y_label, title=self.title, grid=False,
             xlocator=self.x_limit[2], xlim=(self.x_limit[0], self.x_limit[1]),
             xminorlocator=(self.x_limit[2] / 2),
         )
 
-        # 文件名初始值
-        save_name = f"figure.{self.save_format}"
-        i = 1
-        # 首先检查当前路径是否存在以 figure.save_type 为文件名的文件
-        while os.path.exists(save_name):
-            # 文件名已存在，添加数字后缀
-            save_name = f"figure{i}.{self.save_format}"
-            i += 1
-        # 保存图像，保存图像的名字为 figure + save_format
-        fig.savefig(save_name, dpi=300, bbox_inches="tight", pad_inches=0.2)
+        # 在顶部添加另一个单位的 x 轴，例如 nm 的光谱同时显示 eV
+        if self.secondary_unit is not None:
+            from KimariDraw import units
+
+            if figure['dual'] is None:
+                figure['dual'] = ax.dualx(units.transforms(self.x_unit, self.secondary_unit))
+            figure['dual'].format(xlabel=self.secondary_label or units.LABELS[self.secondary_unit])
+
+    def close(self):
+        """
+        关闭保留的图片，释放其占用的内存。批量绘制时每个 Spectrum 绘制完成后都需要调用
+        """
+        # 图片没有注册到 pyplot 中，释放引用即可
+        self._figure = None
+
+    def adopt(self, other):
+        """
+        接管另一个光谱保留的图片，之后的绘制只原地修改两者不同的部分，用于参数扫描中依次绘制的光谱
+
+        Notes:
+            两个光谱使用同一个 CurveData 或 LineData 对象时，曲线和直线的数据不会重新设置
+
+        Args:
+            other(Spectrum): 保留了图片的光谱，之后 other 不再保留图片
+        """
+        if other is not self:
+            self.close()
+            self._figure, other._figure = other._figure, None
+
+    def save_formats(self):
+        """
+        返回需要保存的全部格式
+
+        Returns:
+            formats(list[str]): 保存光谱的格式列表
+        """
+        if isinstance(self.save_format, str):
+            return [self.save_format]
+        return list(self.save_format)
+
+    def dpi_of(self, save_format):
+        """
+        返回某个格式保存时的 dpi
+
+        Args:
+            save_format(str): 保存光谱的格式
+
+        Returns:
+            dpi(float): 保存时的 dpi
+        """
+        if isinstance(self.save_dpi, dict):
+            return float(self.save_dpi.get(save_format, 400.0))
+        return float(self.save_dpi)
+
+    def _curve_key(self, dpi):
+        # 影响曲线数据的属性：curve 对象的版本号、降采样的开关以及降采样的分辨率
+        return self.curve.version, self.downsample, tuple(self.x_limit), dpi
+
+    def _needs_rebuild(self):
+        # 没有图片、样式发生变化，或者需要隐藏已经创建的第二个 y 轴时，需要重新创建图片
+        # 移除第二个 y 轴后无法原地恢复主坐标轴右侧的刻度，因此这种情况下重新创建图片
+        return (
+            self._figure is None or self._figure['style'] != self.style_state()
+            or (self._figure['ax2'] is not None and self.is_showLine is not True)
+        )
+
+    def prepare_figure(self, dpi):
+        """
+        创建或者原地更新保留的图片，使其与 Spectrum 的属性一致
+
+        Args:
+            dpi(float): 保存图片的 dpi，用于曲线的降采样
+
+        Returns:
+            fig(proplot.Figure): 保留的图片
+        """
+        with self.style(), profiling.stage('plot'):
+            if self._needs_rebuild():
+                self.close()
+                self.build_figure(dpi)
+            else:
+                self.update_figure(dpi)
+
+        return self._figure['fig']
+
+    def draw_spectrum(self, save_dir=None, verbose=True):
+        """
+        当实例化一个 Spectrum 对象后，就可以调用 draw_spectrum 方法绘制光谱
+
+        Notes:
+            1. 第一次调用时创建图片，之后的调用只会原地修改发生变化的部分，因此在交互界面中重复保存不需要重新绘制整张图片。
+               图片在调用 close 之前会一直保留
+            2. save_format 为列表时，同一张图片会依次保存为每一种格式，文件名相同，只有后缀不同。
+               紧凑边界只计算一次，所有格式共用
+            3. 文件名由 name_template 生成，已经存在时添加编号。文件名通过独占创建分配，图片先写入临时文件再重命名，
+               多个进程同时保存到同一个文件夹时不会相互覆盖，也不会留下不完整的图片
+
+        Args:
+            save_dir(str): 保存光谱的文件夹，默认为 None，即当前文件夹
+            verbose(bool): 是否在屏幕上打印保存成功的信息，默认为 True
+
+        Warnings:
+            调用 draw_spectrum 时会自动保存光谱在 save_dir 文件夹下
+
+        Examples:
+            spectrum = init_spectrum(**kwargs)
+            spectrum.draw_spectrum()
+
+        Returns:
+            save_name(str or list[str]): 保存的光谱文件路径，save_format 为列表时返回每个格式的文件路径
+        """
+        formats = self.save_formats()
+        if not formats:
+            raise ValueError("save_format must contain at least one format.")
+        # 降采样按照最高的 dpi 计算，使得每一种格式都不会损失可见的细节
+        dpi = max(self.dpi_of(save_format) for save_format in formats)
+
+        from KimariDraw import naming
+
+        # 根据模板生成文件名
+        stem = naming.format_stem(self.name_template, name=self.name, **self.name_fields)
+        # 绘制时创建的刻度等对象也会读取样式，因此保存也需要在样式的上下文中进行
+        with self.style():
+            fig = self.prepare_figure(dpi)
+            save_names = save_figure(fig, save_dir, stem, formats, self.dpi_of, overwrite=self.overwrite)
         # 输出保存成功的信息
-        print("Saving successful!\n")
+        if verbose:
+            print("Saving successful!\n")
+
+        return save_names[0] if isinstance(self.save_format, str) else save_names
 
     def set_xlim(self):
         """
@@ -504,6 +814,29 @@ class Spectrum:
             input("Press Enter to continue...\n")
         print("Setting successful!\n")
 
+    def toggle_downsample(self):
+        """
+        设置 Spectrum 的 downsample 属性
+
+
+        Returns:
+            None
+        """
+        print("Type \"r\": Return to main menu")
+        print("0 Turn off downsampling of dense curves")
+        print("1 Turn on downsampling of dense curves")
+        your_input = input("Please enter the option of your choice:\n")
+        if your_input.lower() == "r":
+            return
+        elif your_input == "0":
+            self.downsample = False
+        elif your_input == "1":
+            self.downsample = True
+        else:
+            print("Invalid input. Please press the Enter button and make a valid selection.")
+            input("Press Enter to continue...\n")
+        print("Setting successful!\n")
+
     def set_font_family(self):
         """
         设置 Spectrum 的 font_family 属性
@@ -542,11 +875,12 @@ class Spectrum:
             None
         """
         print("Type \"r\": Return to main menu")
-        your_input = input("Please input format of saving spectrum file, eg. png\n")
+        your_input = input("Please input format of saving spectrum file, eg. png or png,svg,pdf\n")
         if your_input.lower() == "r":
             return
-        # 将输入的内容赋值给 save_format
-        self.save_format = your_input
+        # 将输入的内容赋值给 save_format，多个格式用逗号分隔
+        formats = [save_format.strip() for save_format in your_input.split(',')]
+        self.save_format = formats[0] if len(formats) == 1 else formats
         print("Setting successful!\n")
 
     def set_save_dpi(self):
@@ -557,11 +891,15 @@ class Spectrum:
             None
         """
         print("Type \"r\": Return to main menu")
-        your_input = input("Please input dpi of saving spectrum, eg. 300\n")
+        your_input = input("Please input dpi of saving spectrum, eg. 300 or png=600,jpg=300\n")
         if your_input.lower() == "r":
             return
-        # 将输入的内容赋值给 save_dpi
-        self.save_dpi = float(your_input)
+        # 将输入的内容赋值给 save_dpi，每个格式各自的 dpi 写为 format=dpi，用逗号分隔
+        if "=" in your_input:
+            self.save_dpi = {key.strip(): float(value) for key, value in
+                             (item.split('=') for item in your_input.split(','))}
+        else:
+            self.save_dpi = float(your_input)
         print("Setting successful!\n")
 
     def set_figure_size(self):
@@ -614,30 +952,336 @@ class Spectrum:
             print("Setting successful!\n")
 
 
-def read_path(file_path):
+def style_rc(font_family, font_size):
+    """
+    返回图片的风格样式，单独的光谱以及多子图的图片共用同一套样式
+
+    Args:
+        font_family(str): 字体家族
+        font_size(list[float, float, float]): 常规字号、标签字号以及标题字号
+
+    Returns:
+        settings(dict): proplot 的 rc 设置
+    """
+    return {
+        'font.family': font_family,
+        'title.size': font_size[2],
+        'label.size': font_size[1],
+        'font.size': font_size[0],
+        'tick.width': 1.3,
+        'meta.width': 1.3,
+        'title.weight': 'bold',
+        'title.pad': 10.0,
+        'axes.labelpad': 8.0,
+        'label.weight': 'bold',
+        'tick.labelweight': 'bold',
+        'ytick.major.size': 4.6,
+        'ytick.minor.size': 2.5,
+        'xtick.major.size': 4.6,
+        'xtick.minor.size': 2.5,
+    }
+
+
+@contextmanager
+def style_context(font_family, font_size):
+    """
+    在上下文中临时应用图片的风格样式，退出时恢复原来的设置
+
+    Notes:
+        1. proplot 的 rc 以及 matplotlib 的 rcParams 是进程内共享的，proplot 绘制图片时也会临时修改它们，
+           因此上下文中持有 RENDER_LOCK，多个线程同时绘制时依次进入，样式不会相互混杂
+        2. 锁可以重入，多子图的图片中每个光谱再次进入上下文不会阻塞
+
+    Args:
+        font_family(str): 字体家族
+        font_size(list[float, float, float]): 常规字号、标签字号以及标题字号
+    """
+    from proplot import rc
+
+    with RENDER_LOCK, rc.context(style_rc(font_family, font_size)):
+        yield
+
+
+def new_figure(figure_size, share=False, nrows=1, ncols=1):
+    """
+    创建图片以及子图。图片直接使用 Agg 画布，不注册到 pyplot 中，不依赖也不修改 pyplot 的当前图片等全局状态
+
+    Args:
+        figure_size(tuple[float, float]): 图片的宽度和高度
+        share(bool or int): 子图之间共享坐标轴的程度，与 proplot 的 share 相同
+        nrows(int): 子图的行数
+        ncols(int): 子图的列数
+
+    Returns:
+        fig(proplot.Figure): 图片
+        axs(proplot.SubplotGrid): 子图，只有一个子图时可以直接当作坐标轴使用
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from proplot.figure import Figure
+
+    fig = Figure(figwidth=figure_size[0], figheight=figure_size[1], share=share)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplots(nrows=nrows, ncols=ncols)
+
+
+def _pick(values, index, default=None):
+    # 取出第 index 条曲线的颜色、样式或者图例，没有指定时使用默认值，例如直接传入 NumPy 数组而没有指定每条曲线的样式时
+    if values is None or index >= len(values):
+        return default
+    return values[index]
+
+
+def tight_bbox(fig):
+    """
+    绘制一次图片并计算紧凑边界，与 bbox_inches="tight" 相同，但是只需要计算一次就可以用于多次保存
+
+    Args:
+        fig(proplot.Figure): 需要保存的图片
+
+    Returns:
+        bbox(matplotlib.transforms.Bbox): 紧凑边界，单位为英寸
+    """
+    with profiling.stage('layout'):
+        fig.canvas.draw()
+        return fig.get_tightbbox(fig.canvas.get_renderer()).padded(0.2)
+
+
+def render(spectrum, save_format='png', target=None, dpi=None):
+    """
+    将光谱编码为图片，直接返回图片的内容或者写入 target，不会在屏幕上打印任何信息，也不会在当前文件夹中创建文件
+
+    Notes:
+        1. spectrum 可以是 Spectrum 或者 Grid，图片会被保留，之后再次调用只会原地修改，使用完毕后需要调用 close
+        2. 可以在多个线程中同时调用，绘制以及编码图片的过程由 style_context 中的锁依次进行
+        3. target 可以是任何可写的二进制文件对象，例如 io.BytesIO 或者网络响应，也可以是文件路径
+
+    Args:
+        spectrum(Spectrum or Grid): 需要绘制的光谱
+        save_format(str): 图片的格式，例如 png、svg、pdf，默认为 png
+        target(file-like or str): 写入图片的目标，默认为 None，即返回图片的内容
+        dpi(float): 图片的 dpi，默认为 None，即 spectrum 中这个格式的 dpi
+
+    Examples:
+        spectrum = Spectrum(curveData=numpy.column_stack((x, y)), title=None)
+        png = render(spectrum, 'png')
+        spectrum.close()
+
+    Returns:
+        image(bytes): 图片的内容，指定了 target 时为 None
+    """
+    import io
+
+    dpi = spectrum.dpi_of(save_format) if dpi is None else float(dpi)
+    buffer = io.BytesIO() if target is None else target
+    with spectrum.style():
+        fig = spectrum.prepare_figure(dpi)
+        bbox = tight_bbox(fig)
+        with profiling.stage(f'save.{save_format}'):
+            fig.savefig(buffer, format=save_format, dpi=dpi, bbox_inches=bbox)
+
+    return buffer.getvalue() if target is None else None
+
+
+def save_figure(fig, save_dir, stem, formats, dpi_of, overwrite=False):
+    """
+    将图片保存为每一种格式，文件名相同，只有后缀不同
+
+    Notes:
+        1. 紧凑边界只计算一次，所有格式共用
+        2. 文件名通过独占创建分配，图片先写入临时文件再重命名，多个进程同时保存到同一个文件夹时不会相互覆盖
+
+    Args:
+        fig(proplot.Figure): 需要保存的图片
+        save_dir(str): 保存的文件夹，为 None 时为当前文件夹
+        stem(str): 文件名，不含后缀
+        formats(list[str]): 保存的格式
+        dpi_of(callable): 返回某个格式保存时的 dpi
+        overwrite(bool): 是否覆盖已有的同名文件，默认为 False
+
+    Returns:
+        save_names(list[str]): 每个格式的文件路径
+    """
+    from KimariDraw import naming
+
+    # 紧凑边界 (bbox_inches="tight") 需要在保存时额外绘制一次图片，因此先绘制一次得到紧凑边界，再将其传给每一次保存
+    bbox = tight_bbox(fig)
+
+    # 保存的文件夹，默认为当前文件夹
+    save_dir = save_dir if save_dir is not None else os.curdir
+    # 为每一种格式分配文件路径
+    save_names = naming.claim(save_dir, stem, formats, overwrite=overwrite)
+    try:
+        for save_format, save_name in zip(formats, save_names):
+            # 保存图像，先写入临时文件，因此需要明确指定格式
+            with profiling.stage(f'save.{save_format}'):
+                naming.write_atomic(save_name, lambda path: fig.savefig(
+                    path, format=save_format, dpi=dpi_of(save_format), bbox_inches=bbox))
+    except BaseException:
+        # 保存失败时删除占位文件
+        if not overwrite:
+            naming.release(save_names)
+        raise
+
+    return save_names
+
+
+def read_path(file_path, columns=None, xrange=None, sheet=None, cells=None, conversion=None, line=False):
     """
     读取 toml 文件中 path 所指向的 txt 或 xlxs 文件的内容
 
+    Notes:
+        程序内部使用 read_array 直接得到数组，只有这个对外的接口才包装为 DataFrame
+
     Args:
         file_path: toml 文件中 path 所表示的路径
+        columns(list[int]): 需要读取的列的下标，0 为 x，默认为 None，即全部的列
+        xrange(list[float, float]): 只读取 x 在这个范围内的行，默认为 None，即全部的行，为转换单位之前的 x
+        sheet(str or int): xlsx 文件中表格的名字或者从 0 开始的下标，默认为 None，即第一个表格
+        cells(str): xlsx 文件中读取的单元格范围，例如 B2:E1000，默认为 None，即整个表格
+        conversion(units.Conversion): 读取之后转换 x 的单位，默认为 None，即不转换。转换后的数据按照单位分别缓存
+        line(bool): 是否为直线数据，直线数据转换单位时只转换跃迁的位置，默认为 False
 
     Returns:
         data(DataFrame): 返回一个 Pandas DataFrame 对象
 
     """
+    import pandas as pd
+
+    return pd.DataFrame(read_array(file_path, columns, xrange, sheet, cells, conversion, line))
+
+
+def read_array(file_path, columns=None, xrange=None, sheet=None, cells=None, conversion=None, line=False,
+               cached=True):
+    """
+    读取 toml 文件中 path 所指向的 txt 或 xlsx 文件为 NumPy 数组，读取的结果写入磁盘缓存
+
+    Args:
+        file_path: toml 文件中 path 所表示的路径
+        columns(list[int]): 需要读取的列的下标，0 为 x，默认为 None，即全部的列
+        xrange(list[float, float]): 只读取 x 在这个范围内的行，默认为 None，即全部的行，为转换单位之前的 x
+        sheet(str or int): xlsx 文件中表格的名字或者从 0 开始的下标，默认为 None，即第一个表格
+        cells(str): xlsx 文件中读取的单元格范围，例如 B2:E1000，默认为 None，即整个表格
+        conversion(units.Conversion): 读取之后转换 x 的单位，默认为 None，即不转换。转换后的数据按照单位分别缓存
+        line(bool): 是否为直线数据，直线数据转换单位时只转换跃迁的位置，默认为 False
+        cached(bool): 是否使用磁盘缓存，默认为 True。为 False 时直接解析文件，既不读取也不写入缓存
+
+    Returns:
+        data(numpy.ndarray): 第一列为 x 的二维数组，来自磁盘缓存时为只读的数组
+
+    """
+    from functools import partial
+
+    from KimariDraw import cache
+
     file = Path(file_path)
+    if file.suffix != ".xlsx" and (sheet is not None or cells is not None):
+        raise ValueError("The sheet and cells options are only supported for .xlsx files.")
     # 根据文件的后缀是否为 txt 或者 xlsx 判断
     if file.suffix == ".txt":
-        # 如果是 Multiwfn 输出的 txt 文件，调用 Pandas 的 read_csv 方法读取
-        data = pd.read_csv(file_path, delim_whitespace=True, header=None)
+        from KimariDraw.reader import load_columns
+
+        # 如果是 Multiwfn 输出的 txt 文件，使用专门的解析器读取为 NumPy 数组
+        # 只需要部分列或行时流式读取文件，只保留需要的数据
+        # 解析的结果会缓存在磁盘上，内容没有变化的文件不需要再次解析。读取的列和范围不同，缓存也不同
+        loader = partial(load_columns, columns=columns, xrange=xrange)
+        variant = "" if columns is None and xrange is None else f"columns={columns};xrange={xrange}"
     elif file.suffix == ".xlsx":
-        # 读取包含光谱数据的 Excel 文件，假设文件包含一个名为 Sheet1 的表格
-        data = pd.read_excel(file_path, sheet_name=0, dtype={'column_name': float})
+        from KimariDraw.xlsx import load_xlsx
+
+        # 读取包含光谱数据的 Excel 文件，数字表格直接解析 XML，第一次读取之后与 txt 文件一样使用缓存
+        loader = partial(load_xlsx, sheet=sheet, cells=cells, columns=columns, xrange=xrange)
+        variant = f"xlsx;sheet={sheet!r};cells={cells};columns={columns};xrange={xrange}"
     else:
         # 文件格式不支持
         raise ValueError("Unsupported file format.")
 
-    return data
+    if conversion is not None and not conversion.identity:
+        # 转换单位之后的数组同样写入缓存，再次使用同一个单位时不需要重新转换以及插值
+        loader = partial(_converted, loader, conversion.line if line else conversion.curve)
+        variant = f"{variant};units={conversion.key};line={line}"
+    with profiling.stage('read'):
+        if not cached:
+            return loader(file_path)
+        return cache.load(file_path, loader, variant)
+
+
+def _converted(loader, convert, file_path):
+    # 读取文件之后转换单位，用于 read_array 中的缓存
+    return convert(loader(file_path))
+
+
+def select_columns(columns, legend_text):
+    """
+    将 toml 文件中 curve 表的 columns 属性转换为文件中列的下标
+
+    Notes:
+        1. columns 中的整数为文件中列的下标，第 0 列为 x，因此第 i 条曲线的下标为 i
+        2. columns 中的字符串为图例文本，此时 legend 属性需要按顺序列出文件中所有曲线的图例
+        3. 无论使用下标还是图例文本选择，列出了文件中所有曲线的 legend 都按照相同的下标挑选，
+           color 以及 style 使用 select_options 以同样的规则挑选
+
+    Args:
+        columns(list[int or str]): 需要绘制的曲线
+        legend_text(list[str]): curve 表的 legend 属性
+
+    Returns:
+        indices(list[int]): 需要读取的列的下标，第一个总是 0，即 x
+        legend_text(list[str]): 被选择的曲线的图例
+    """
+    if isinstance(columns, (int, str)):
+        columns = [columns]
+
+    indices = []
+    for column in columns:
+        if isinstance(column, str):
+            if column not in legend_text:
+                raise ValueError(f"The column '{column}' is not in the 'legend' of the 'curve' configuration.")
+            indices.append(legend_text.index(column) + 1)
+        elif isinstance(column, int) and column >= 1:
+            indices.append(column)
+        else:
+            raise ValueError("The 'columns' of 'curve' must be legend texts or column indices starting from 1.")
+
+    return [0] + indices, select_options(legend_text, [0] + indices)
+
+
+def select_options(values, indices):
+    """
+    按照 select_columns 得到的下标挑选 curve 表中每条曲线的属性，例如 legend、color 以及 style
+
+    Notes:
+        列表的长度足以包含所有被选择的列时，认为列表按顺序列出了文件中的所有曲线，按照下标挑选；
+        单个值或者更短的列表 (只列出了被选择的曲线) 原样返回
+
+    Args:
+        values(list or str): curve 表中的属性
+        indices(list[int]): select_columns 返回的列的下标，第一个为 x
+
+    Returns:
+        values(list or str): 被选择的曲线的属性
+    """
+    if isinstance(values, (list, tuple)) and len(indices) > 1 and len(values) >= max(indices[1:]):
+        return [values[index - 1] for index in indices[1:]]
+    return values
+
+
+def load_config(toml_file):
+    """
+    读取 toml 文件的内容
+
+    Args:
+        toml_file(str): toml 文件路径
+
+    Returns:
+        toml_data(dict): toml 文件的内容
+    """
+    import toml
+
+    # 从 toml 文件中获取 line_data 数据和 curve_data 数据的来源
+    with open(toml_file, 'r', encoding='utf-8') as file:
+        toml_data = toml.load(file)
+
+    return toml_data
 
 
 def create_spectrum(toml_file):
@@ -651,30 +1295,122 @@ def create_spectrum(toml_file):
         Spectrum: 初始化好的 Spectrum 对象
 
     """
-    # 从 toml 文件中获取 line_data 数据和 curve_data 数据的来源
-    with open(toml_file, 'r', encoding='utf-8') as file:
-        toml_data = toml.load(file)
+    # toml 文件中的相对路径都相对于 toml 文件的当前文件夹，光谱的名字默认为 toml 文件的文件名
+    return spectrum_from_config(load_config(toml_file), os.path.dirname(os.path.abspath(toml_file)),
+                                name=Path(toml_file).stem)
+
+
+def create_job(toml_file):
+    """
+    根据 toml 文件创建一个绘制任务。toml 文件中有 [grid] 表时为多子图的图片，否则为单独的光谱
 
-    # 获取 toml 文件的当前文件夹
-    current_folder = os.path.dirname(os.path.abspath(toml_file))
+    Args:
+        toml_file(str): toml 文件路径
 
-    # 获取 curve 的配置，curve 是必须存在的
+    Returns:
+        job(Spectrum or Grid): 初始化好的 Spectrum 或者 Grid 对象，都可以调用 draw_spectrum 以及 close
+    """
+    return job_from_config(load_config(toml_file), os.path.dirname(os.path.abspath(toml_file)),
+                           name=Path(toml_file).stem)
+
+
+def job_from_config(toml_data, current_folder, name=None):
+    """
+    根据 toml 文件的内容创建一个绘制任务，与 create_job 相同
+
+    Args:
+        toml_data(dict): toml 文件的内容
+        current_folder(str): 相对路径所相对的文件夹
+        name(str): 光谱的名字，用于生成文件名，默认为 None
+
+    Returns:
+        job(Spectrum or Grid): 初始化好的 Spectrum 或者 Grid 对象
+    """
+    if 'grid' in toml_data:
+        from KimariDraw.grid import grid_from_config
+
+        return grid_from_config(toml_data, current_folder, name=name)
+
+    return spectrum_from_config(toml_data, current_folder, name=name)
+
+
+def spectrum_from_config(toml_data, current_folder, name=None, loaded=None):
+    """
+    根据 toml 文件的内容创建一个 Spectrum 对象，配置也可以不来自 toml 文件，例如 serve 模式中的 JSON 任务
+
+    Notes:
+        传入 loaded 时，读取、系综加权以及展宽的结果按照参数保存在其中，之后的调用中参数相同的数据直接使用，
+        并且得到同一个 CurveData 和 LineData 对象。参数扫描中的光谱共用一个 loaded
+
+    Args:
+        toml_data(dict): 配置的内容，与 toml 文件的结构相同
+        current_folder(str): 配置中的相对路径所相对的文件夹
+        name(str): 光谱的名字，用于生成保存的文件名，默认为 None。[spectrum] 表中的 name 优先
+        loaded(dict): 已经读取的数据，默认为 None，即每次都重新读取
+
+    Returns:
+        Spectrum: 初始化好的 Spectrum 对象
+    """
+
+    def load(key, loader):
+        # 参数相同的数据只读取或计算一次，键中的列表等参数使用 repr 比较
+        # 由其他数据得到的数据 (单位转换、展宽等) 的键中包含来源数据的键，而不是来源对象的 id，id 在对象回收之后可能被重复使用
+        if loaded is None:
+            return loader()
+        key = repr(key)
+        if key not in loaded:
+            loaded[key] = loader()
+        return loaded[key]
+
+    # 获取 broaden 的配置，broaden 可以不存在。如果存在，则根据 line 的数据展宽得到 curve_data，此时 curve 表不需要 path 属性
+    broaden = toml_data.get('broaden')
+    # 获取 ensemble 的配置，ensemble 可以不存在。如果存在，则曲线和直线都由构象系综 Boltzmann 加权得到，不需要 path 属性
+    ensemble = toml_data.get('ensemble')
+    # 获取 units 的配置，units 可以不存在。如果存在，则读取之后将 x 从 from 转换为 to 的单位
+    conversion = None
+    if toml_data.get('units') is not None:
+        from KimariDraw import units
+
+        conversion = units.Conversion.from_config(toml_data['units'])
+    conversion_key = None if conversion is None else conversion.key
+
+    # 获取 curve 的配置，curve 是必须存在的，除非配置了 broaden 或者 ensemble
     curve = toml_data.get('curve')
-    if curve is None:
+    if curve is None and broaden is None and ensemble is None:
         raise ValueError("Missing 'curve' configuration. It is required.")
     else:
-        # 处理 curve 表的路径属性
-        curve_path = curve['path']
-        # 如果 toml 文件中 curve 和 line 表的 path 属性仅为一个相对路径，则将相对路径设置为 toml 文件的相对路径，而不是主程序的相对路径
-        if os.path.isabs(curve_path):
-            # 如果是绝对路径，则直接使用该路径
-            curve_data_source = curve_path
-        # 如果 toml 文件中 curve 和 line 表的 path 属性仅为一个绝对路径，则直接使用这个绝对路径
+        curve = curve if curve is not None else {}
+        curve_data, curve_key = None, None
+
+        # 接着判断 legend 属性存不存在，如果不存在则赋值为 [None]
+        if 'legend' in curve:
+            legend_text = curve['legend']
         else:
-            # 如果是相对路径，则与当前文件夹拼接
-            curve_data_source = os.path.join(current_folder, curve_path)
-        # 根据 curve 的 path 属性得到 curve_data
-        curve_data = read_path(curve_data_source)
+            # 默认为 [None]
+            legend_text = [None]
+
+        # 只读取需要绘制的曲线以及 x 的范围，columns 可以是列的下标，也可以是图例文本
+        columns = None
+        if 'columns' in curve:
+            legend_list = [legend_text] if isinstance(legend_text, str) else list(legend_text)
+            columns, legend_text = select_columns(curve['columns'], legend_list)
+        xrange = curve.get('xrange')
+
+        if broaden is None and ensemble is None:
+            # 处理 curve 表的路径属性
+            curve_path = curve['path']
+            # 如果 toml 文件中 curve 和 line 表的 path 属性仅为一个相对路径，则将相对路径设置为 toml 文件的相对路径，而不是主程序的相对路径
+            if os.path.isabs(curve_path):
+                # 如果是绝对路径，则直接使用该路径
+                curve_data_source = curve_path
+            # 如果 toml 文件中 curve 和 line 表的 path 属性仅为一个绝对路径，则直接使用这个绝对路径
+            else:
+                # 如果是相对路径，则与当前文件夹拼接
+                curve_data_source = os.path.join(current_folder, curve_path)
+            # 根据 curve 的 path 属性得到 curve_data
+            curve_read = (curve_data_source, columns, xrange, curve.get('sheet'), curve.get('cells'))
+            curve_key = ('curve', conversion_key) + curve_read
+            curve_data = load(curve_key, lambda: read_array(*curve_read, conversion=conversion))
         # 首先判断 color 属性存不存在，如果不存在则赋值为默认的 red
         if 'color' in curve:
             curve_color = curve['color']
@@ -689,18 +1425,19 @@ def create_spectrum(toml_file):
             # 默认为 -
             curve_style = ['-']
 
-        # 接着判断 legend 属性存不存在，如果不存在则赋值为 [None]
-        if 'legend' in curve:
-            legend_text = curve['legend']
-        else:
-            # 默认为 [None]
-            legend_text = [None]
+        # 只绘制部分曲线时，color 以及 style 与 legend 使用相同的下标挑选
+        if columns is not None:
+            curve_color, curve_style = select_options(curve_color, columns), select_options(curve_style, columns)
 
     # 获取 line 的配置，line 可以不存在
     line = toml_data.get('line')
+    line_key = None
     if line is None:
         # 如果 line 不存在，则直接返回 None
         line_data, line_color = None, None
+    elif 'path' not in line and ensemble is not None:
+        # 直线由 ensemble 得到，line 表只用于设置颜色
+        line_data, line_color = None, line.get('color', ['black'])
     else:
         line_path = line['path']
         if os.path.isabs(line_path):
@@ -710,7 +1447,9 @@ def create_spectrum(toml_file):
             # 如果是相对路径，则与当前文件夹拼接
             line_data_source = os.path.join(current_folder, line_path)
         # 根据 line 的 path 属性得到 line_data
-        line_data = read_path(line_data_source)
+        line_read = (line_data_source, None, None, line.get('sheet'), line.get('cells'))
+        line_key = ('line', conversion_key) + line_read
+        line_data = load(line_key, lambda: read_array(*line_read, conversion=conversion, line=True))
         if 'color' in line:
             # 根据 line 的 color 属性得到 line_color
             line_color = line['color']
@@ -718,8 +1457,84 @@ def create_spectrum(toml_file):
             # 默认为黑色
             line_color = ['black']
 
-    return Spectrum(curveData=curve_data, lineData=line_data, line_colors=line_color, curve_colors=curve_color,
-                    curve_style=curve_style, legend_text=legend_text)
+    # 获取 spectrum 的配置，spectrum 可以不存在，其中的属性直接作为 Spectrum 的参数，例如 downsample = false
+    options = dict(toml_data.get('spectrum', {}))
+    for key in ('curveData', 'lineData'):
+        if key in options:
+            raise ValueError(f"'{key}' can not be set in the 'spectrum' configuration.")
+    if name is not None:
+        options.setdefault('name', name)
+    # toml 中没有元组，figure_size 需要转换为元组
+    if isinstance(options.get('figure_size'), list):
+        options['figure_size'] = tuple(options['figure_size'])
+    if conversion is not None:
+        # 没有设置 x_label 时使用目标单位的标签，顶部第二个 x 轴显示 secondary 的单位
+        options.setdefault('x_label', units.LABELS[conversion.to_unit])
+        options.setdefault('x_unit', conversion.to_unit)
+        if conversion.secondary is not None:
+            options.setdefault('secondary_unit', conversion.secondary)
+
+    # 根据构象系综 Boltzmann 加权得到曲线和直线，数组直接传给 Spectrum，不需要先转换为 DataFrame
+    if ensemble is not None:
+        from KimariDraw.ensemble import ensemble_from_config
+
+        def weigh():
+            with profiling.stage('ensemble'):
+                return ensemble_from_config(ensemble, current_folder, columns=columns, xrange=xrange)
+
+        ensemble_key = ('ensemble', ensemble, current_folder, columns, xrange)
+        ensemble_curve, ensemble_line = load(ensemble_key, weigh)
+        if conversion is not None:
+            # 加权的结果为原来的单位，转换之后同样只计算一次
+            if ensemble_curve is not None:
+                ensemble_curve = load(('units', ensemble_key, 'curve', conversion_key),
+                                      lambda: conversion.curve(ensemble_curve))
+            if ensemble_line is not None:
+                ensemble_line = load(('units', ensemble_key, 'line', conversion_key),
+                                     lambda: conversion.line(ensemble_line))
+        if ensemble_line is not None:
+            line_data, line_key = ensemble_line, ('units', ensemble_key, 'line', conversion_key)
+            line_color = line_color if line_color is not None else ['black']
+        if ensemble_curve is not None:
+            curve_data, curve_key = ensemble_curve, ('units', ensemble_key, 'curve', conversion_key)
+        elif broaden is None:
+            raise ValueError("The 'ensemble' configuration requires 'files' unless 'broaden' is configured.")
+
+    # 根据 line 的数据展宽得到 curve_data
+    if broaden is not None:
+        if line_data is None:
+            raise ValueError("The 'broaden' configuration requires a 'line' table.")
+        import numpy as np
+        from KimariDraw.broaden import broaden_line
+
+        options_broaden = broaden
+        if conversion is not None:
+            # 直线已经转换为 to 的单位，网格在 to 的单位下均匀，半峰全宽以及范围仍然使用 [broaden] 中原来的单位
+            options_broaden = dict(broaden, x_unit=conversion.to_unit,
+                                   fwhm_unit=broaden.get('fwhm_unit') or broaden.get('x_unit') or conversion.from_unit)
+            for key in ('range', 'x_range'):
+                if key in broaden:
+                    options_broaden[key] = sorted(units.convert(
+                        broaden[key], broaden.get('x_unit') or conversion.from_unit, conversion.to_unit).tolist())
+
+        def widen():
+            with profiling.stage('broaden'):
+                return broaden_line(np.asarray(line_data, dtype=np.float64), **options_broaden)
+
+        curve_key = ('broaden', line_key, broaden)
+        curve_data = load(curve_key, widen)
+
+    if loaded is not None:
+        from KimariDraw.data import CurveData, LineData
+
+        # 相同的数据转换为同一个 CurveData 以及 LineData 对象，接管图片之后不需要重新设置曲线和直线的数据
+        dtype = options.get('dtype')
+        curve_data = load(('curve_data', curve_key, dtype), lambda: CurveData.coerce(curve_data, dtype))
+        line_data = load(('line_data', line_key), lambda: LineData.coerce(line_data))
+
+    with profiling.stage('construct'):
+        return Spectrum(curveData=curve_data, lineData=line_data, line_colors=line_color, curve_colors=curve_color,
+                        curve_style=curve_style, legend_text=legend_text, **options)
 
 
 def validate(file):
@@ -767,6 +1582,8 @@ def select_file():
     Returns:
         toml_path(str): 返回一个 toml 文件路径
     """
+    import wx
+
     # 创建文件对话框
     dialog = wx.FileDialog(None, "Select toml file", style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST)
     while True:
@@ -845,6 +1662,7 @@ def main_view(input_file):
         print(f"4 Toggle showing legend text, current: {spectrum.is_legend}")
         print(f"5 Toggle showing the zero axis, current: {spectrum.is_zero}")
         print(f"6 Toggle showing discrete lines, current: {spectrum.is_showLine}")
+        print(f"7 Toggle downsampling dense curves, current: {spectrum.downsample}")
 
         # 接受用户的指令，并根据用户的指令
         choice = input()
@@ -875,6 +1693,10 @@ def main_view(input_file):
         # 如果输入 6，是否显示 line 数据 toggle_line
         elif choice == "6":
             spectrum.toggle_line()
+        # 如果输入 7，是否对过密的曲线降采样 toggle_downsample
+        elif choice == "7":
+            spectrum.toggle_downsample()
+            continue
         # 如果输入 -1，设置绘制光谱的字体
         elif choice == "-1":
             spectrum.set_font_family()
@@ -908,6 +1730,8 @@ def main_view(input_file):
         # 如果输入 r 则重新加载一个新的 toml 文件
         elif choice.lower() == "r":
             toml_file = select_file()
+            # 关闭旧的 spectrum 保留的图片
+            spectrum.close()
             # 重新载入一个 spectrum，并用这个 spectrum 继续循环
             spectrum = create_spectrum(toml_file)
             continue
@@ -919,6 +1743,14 @@ def main_view(input_file):
 
 
 def main():
+    # 无交互的批量绘制方式，kimaridraw render a.toml b.toml ...
+    if len(sys.argv) > 1 and sys.argv[1] == "render":
+        from KimariDraw.batch import render_main
+        sys.exit(render_main(sys.argv[2:]))
+    # 常驻的绘制服务，kimaridraw serve [--socket path]
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from KimariDraw.server import serve_main
+        sys.exit(serve_main(sys.argv[2:]))
     # 命令行运行方式
     if len(sys.argv) > 1:
         # 处理命令行参数
@@ -931,16 +1763,24 @@ def main():
         parser.add_argument('--help', '-h', action='help', help='Show this help message and exit')
         # 添加 -v 参数
         parser.add_argument('--version', '-v', action='version', version=__version__)
+        # 添加 --no-cache 参数
+        parser.add_argument('--no-cache', action='store_true', help='Do not use the cache of parsed spectral data')
         # 添加输入文件参数
         parser.add_argument('input', type=str, help='Text file containing spectral data generated by Multiwfn')
         # 解析参数
         args = parser.parse_args()
+        # 关闭缓存
+        if args.no_cache:
+            from KimariDraw import cache
+            cache.set_enabled(False)
         # 处理命令行参数
         input_file = args.input
         # 进入主程序 main_view()
         main_view(input_file=input_file)
     # 否则就直接进入主程序
     else:
+        import wx
+
         # 创建一个 wx 实例
         app = wx.App()
         # 显示欢迎界面
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+naming.py
+Allocation of output file names that is deterministic, O(1) in stats and safe when several processes save into one folder.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import contextvars
+import os
+import re
+import string
+import tempfile
+
+from contextlib import contextmanager
+
+# 默认的文件名模板，{name} 为 toml 文件的文件名 (不含后缀)
+DEFAULT_TEMPLATE = "{name}"
+# 当前线程中记录 claim 分配结果的 Ledger，不在 reuse 的上下文中时为 None
+_ledger = contextvars.ContextVar("ledger", default=None)
+
+
+class Ledger:
+    """
+    一次绘制中 claim 分配的文件路径，用于之后的绘制覆盖同一批文件，例如 render --watch 的重新绘制
+
+    Notes:
+        1. 键为 (文件夹的绝对路径, 文件名, 格式)，值为按照分配顺序排列的路径列表，同一个任务中文件名相同的多次保存各自对应
+        2. 可以在进程之间传递，进程池中的任务返回 Ledger，下一次绘制时再传回去
+
+    Attributes:
+        previous (dict): 上一次绘制分配的路径
+        claims (dict): 这一次绘制分配的路径
+        reused (set[str]): 这一次绘制中直接使用上一次路径的文件
+    """
+
+    def __init__(self, previous=None):
+        self.previous = {} if previous is None else previous.claims
+        self.claims = {}
+        self.reused = set()
+
+    def take(self, key):
+        """
+        返回上一次绘制中同一个键按顺序对应的路径，并记录到这一次的分配中，没有时返回 None
+
+        Args:
+            key(tuple): claim 中的 (文件夹, 文件名, 格式)
+
+        Returns:
+            paths(list[str]): 上一次分配的路径
+        """
+        claimed = self.claims.setdefault(key, [])
+        earlier = self.previous.get(key, [])
+        if len(claimed) >= len(earlier):
+            return None
+        paths = earlier[len(claimed)]
+        claimed.append(paths)
+        self.reused.update(paths)
+        return paths
+
+    def record(self, key, paths):
+        """
+        记录这一次绘制新分配的路径
+
+        Args:
+            key(tuple): claim 中的 (文件夹, 文件名, 格式)
+            paths(list[str]): 分配的路径
+        """
+        self.claims.setdefault(key, []).append(paths)
+
+
+@contextmanager
+def reuse(previous=None):
+    """
+    在上下文中记录 claim 分配的文件路径。previous 中记录过的文件名直接使用上一次的路径，覆盖上一次保存的文件，
+    而不是覆盖没有编号的 stem 或者再添加一个编号
+
+    Args:
+        previous(Ledger): 上一次绘制返回的 Ledger，默认为 None，即第一次绘制
+
+    Yields:
+        ledger(Ledger): 这一次绘制的记录
+    """
+    ledger = Ledger(previous)
+    token = _ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _ledger.reset(token)
+
+
+def format_stem(template, **fields):
+    """
+    根据模板生成文件名 (不含后缀)，例如 "{name}_uv" 在 name="benzene" 时为 "benzene_uv"
+
+    Args:
+        template(str): 文件名模板，使用 str.format 的语法
+        **fields: 模板中可以使用的字段，例如 name
+
+    Returns:
+        stem(str): 文件名，不含后缀
+    """
+    template = DEFAULT_TEMPLATE if template is None else template
+    names = {field for _, field, _, _ in string.Formatter().parse(template) if field}
+    unknown = names - set(fields)
+    if unknown:
+        raise ValueError(f"Unknown fields in the file name template '{template}': {', '.join(sorted(unknown))}. "
+                         f"Available fields are: {', '.join(sorted(fields))}")
+
+    stem = template.format(**fields)
+    if not stem or os.sep in stem or (os.altsep and os.altsep in stem):
+        raise ValueError(f"The file name template '{template}' gives an invalid file name '{stem}'.")
+
+    return stem
+
+
+def claim(directory, stem, formats, overwrite=False):
+    """
+    为一次保存分配文件路径，每个格式一个文件，文件名相同，只有后缀不同
+
+    Notes:
+        1. 文件名依次为 stem、stem_1、stem_2 ...，只需要扫描一次文件夹就能找到当前最大的编号，而不是逐个检查文件是否存在。
+           编号之前有下划线，conf1 的编号不会与 conf12 这样以数字结尾的其他文件名混淆
+        2. 使用 O_EXCL 独占地创建空的占位文件，多个进程同时保存到同一个文件夹时，也不会分配到相同的文件名。
+           如果占位文件已经被其他进程创建，则编号加一后重试
+        3. overwrite 为 True 时直接使用 stem，不创建占位文件，已有的文件会被覆盖
+        4. 在 reuse 的上下文中，上一次绘制分配过的文件名直接使用上一次的路径，优先于 overwrite
+
+    Args:
+        directory(str): 保存的文件夹
+        stem(str): 文件名，不含后缀
+        formats(list[str]): 保存的格式
+        overwrite(bool): 是否覆盖已有的文件
+
+    Returns:
+        paths(list[str]): 每个格式的文件路径
+    """
+    ledger = _ledger.get()
+    if ledger is None:
+        return _claim(directory, stem, formats, overwrite)
+
+    key = (os.path.abspath(directory), stem, tuple(formats))
+    paths = ledger.take(key)
+    if paths is None:
+        paths = _claim(directory, stem, formats, overwrite)
+        ledger.record(key, paths)
+    return paths
+
+
+def _claim(directory, stem, formats, overwrite):
+    # 不考虑 Ledger 时分配文件路径
+    if overwrite:
+        return [os.path.join(directory, f"{stem}.{save_format}") for save_format in formats]
+
+    # 一次扫描找到已有文件的最大编号，没有编号的 stem 记为 0
+    pattern = re.compile(re.escape(stem) + r"(?:_(\d+))?\.(?:" + "|".join(map(re.escape, formats)) + r")")
+    highest = -1
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            match = pattern.fullmatch(entry.name)
+            if match:
+                highest = max(highest, int(match.group(1) or 0))
+
+    number = highest + 1
+    while True:
+        candidate = stem if number == 0 else f"{stem}_{number}"
+        paths = [os.path.join(directory, f"{candidate}.{save_format}") for save_format in formats]
+        claimed = []
+        try:
+            for path in paths:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
+                claimed.append(path)
+        except FileExistsError:
+            # 其他进程已经占用了这个文件名
+            release(claimed)
+            number += 1
+            continue
+        return paths
+
+
+def release(paths):
+    """
+    删除 claim 创建的占位文件，用于保存失败时。直接使用上一次路径的文件是上一次保存的图片，不会被删除
+
+    Args:
+        paths(list[str]): 文件路径
+    """
+    ledger = _ledger.get()
+    for path in paths:
+        if ledger is not None and path in ledger.reused:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def write_atomic(path, save):
+    """
+    先将文件写入同一个文件夹下的临时文件，再重命名为 path，其他进程不会看到写了一半的图片
+
+    Args:
+        path(str): 最终的文件路径
+        save(callable): 写入文件的函数，接受临时文件的路径
+    """
+    directory, name = os.path.split(path)
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory or os.curdir, prefix=f".{name}.", suffix=".tmp")
+    os.close(file_descriptor)
+    try:
+        save(temp_path)
+        # mkstemp 创建的文件只有所有者可以读写，改为与占位文件或者已有文件相同的权限
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        release([temp_path])
+        raise
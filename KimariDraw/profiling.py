@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+profiling.py
+Per-job, per-stage wall time and peak memory of a render, with JSON lines output, cProfile dumps and batch percentiles.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import json
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+from pathlib import Path
+
+# 汇总时计算的百分位数
+PERCENTILES = (50, 90, 99)
+
+# 每个线程当前正在记录的任务，没有任务时 stage 不做任何事情
+_local = threading.local()
+
+
+def is_enabled():
+    """
+    判断是否开启性能记录，设置环境变量 KIMARIDRAW_PROFILE=1 或者使用命令行参数 --profile 可以开启
+
+    Returns:
+        enabled(bool): 是否开启性能记录
+    """
+    return os.environ.get("KIMARIDRAW_PROFILE", "").strip().lower() not in ("", "0", "false", "no")
+
+
+def set_enabled(enabled, jsonl=None, cprofile_dir=None):
+    """
+    开启或关闭性能记录。通过环境变量实现，因此进程池中的子进程也会继承这个设置
+
+    Args:
+        enabled(bool): 是否开启性能记录
+        jsonl(str): 将每个任务的记录写入这个 JSON lines 文件，对应环境变量 KIMARIDRAW_PROFILE_JSONL
+        cprofile_dir(str): 将每个任务的 cProfile 结果保存到这个文件夹，对应环境变量 KIMARIDRAW_PROFILE_DIR
+    """
+    if enabled:
+        os.environ["KIMARIDRAW_PROFILE"] = "1"
+    else:
+        os.environ.pop("KIMARIDRAW_PROFILE", None)
+    if jsonl is not None:
+        os.environ["KIMARIDRAW_PROFILE_JSONL"] = os.path.abspath(jsonl)
+    if cprofile_dir is not None:
+        os.environ["KIMARIDRAW_PROFILE_DIR"] = os.path.abspath(cprofile_dir)
+
+
+def jsonl_path():
+    """
+    JSON lines 文件的路径，没有设置时为 None
+
+    Returns:
+        path(str): JSON lines 文件的路径
+    """
+    return os.environ.get("KIMARIDRAW_PROFILE_JSONL") or None
+
+
+def cprofile_dir():
+    """
+    保存 cProfile 结果的文件夹，没有设置时为 None
+
+    Returns:
+        directory(str): 文件夹的路径
+    """
+    return os.environ.get("KIMARIDRAW_PROFILE_DIR") or None
+
+
+class _Job:
+    # 一个任务的记录，stages 中每个阶段记录耗时、调用次数以及内存峰值
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        # 嵌套的阶段，每一项为 [阶段开始时的内存, 阶段中的内存峰值]
+        self.frames = []
+
+
+def _memory():
+    # 当前以及峰值的 Python 内存分配 (字节)，没有开启 tracemalloc 时为 (0, 0)
+    import tracemalloc
+
+    return tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+
+
+@contextmanager
+def stage(name):
+    """
+    记录一个阶段的耗时以及内存峰值，例如 read、construct、plot、layout、save.png。同名的阶段会累加
+
+    Notes:
+        1. 只有在 job 之中并且开启了性能记录时才会记录，否则只有一次属性查找的开销
+        2. 内存峰值为阶段中 Python 分配的内存相对阶段开始时的最大增量，由 tracemalloc 统计，不包括 C 扩展自行分配的内存
+        3. 阶段可以嵌套，外层阶段的峰值包含内层阶段的峰值
+
+    Args:
+        name(str): 阶段的名字
+    """
+    job = getattr(_local, 'job', None)
+    if job is None:
+        yield
+        return
+
+    import tracemalloc
+
+    current, peak = _memory()
+    # 重置峰值之前，将目前的峰值记录到外层的阶段中
+    for frame in job.frames:
+        frame[1] = max(frame[1], peak)
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    frame = [current, current]
+    job.frames.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        job.frames.pop()
+        peak = max(frame[1], _memory()[1])
+        for outer in job.frames:
+            outer[1] = max(outer[1], peak)
+        record = job.stages.setdefault(name, {'time': 0.0, 'calls': 0, 'peak_mb': 0.0})
+        record['time'] += elapsed
+        record['calls'] += 1
+        record['peak_mb'] = max(record['peak_mb'], (peak - frame[0]) / 1024 ** 2)
+
+
+@contextmanager
+def job(name):
+    """
+    记录一个任务，任务中的 stage 都会记录到这个任务中
+
+    Notes:
+        1. 没有开启性能记录时返回 None，不做任何事情
+        2. 开启时返回一个字典，在任务结束后填入 job、ok、total、peak_mb 以及 stages。
+           设置了 cProfile 文件夹时，还会将这个任务的 cProfile 结果保存为 .prof 文件，路径记录在 cprofile 中
+
+    Args:
+        name(str): 任务的名字，通常为 toml 文件的路径
+
+    Yields:
+        record(dict): 任务的记录
+    """
+    if not is_enabled():
+        yield None
+        return
+
+    import tracemalloc
+
+    record = {'job': name}
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    profiler = None
+    if cprofile_dir() is not None:
+        import cProfile
+
+        profiler = cProfile.Profile()
+
+    _local.job = current = _Job(name)
+    ok = False
+    try:
+        with stage('total'):
+            if profiler is not None:
+                profiler.enable()
+            try:
+                yield record
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        ok = True
+    finally:
+        _local.job = None
+        if started:
+            tracemalloc.stop()
+        total = current.stages.pop('total')
+        record.update(ok=ok, total=round(total['time'], 6), peak_mb=round(total['peak_mb'], 3),
+                      stages={key: {'time': round(value['time'], 6), 'calls': value['calls'],
+                                    'peak_mb': round(value['peak_mb'], 3)} for key, value in current.stages.items()})
+        if profiler is not None:
+            record['cprofile'] = _dump(profiler, name)
+
+
+def _dump(profiler, name):
+    # 保存 cProfile 的结果，文件名为任务的名字，已经存在时添加编号
+    from KimariDraw import naming
+
+    directory = cprofile_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = naming.claim(directory, Path(name).stem or 'job', ['prof'])[0]
+    profiler.dump_stats(path)
+    return path
+
+
+class Report:
+    """
+    汇总多个任务的性能记录，计算每个阶段的百分位数
+
+    Attributes:
+        records (list[dict]): 每个任务的记录
+        jsonl (str): 每收到一条记录就追加写入的 JSON lines 文件，为 None 时不写入
+    """
+
+    def __init__(self, jsonl=None):
+        self.records = []
+        self.jsonl = jsonl
+
+    def add(self, record):
+        """
+        添加一条任务的记录，并写入 JSON lines 文件
+
+        Args:
+            record(dict): job 返回的记录，为 None 时忽略
+        """
+        if record is None:
+            return
+        self.records.append(record)
+        if self.jsonl is not None:
+            with open(self.jsonl, 'a') as file:
+                file.write(json.dumps(record) + "\n")
+
+    def summary(self):
+        """
+        返回汇总的表格，每一行为一个阶段的耗时 (ms) 以及内存峰值 (MB) 的百分位数和最大值
+
+        Returns:
+            summary(str): 汇总的表格
+        """
+        import numpy as np
+
+        if not self.records:
+            return "No profiled jobs."
+
+        # 按照阶段第一次出现的顺序排列，最后一行为整个任务
+        names = list(dict.fromkeys(name for record in self.records for name in record['stages']))
+        rows = [(name, [record['stages'][name] for record in self.records if name in record['stages']])
+                for name in names]
+        rows.append(('total', [{'time': record['total'], 'peak_mb': record['peak_mb']} for record in self.records]))
+
+        header = f"{'stage':>12} {'jobs':>6}" + "".join(f" {f'p{p} ms':>10}" for p in PERCENTILES) + \
+                 f" {'max ms':>10} {'peak MB':>9}"
+        lines = [f"Profile of {len(self.records)} jobs:", header]
+        for name, stages in rows:
+            times = np.array([stage_record['time'] for stage_record in stages]) * 1000
+            peaks = [stage_record['peak_mb'] for stage_record in stages]
+            lines.append(f"{name:>12} {len(stages):>6}" + "".join(f" {value:>10.1f}" for value in
+                                                                   np.percentile(times, PERCENTILES)) +
+                         f" {times.max():>10.1f} {max(peaks):>9.1f}")
+
+        # 最慢的任务，便于找到异常的输入
+        slowest = max(self.records, key=lambda record: record['total'])
+        lines.append(f"Slowest job: {slowest['job']} ({slowest['total'] * 1000:.1f} ms)")
+
+        return "\n".join(lines)
@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+"""
+reader.py
+Fast loader of the spectrum_curve.txt / spectrum_line.txt files written by Multiwfn.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import functools
+import re
+
+import numpy as np
+
+# ASCII 码
+_SPACE, _DOT, _PLUS, _MINUS = ord(" "), ord("."), ord("+"), ord("-")
+_EXPONENT = tuple(map(ord, "EeDd"))
+
+# 将一个数字的每个字节映射为它的格式：d 为数字，. 为小数点，E 为指数符号，s 为其他字节（空格或者正负号）
+_LAYOUT = bytes(
+    ord("d") if ord("0") <= i <= ord("9") else
+    ord(".") if i == _DOT else
+    ord("E") if i in _EXPONENT else
+    ord("s")
+    for i in range(256)
+)
+
+# Fortran 的 D 指数，例如 1.0D+03
+_D_EXPONENT = re.compile(rb"(?<=[0-9.])[Dd](?=[+-]?\d)")
+# 由于列宽不够而连在一起的两个数字，例如 -7.75E-003-8.21E-003，在第二个数字的符号前插入空格
+_JOINED_FIELD = re.compile(rb"(?<=[0-9.])(?=[+-]\d*\.)")
+# Fortran 在指数超过两位时省略的 E，例如 0.10497539-286
+_MISSING_E = re.compile(rb"(?<=[0-9.])([+-]\d{2,3})(?![0-9.])")
+
+# 流式读取时每次读取的字节数
+CHUNK_SIZE = 1 << 24
+
+# float64 能够精确表示的十进制整数的位数
+_MAX_DIGITS = 15
+# 10 的整数次幂使用双倍精度 (double-double) 的查找表，覆盖 float64 中全部非零数字的范围
+_WIDE_POWERS = range(-345, 310)
+
+
+def load_txt(file_path):
+    """
+    读取 Multiwfn 输出的 txt 文件，返回一个连续的 float64 NumPy 数组，不会构造 DataFrame
+
+    Notes:
+        1. Multiwfn 输出的文件每一行的宽度都是固定的，此时直接将整个文件看作一个字节矩阵，使用向量化的方法解析每一列
+        2. 如果文件不是固定列宽的，则回退到按空白字符切分的方法
+        3. 支持 Fortran 风格的指数，例如 1.0E-287、1.0D+03 以及省略 E 的 0.1-287
+
+    Args:
+        file_path(str): txt 文件的路径
+
+    Returns:
+        data(numpy.ndarray): 形状为 (行数, 列数) 的 C 连续 float64 数组
+    """
+    with open(file_path, "rb") as file:
+        raw = file.read()
+
+    return parse_txt(raw)
+
+
+def load_columns(file_path, columns=None, xrange=None, chunk_size=CHUNK_SIZE):
+    """
+    流式读取 Multiwfn 输出的 txt 文件，只保留需要的列以及 x 在 xrange 范围内的行
+
+    Notes:
+        1. 文件按照 chunk_size 字节分块读取，每一块都是完整的若干行，解析后立即丢弃不需要的列和行，
+           因此峰值内存只与 chunk_size 以及保留下来的数据有关，而与文件的大小无关
+        2. 固定列宽的文件只会解析需要的列
+
+    Args:
+        file_path(str): txt 文件的路径
+        columns(list[int]): 需要的列的下标，0 为 x，默认为 None，即全部的列
+        xrange(list[float, float]): x 的范围，默认为 None，即全部的行
+        chunk_size(int): 每次读取的字节数
+
+    Returns:
+        data(numpy.ndarray): 形状为 (行数, len(columns)) 的 C 连续 float64 数组
+    """
+    if columns is None and xrange is None:
+        return load_txt(file_path)
+
+    # 按照 x 筛选行时，即使不需要 x 也要解析第一列
+    parse_columns = None if columns is None else [int(column) for column in columns]
+    keep = slice(None)
+    if xrange is not None:
+        low, high = sorted(map(float, xrange))
+        if parse_columns is not None and 0 not in parse_columns:
+            keep = slice(0, len(parse_columns))
+            parse_columns.append(0)
+        x_position = 0 if parse_columns is None else parse_columns.index(0)
+
+    blocks = []
+    remainder = b""
+    with open(file_path, "rb") as file:
+        while True:
+            block = file.read(chunk_size)
+            raw = remainder + block
+            # 最后一块之外，只解析到最后一个换行符为止，剩余的部分留给下一块
+            cut = len(raw) if not block else raw.rfind(b"\n") + 1
+            raw, remainder = raw[:cut], raw[cut:]
+            if raw.strip():
+                data = parse_txt(raw, parse_columns)
+                if xrange is not None:
+                    x = data[:, x_position]
+                    data = data[(x >= low) & (x <= high)][:, keep]
+                blocks.append(np.ascontiguousarray(data))
+            if not block:
+                break
+
+    if not blocks:
+        raise ValueError("The spectrum file is empty.")
+
+    return np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+
+
+def parse_txt(raw, columns=None):
+    """
+    解析 Multiwfn 输出的 txt 文件内容
+
+    Args:
+        raw(bytes): txt 文件的内容
+        columns(list[int]): 需要的列的下标，默认为 None，即全部的列
+
+    Returns:
+        data(numpy.ndarray): 形状为 (行数, 列数) 的 C 连续 float64 数组
+    """
+    data = _parse_fixed_width(raw, columns)
+    if data is None:
+        data = _parse_tokens(raw)
+        if columns is not None:
+            data = np.ascontiguousarray(data[:, _check_columns(columns, data.shape[1])])
+
+    return data
+
+
+def _check_columns(columns, count):
+    # 检查列的下标是否超出文件的列数
+    columns = np.asarray(columns, dtype=np.intp)
+    if np.any(columns < 0) or np.any(columns >= count):
+        raise ValueError(f"Column indices must be between 0 and {count - 1}, the spectrum file has {count} columns.")
+    return columns
+
+
+def _parse_tokens(raw):
+    # 通用的解析方法：按空白字符切分后整体转换为 float64
+    first = next((line for line in raw.splitlines() if line.strip()), None)
+    if first is None:
+        raise ValueError("The spectrum file is empty.")
+
+    try:
+        values = np.array(raw.split()).astype(np.float64)
+    except ValueError:
+        # 存在 Fortran 风格的数字，先规范化再转换
+        raw, first = (_MISSING_E.sub(rb"E\1", _JOINED_FIELD.sub(b" ", _D_EXPONENT.sub(b"E", text)))
+                      for text in (raw, first))
+        try:
+            values = np.array(raw.split()).astype(np.float64)
+        except ValueError as e:
+            raise ValueError(f"The spectrum file contains a non-numeric value: {e}") from None
+
+    columns = len(first.split())
+    if values.size % columns != 0:
+        raise ValueError(f"The rows of the spectrum file do not all have {columns} columns.")
+
+    return values.reshape(-1, columns)
+
+
+def _parse_fixed_width(raw, columns=None):
+    # 向量化的固定列宽解析方法，如果文件不满足固定列宽的条件则返回 None。columns 不为 None 时只解析这些列
+    buffer = np.frombuffer(raw, dtype=np.uint8)
+    newlines = np.flatnonzero(buffer == ord("\n"))
+    if newlines.size == 0:
+        return None
+
+    # 每一行（包括换行符）的长度必须相同，最后一行可以没有换行符
+    width = int(newlines[0]) + 1
+    if buffer.size % width == width - 1:
+        buffer = np.append(buffer, np.uint8(ord("\n")))
+    if buffer.size % width != 0 or np.any(newlines % width != width - 1):
+        return None
+
+    matrix = buffer.reshape(-1, width)[:, :-1]
+    if matrix.shape[1] > 0 and np.all(matrix[:, -1] == ord("\r")):
+        matrix = matrix[:, :-1]
+
+    # 所有行都为空格的字节列为分隔符，相邻的非分隔符字节列构成一列数据
+    occupied = np.any(matrix != _SPACE, axis=0)
+    if not occupied.any():
+        return None
+    edges = np.diff(np.concatenate(([False], occupied, [False])).astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    stops = np.flatnonzero(edges == -1)
+    if columns is not None:
+        columns = _check_columns(columns, starts.size)
+        starts, stops = starts[columns], stops[columns]
+
+    # Multiwfn 使用 Fortran 的格式化输出，同一列中每个数字的数字、小数点以及指数符号的位置通常都相同，只有正负号可能占据前导空格
+    # 对于这样的列，只需要取出数字所在的字节逐位累加即可得到尾数和指数；其他的列则逐个字节解析
+    is_digit = (matrix >= ord("0")) & (matrix <= ord("9"))
+    varying = np.any(is_digit != is_digit[0], axis=0)
+    del is_digit
+
+    # 格式相同的列一起解析
+    groups = {}
+    irregular = []
+    for column, (start, stop) in enumerate(zip(starts, stops)):
+        if varying[start:stop].any():
+            irregular.append(column)
+        else:
+            groups.setdefault(matrix[0, start:stop].tobytes().translate(_LAYOUT), []).append(column)
+
+    data = np.empty((matrix.shape[0], starts.size), dtype=np.float64)
+    for layout, columns in groups.items():
+        values = _parse_uniform_group(matrix, starts[columns], layout.decode())
+        if values is None:
+            irregular.extend(columns)
+        else:
+            data[:, columns] = values
+
+    # 格式不完全相同的列（例如 x 的整数部分位数会变化），将相同宽度的列一起解析
+    irregular = np.array(irregular, dtype=np.intp)
+    widths = stops[irregular] - starts[irregular]
+    for field_width in np.unique(widths):
+        columns = irregular[widths == field_width]
+        index = starts[columns][:, None] + np.arange(field_width)
+        fields = matrix[:, index].reshape(-1, field_width)
+        values = _parse_fields(fields)
+        if values is None:
+            return None
+        data[:, columns] = values.reshape(matrix.shape[0], columns.size)
+
+    return data
+
+
+def _parse_uniform_group(matrix, starts, layout):
+    # 解析起始位置为 starts、格式均为 layout 的若干列，返回形状为 (行数, 列数) 的数组
+    if layout.count(".") != 1 or layout.count("E") > 1:
+        return None
+    dot = layout.index(".")
+    mantissa_end = layout.find("E") if "E" in layout else len(layout)
+    mantissa_offsets = [i for i, c in enumerate(layout[:mantissa_end]) if c == "d"]
+    exponent_offsets = [i for i, c in enumerate(layout) if c == "d" and i > mantissa_end]
+    fixed_offsets = [i for i, c in enumerate(layout) if c in ".E"]
+    free_offsets = [i for i, c in enumerate(layout) if c == "s"]
+    if not 0 < len(mantissa_offsets) <= _MAX_DIGITS or (mantissa_end < len(layout) and not exponent_offsets):
+        return None
+    # 正负号只能在尾数或者指数的数字之前。数字之后的正负号是省略了 E 的 Fortran 指数，例如 0.10497539-286，交给逐个解析的方法
+    digits = [mantissa_offsets[0]] + exponent_offsets[:1]
+    if any(i > digits[0] and (i < mantissa_end or len(digits) > 1 and i > digits[1]) for i in free_offsets):
+        return None
+
+    # 每一列中同一位置的字节，形状为 (行数, 列数)。Multiwfn 输出的列间距相同，此时使用跨步视图，不需要复制数据
+    steps = np.diff(starts)
+    if starts.size > 1 and np.all(steps == steps[0]) and steps[0] >= len(layout):
+        fields = np.lib.stride_tricks.as_strided(
+            matrix[:, starts[0]:], shape=(matrix.shape[0], starts.size, len(layout)),
+            strides=(matrix.strides[0], steps[0] * matrix.strides[1], matrix.strides[1]), writeable=False,
+        )
+    else:
+        fields = matrix[:, starts[:, None] + np.arange(len(layout))]
+
+    # 小数点以及指数符号必须在相同的位置，其余位置只能是空格或正负号
+    for i in fixed_offsets:
+        byte = fields[:, :, i]
+        if not np.all(byte == _DOT if layout[i] == "." else np.isin(byte, _EXPONENT)):
+            return None
+    negative = np.zeros((matrix.shape[0], starts.size), dtype=bool)
+    exponent_negative = np.zeros_like(negative)
+    for i in free_offsets:
+        byte = fields[:, :, i]
+        minus = byte == _MINUS
+        if not np.all(minus | (byte == _SPACE) | (byte == _PLUS)):
+            return None
+        np.logical_or(negative if i < mantissa_end else exponent_negative, minus,
+                      out=negative if i < mantissa_end else exponent_negative)
+
+    # 逐位累加尾数和指数的 ASCII 码，最后统一减去 '0' 的贡献。尾数不超过 15 位，累加的过程中 float64 都可以精确表示
+    mantissa = np.zeros((matrix.shape[0], starts.size), dtype=np.float64)
+    for i in mantissa_offsets:
+        mantissa *= 10.0
+        mantissa += fields[:, :, i]
+    mantissa -= ord("0") * float("1" * len(mantissa_offsets))
+    exponent = np.zeros((matrix.shape[0], starts.size), dtype=np.int64)
+    for i in exponent_offsets:
+        exponent *= 10
+        exponent += fields[:, :, i]
+    exponent -= ord("0") * int("0" + "1" * len(exponent_offsets))
+
+    np.negative(exponent, out=exponent, where=exponent_negative)
+    fraction_digits = sum(1 for i in mantissa_offsets if i > dot)
+    values, unresolved = _scale(mantissa, exponent - fraction_digits, negative)
+
+    # 极少数无法确定舍入方向的数字以及次正规数交给 NumPy 的 C 实现转换，结果与 float() 完全相同
+    if unresolved.any():
+        exact = _parse_fields(fields[unresolved])
+        if exact is None:
+            return None
+        values[unresolved] = exact
+
+    return values
+
+
+def _parse_fields(fields):
+    # 解析形状为 (数字个数, 列宽) 的字节矩阵，每一行是一个数字，格式可以各不相同，无法解析时返回 None
+    # 每一行看作一个定长的字节串，交给 NumPy 的 C 实现转换为 float64
+    strings = np.ascontiguousarray(fields).view(f"S{fields.shape[1]}").ravel()
+    try:
+        return strings.astype(np.float64)
+    except ValueError:
+        pass
+
+    # 存在 Fortran 风格的数字，先规范化再转换
+    strings = [_MISSING_E.sub(rb"E\1", _D_EXPONENT.sub(b"E", string)) for string in strings]
+    try:
+        return np.array(strings).astype(np.float64)
+    except ValueError:
+        return None
+
+
+def _scale(mantissa, power, negative):
+    # 数值为 ±mantissa * 10^power，结果与 float() 相同。返回数值以及无法确定舍入方向、需要逐个转换的位置
+    # 使用双倍精度计算：10^power = (high + low) * 2^shift，high + low 的相对误差约为 2^-106。
+    # mantissa * high 使用 Dekker 算法精确计算，之后的误差远小于舍入的间隔。将计算误差的上下界分别加到结果上，
+    # 两者舍入为同一个 float64 时即为正确的结果，否则结果与两个 float64 的中点过于接近，标记为 unresolved。
+    # 次正规数在 ldexp 中会再舍入一次，同样标记为 unresolved
+    high, high_split, low, shift = _wide_table()
+    offset = power - _WIDE_POWERS.start
+    a_high, a_low = _split(mantissa)
+    b_high, b_low = (np.take(part, offset, mode="clip") for part in high_split)
+
+    # mantissa * high 的舍入结果以及精确的舍入误差
+    product = mantissa * np.take(high, offset, mode="clip")
+    tail = a_high * b_high
+    tail -= product
+    tail += a_high * b_low
+    tail += a_low * b_high
+    tail += a_low * b_low
+    tail += mantissa * np.take(low, offset, mode="clip")
+
+    bound = np.abs(product)
+    bound *= 2.0 ** -96
+    upper = product + (tail + bound)
+    lower = product + (tail - bound)
+    unresolved = upper != lower
+    unresolved |= (power < -307) | (power > 308)
+
+    with np.errstate(over="ignore"):
+        values = np.ldexp(upper, np.take(shift, offset, mode="clip"))
+    np.negative(values, out=values, where=negative)
+    return values, unresolved
+
+
+def _split(a):
+    # 将 float64 拆分为各占 26 位的两部分，两部分之积都可以精确表示
+    c = 134217729.0 * a
+    high = c - (c - a)
+    return high, a - high
+
+
+@functools.lru_cache(maxsize=None)
+def _wide_table():
+    # 10^p = (high + low) * 2^shift，high 在 [1, 2) 之间，同时返回 high 拆分后的两部分。使用分数精确计算，第一次使用时生成
+    from fractions import Fraction
+
+    high = np.empty(len(_WIDE_POWERS))
+    low = np.empty(len(_WIDE_POWERS))
+    shift = np.empty(len(_WIDE_POWERS), dtype=np.int64)
+    for i, p in enumerate(_WIDE_POWERS):
+        value = Fraction(10) ** p
+        exponent = value.numerator.bit_length() - value.denominator.bit_length()
+        if Fraction(2) ** exponent > value:
+            exponent -= 1
+        normalized = value / Fraction(2) ** exponent
+        high[i] = float(normalized)
+        low[i] = float(normalized - Fraction(high[i]))
+        shift[i] = exponent
+    return high, _split(high), low, shift
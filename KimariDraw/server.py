@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+server.py
+Long-lived render server, i.e. the `kimaridraw serve` subcommand, which keeps proplot and the fonts warm between figures.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import argparse
+import json
+import os
+import socketserver
+import stat
+import sys
+import time
+
+from KimariDraw import cache, profiling
+from KimariDraw.batch import add_profile_arguments, profile_report
+from KimariDraw.kimaridraw import create_job, job_from_config, validate
+
+
+def warm_up():
+    """
+    导入 proplot 并绘制一张空白的图片，使得字体缓存、rc 配置以及后端都提前加载好，第一个任务不需要再付出这些时间
+    """
+    import io
+
+    from KimariDraw.kimaridraw import new_figure, style_context
+
+    # 使用默认的字体以及字号，使得默认字体的缓存也提前加载好
+    with style_context('Arial', [10.5, 12, 14]):
+        fig, ax = new_figure((1, 1))
+        ax.format(xlabel='x', ylabel='y', title='title')
+        fig.savefig(io.BytesIO(), format='png')
+
+
+def run_job(job, save_dir=None):
+    """
+    执行一个绘制任务
+
+    Notes:
+        任务是一个字典，有两种形式：
+        1. {"toml": "path/to/job.toml"}，与 kimaridraw render 相同
+        2. {"config": {...}, "base_dir": "path/to/data"}，config 与 toml 文件的结构相同，其中的相对路径相对于 base_dir，
+           base_dir 默认为服务器的当前文件夹。config 中有 grid 时为多子图的图片
+        两种形式都可以使用 output_dir 指定保存光谱的文件夹
+
+    Args:
+        job(dict): 绘制任务
+        save_dir(str): 默认的保存光谱的文件夹
+
+    Returns:
+        save_name(str or list[str]): 保存的光谱文件路径，保存了多个格式时为列表
+    """
+    if not isinstance(job, dict):
+        raise ValueError("A job must be a JSON object.")
+
+    if 'toml' in job:
+        validate(job['toml'])
+        spectrum = create_job(job['toml'])
+    elif 'config' in job:
+        if not isinstance(job['config'], dict):
+            raise ValueError("'config' must be a JSON object.")
+        spectrum = job_from_config(job['config'], os.path.abspath(job.get('base_dir', os.curdir)))
+    else:
+        raise ValueError("A job must contain either 'toml' or 'config'.")
+
+    save_dir = job.get('output_dir', save_dir)
+    if save_dir is not None:
+        os.makedirs(save_dir, exist_ok=True)
+
+    try:
+        return spectrum.draw_spectrum(save_dir=save_dir, verbose=False)
+    finally:
+        # 关闭保留的图片，常驻进程中不能累积图片
+        spectrum.close()
+
+
+def handle_line(line, save_dir=None, report=None):
+    """
+    处理一行 JSON 格式的任务，返回一行 JSON 格式的结果
+
+    Notes:
+        成功时返回 {"ok": true, "output": 保存的光谱文件路径 (多个格式时为列表), "elapsed": 耗时 (秒)}，
+        失败时返回 {"ok": false, "error": 错误信息, "elapsed": 耗时 (秒)}。如果任务中有 id，则原样返回。
+        开启性能记录时，结果中还有 profile，即每个阶段的耗时以及内存峰值
+
+    Args:
+        line(str): 一行 JSON
+        save_dir(str): 默认的保存光谱的文件夹
+        report(profiling.Report): 收集每个任务的性能记录，默认为 None，即不收集
+
+    Returns:
+        reply(str): 一行 JSON，不包含换行符
+    """
+    start = time.perf_counter()
+    reply = {}
+    record = None
+    try:
+        job = json.loads(line)
+        if isinstance(job, dict) and 'id' in job:
+            reply['id'] = job['id']
+        name = str(job.get('toml', job.get('id', 'config'))) if isinstance(job, dict) else 'job'
+        with profiling.job(name) as record:
+            save_name = run_job(job, save_dir)
+    except Exception as e:
+        reply.update(ok=False, error=f"{type(e).__name__}: {str(e).strip()}")
+    else:
+        if isinstance(save_name, str):
+            reply.update(ok=True, output=os.path.abspath(save_name))
+        else:
+            reply.update(ok=True, output=[os.path.abspath(name) for name in save_name])
+    reply['elapsed'] = round(time.perf_counter() - start, 6)
+    if record is not None:
+        reply['profile'] = record
+        if report is not None:
+            report.add(record)
+
+    return json.dumps(reply)
+
+
+def serve_stdin(save_dir=None, report=None):
+    """
+    从标准输入逐行读取任务，并将结果逐行写入标准输出，直到标准输入关闭
+
+    Notes:
+        标准输出只用于返回结果，任务执行过程中的其他输出都会被重定向到标准错误，避免破坏 JSON 行协议
+
+    Args:
+        save_dir(str): 默认的保存光谱的文件夹
+        report(profiling.Report): 收集每个任务的性能记录，默认为 None，即不收集
+    """
+    protocol = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            protocol.write(handle_line(line, save_dir, report) + "\n")
+            protocol.flush()
+    finally:
+        sys.stdout = protocol
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    # 一个连接中可以发送多行任务，每一行返回一行结果
+    def handle(self):
+        for line in self.rfile:
+            line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            self.wfile.write((handle_line(line, self.server.save_dir, self.server.report) + "\n").encode('utf-8'))
+            self.wfile.flush()
+
+
+def remove_stale_socket(path):
+    """
+    删除上一次异常退出时残留的套接字文件。路径存在但不是套接字时报错，不会删除用户的其他文件
+
+    Args:
+        path(str): Unix 套接字的路径
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} already exists and is not a socket, refusing to replace it.")
+    os.remove(path)
+
+
+def serve_socket(path, save_dir=None, report=None):
+    """
+    在 Unix 套接字上监听任务，协议与标准输入模式相同。任务按照到达的顺序逐个执行，因为 matplotlib 不是线程安全的
+
+    Args:
+        path(str): Unix 套接字的路径
+        save_dir(str): 默认的保存光谱的文件夹
+        report(profiling.Report): 收集每个任务的性能记录，默认为 None，即不收集
+    """
+    remove_stale_socket(path)
+
+    with socketserver.UnixStreamServer(path, _JobHandler) as server:
+        server.save_dir = save_dir
+        server.report = report
+        print(f"KimariDraw is serving on {path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(path)
+
+
+def serve_main(argv):
+    """
+    kimaridraw serve 子命令的入口
+
+    Args:
+        argv(list[str]): serve 之后的命令行参数
+
+    Returns:
+        exit_code(int): 正常退出返回 0，套接字的路径被其他文件占用时返回 2
+    """
+    parser = argparse.ArgumentParser(prog='KimariDraw serve',
+                                     description='Keep a warm render process and draw spectra of JSON jobs read from '
+                                                 'stdin or a Unix socket, one job per line.')
+    parser.add_argument('--socket', '-s', default=None,
+                        help='Path of the Unix socket to listen on, default is to read jobs from stdin')
+    parser.add_argument('--output-dir', '-o', default=None,
+                        help='Default folder to save the spectra, default is the current folder')
+    parser.add_argument('--no-cache', action='store_true', help='Do not use the cache of parsed spectral data')
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.no_cache:
+        cache.set_enabled(False)
+    report = profile_report(args)
+
+    if args.socket is not None and not hasattr(socketserver, 'UnixStreamServer'):
+        parser.error("Unix sockets are not supported on this platform, read jobs from stdin instead")
+    if args.socket is not None:
+        # 在预热之前检查套接字的路径
+        try:
+            remove_stale_socket(args.socket)
+        except FileExistsError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+
+    warm_up()
+
+    if args.socket is None:
+        serve_stdin(args.output_dir, report)
+    else:
+        serve_socket(args.socket, args.output_dir, report)
+
+    # 退出时将汇总的性能记录输出到标准错误
+    if report is not None:
+        print(report.summary(), file=sys.stderr)
+
+    return 0
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+stats.py
+Per-column summary statistics of spectrum data, computed once when the data is loaded.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import numpy as np
+
+
+class ColumnStats:
+    """
+    每一列数据的统计量，在读取数据时计算一次，之后自动生成刻度、判断是否显示零坐标轴等都直接使用这些统计量
+
+    Attributes:
+        minimum (numpy.ndarray): 每一列有限值的最小值，没有有限值的列为 nan
+        maximum (numpy.ndarray): 每一列有限值的最大值，没有有限值的列为 nan
+        negative (numpy.ndarray): 每一列是否存在负数
+        finite (numpy.ndarray): 每一列是否全部为有限值
+        rows (int): 行数
+    """
+
+    def __init__(self, data):
+        # DataFrame 的各列都是 float64 时，np.asarray 不会复制数据。float32 的数据直接计算，不转换为 float64
+        array = np.asarray(data)
+        if array.dtype not in (np.float64, np.float32):
+            array = array.astype(np.float64)
+        if array.ndim == 1:
+            array = array[:, None]
+        self.rows = array.shape[0]
+
+        finite = np.isfinite(array)
+        self.finite = finite.all(axis=0)
+        if array.shape[0] == 0:
+            self.minimum = np.full(array.shape[1], np.nan)
+            self.maximum = np.full(array.shape[1], np.nan)
+        elif self.finite.all():
+            # 通常的情况：全部为有限值，直接求最小值和最大值
+            self.minimum = array.min(axis=0).astype(np.float64)
+            self.maximum = array.max(axis=0).astype(np.float64)
+        else:
+            # 忽略 nan 以及 inf，没有有限值的列为 nan
+            self.minimum = np.where(finite, array, np.inf).min(axis=0).astype(np.float64)
+            self.maximum = np.where(finite, array, -np.inf).max(axis=0).astype(np.float64)
+            empty = ~finite.any(axis=0)
+            self.minimum[empty] = np.nan
+            self.maximum[empty] = np.nan
+        del finite
+
+        self.negative = self.minimum < 0
+
+    def __str__(self):
+        return f"ColumnStats Object:\n" \
+               f"  rows: {self.rows}\n" \
+               f"  minimum: {self.minimum}\n" \
+               f"  maximum: {self.maximum}\n" \
+               f"  negative: {self.negative}\n" \
+               f"  finite: {self.finite}\n"
+
+    @classmethod
+    def stack(cls, *stats):
+        """
+        将若干组列的统计量按顺序合并，例如分别计算的 x 和 y
+
+        Args:
+            *stats(ColumnStats): 每一组列的统计量，行数必须相同
+
+        Returns:
+            stats(ColumnStats): 合并后的统计量
+        """
+        merged = cls.__new__(cls)
+        merged.rows = stats[0].rows
+        for name in ('minimum', 'maximum', 'negative', 'finite'):
+            setattr(merged, name, np.concatenate([getattr(item, name) for item in stats]))
+        return merged
+
+    @property
+    def columns(self):
+        """
+        列数
+        """
+        return self.minimum.size
+
+    def range(self, columns=slice(None)):
+        """
+        返回若干列合在一起的最小值和最大值
+
+        Args:
+            columns(slice or list[int]): 列的下标，默认为全部的列
+
+        Returns:
+            min_value(float): 最小值
+            max_value(float): 最大值
+        """
+        return float(np.nanmin(self.minimum[columns])), float(np.nanmax(self.maximum[columns]))
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+sweep.py
+Parameter sweeps: render every combination of the values listed in the [sweep] table of one TOML file.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import itertools
+import re
+import string
+
+# [sweep] 中可以扫描的表
+SWEEP_TABLES = ('curve', 'line', 'spectrum', 'broaden', 'ensemble', 'units')
+# 不影响曲线和直线数据的参数，只有这些参数不同的光谱属于同一组，依次在同一张图片上原地修改
+_DISPLAY_KEYS = {('curve', 'color'), ('curve', 'style'), ('curve', 'legend'), ('line', 'color'), ('units', 'secondary')}
+
+
+def parameters(sweep):
+    """
+    检查 [sweep] 表，返回扫描的全部参数
+
+    Notes:
+        [sweep] 中的每个子表对应 toml 文件中的一个表，子表中的每个键为这个表中的属性，值为需要扫描的值的列表，例如
+        [sweep.broaden] 中的 fwhm = [0.2, 0.3] 依次使用 [broaden] 表中 fwhm 为 0.2 以及 0.3 的配置
+
+    Args:
+        sweep(dict): toml 文件中 [sweep] 表的内容
+
+    Returns:
+        params(list[tuple[str, str, list]]): 每个参数的表名、属性名以及值的列表
+    """
+    if not isinstance(sweep, dict) or not sweep:
+        raise ValueError("The 'sweep' configuration must contain tables such as [sweep.spectrum] with lists of values.")
+
+    params = []
+    for table, values in sweep.items():
+        if table not in SWEEP_TABLES:
+            raise ValueError(f"Unknown table '{table}' in the 'sweep' configuration. "
+                             f"Supported tables are: {', '.join(SWEEP_TABLES)}")
+        if not isinstance(values, dict):
+            raise ValueError(f"'sweep.{table}' must be a table of lists, for example [sweep.{table}].")
+        for key, options in values.items():
+            if not isinstance(options, list) or not options:
+                raise ValueError(f"'sweep.{table}.{key}' must be a non-empty list of values.")
+            params.append((table, key, options))
+
+    return params
+
+
+def expand(sweep):
+    """
+    展开全部参数的笛卡尔积
+
+    Args:
+        sweep(dict): toml 文件中 [sweep] 表的内容
+
+    Returns:
+        params(list[tuple[str, str, list]]): parameters 返回的参数
+        variants(list[tuple]): 每一种组合中每个参数的值，与 params 的顺序相同
+    """
+    params = parameters(sweep)
+    return params, list(itertools.product(*(options for _, _, options in params)))
+
+
+def variant_config(toml_data, params, values):
+    """
+    返回一种组合的配置，即将扫描的值写入对应的表之后、去掉 [sweep] 表的配置
+
+    Args:
+        toml_data(dict): toml 文件的内容
+        params(list[tuple[str, str, list]]): parameters 返回的参数
+        values(tuple): 每个参数的值
+
+    Returns:
+        config(dict): 这一种组合的配置，不会修改 toml_data
+    """
+    config = {key: value for key, value in toml_data.items() if key != 'sweep'}
+    for (table, key, _), value in zip(params, values):
+        config[table] = dict(config.get(table) or {}, **{key: value})
+    return config
+
+
+def groups(params, variants):
+    """
+    按照影响数据的参数将组合分组，同一组的光谱使用相同的数据
+
+    Args:
+        params(list[tuple[str, str, list]]): parameters 返回的参数
+        variants(list[tuple]): expand 返回的组合
+
+    Returns:
+        groups(list[list[int]]): 每一组中组合的下标
+    """
+    data = [i for i, (table, key, _) in enumerate(params)
+            if (table, key) not in _DISPLAY_KEYS and (table != 'spectrum' or key == 'dtype')]
+    grouped = {}
+    for index, values in enumerate(variants):
+        grouped.setdefault(repr([values[i] for i in data]), []).append(index)
+    return list(grouped.values())
+
+
+def file_groups(toml_file):
+    """
+    返回 toml 文件中参数扫描的分组，用于将一个参数扫描分为多个任务并行绘制
+
+    Args:
+        toml_file(str): toml 文件路径
+
+    Returns:
+        groups(list[list[int]]): 每一组中组合的下标，没有 [sweep] 表时为 None
+    """
+    from KimariDraw.kimaridraw import load_config
+
+    toml_data = load_config(toml_file)
+    if 'sweep' not in toml_data:
+        return None
+    return groups(*expand(toml_data['sweep']))
+
+
+def format_value(value):
+    """
+    将参数的值转换为可以用于文件名的文本，例如 [200, 400, 50] 为 200-400-50，0.30 为 0.3
+
+    Args:
+        value: 参数的值
+
+    Returns:
+        text(str): 只包含字母、数字以及 . + - 的文本
+    """
+    if isinstance(value, (list, tuple)):
+        return '-'.join(format_value(item) for item in value)
+    if isinstance(value, dict):
+        return '-'.join(f"{key}{format_value(item)}" for key, item in value.items())
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, float):
+        return f"{value:g}"
+    return re.sub(r'[^\w.+-]', '', str(value))
+
+
+def name_fields(params, values, index):
+    """
+    生成一种组合的文件名模板字段
+
+    Notes:
+        1. 每个参数的值可以用属性名引用，例如 {fwhm}，也可以用表名加属性名引用，例如 {broaden_fwhm}。
+           两个表中有同名的属性时只能使用后者
+        2. {params} 为全部参数的名字和值，例如 fwhm0.3_x_limit200-400-50；{index} 为组合的编号，从 1 开始
+
+    Args:
+        params(list[tuple[str, str, list]]): parameters 返回的参数
+        values(tuple): 每个参数的值
+        index(int): 组合的下标
+
+    Returns:
+        fields(dict[str, str]): 文件名模板中可以使用的字段
+    """
+    keys = [key for _, key, _ in params]
+    fields = {}
+    parts = []
+    for (table, key, _), value in zip(params, values):
+        text = format_value(value)
+        fields[f"{table}_{key}"] = text
+        label = key if keys.count(key) == 1 else f"{table}_{key}"
+        fields[label] = text
+        parts.append(f"{label}{text}")
+    fields['params'] = '_'.join(parts)
+    fields['index'] = str(index + 1)
+    return fields
+
+
+def sweep_template(template, fields):
+    """
+    返回参数扫描中使用的文件名模板，模板中没有引用任何扫描的字段时添加 _{params}，使得每个组合的文件名不同
+
+    Args:
+        template(str): [spectrum] 中的 name_template
+        fields(dict[str, str]): name_fields 返回的字段
+
+    Returns:
+        template(str): 参数扫描中使用的文件名模板
+    """
+    used = {field for _, field, _, _ in string.Formatter().parse(template) if field}
+    if used & set(fields):
+        return template
+    return f"{template}_{{params}}"
+
+
+def render_variants(toml_data, current_folder, name=None, indices=None, save_dir=None, overwrite=None):
+    """
+    依次绘制并保存参数扫描中的组合
+
+    Notes:
+        1. 所有组合共用读取以及展宽的结果，参数相同的数据只读取或计算一次
+        2. 每个组合接管上一个组合保留的图片，只原地修改不同的部分，例如坐标轴的范围、标签或者曲线的数据。
+           字体、颜色等无法原地修改的属性不同时才重新创建图片
+        3. 批量绘制时每一组 (groups) 为一个任务，不同的组在不同的进程或者线程中同时绘制
+
+    Args:
+        toml_data(dict): 包含 [sweep] 表的 toml 文件的内容
+        current_folder(str): 相对路径所相对的文件夹
+        name(str): 光谱的名字，用于生成文件名，默认为 None
+        indices(list[int]): 需要绘制的组合的下标，默认为 None，即全部的组合
+        save_dir(str): 保存光谱的文件夹，默认为 None，即当前文件夹
+        overwrite(bool): 是否覆盖已有的同名文件，默认为 None，即使用 toml 文件中的设置
+
+    Returns:
+        save_names(list[str]): 保存的全部文件路径
+    """
+    from KimariDraw.kimaridraw import spectrum_from_config
+
+    if 'grid' in toml_data:
+        raise ValueError("The 'sweep' configuration is not supported for grid figures.")
+    params, variants = expand(toml_data['sweep'])
+    if indices is None:
+        indices = range(len(variants))
+
+    loaded = {}
+    previous = None
+    save_names = []
+    try:
+        for index in indices:
+            config = variant_config(toml_data, params, variants[index])
+            spectrum = spectrum_from_config(config, current_folder, name=name, loaded=loaded)
+            spectrum.name_fields = name_fields(params, variants[index], index)
+            spectrum.name_template = sweep_template(spectrum.name_template, spectrum.name_fields)
+            if overwrite is not None:
+                spectrum.overwrite = overwrite
+            if previous is not None:
+                spectrum.adopt(previous)
+            previous = spectrum
+
+            save_name = spectrum.draw_spectrum(save_dir=save_dir, verbose=False)
+            save_names.extend([save_name] if isinstance(save_name, str) else save_name)
+    finally:
+        # 关闭最后一个组合保留的图片
+        if previous is not None:
+            previous.close()
+
+    return save_names
+
+
+def sweep_inputs(toml_data, section):
+    """
+    返回 [sweep] 中扫描的某个表的 path，用于监视模式收集依赖的文件
+
+    Args:
+        toml_data(dict): toml 文件的内容
+        section(str): 表名，例如 curve 或者 line
+
+    Returns:
+        paths(list[str]): 扫描的路径
+    """
+    sweep = toml_data.get('sweep')
+    if not isinstance(sweep, dict) or not isinstance(sweep.get(section), dict):
+        return []
+    paths = sweep[section].get('path')
+    return [path for path in paths if isinstance(path, str)] if isinstance(paths, list) else []
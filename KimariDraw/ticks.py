@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+ticks.py
+Nice-number axis limits and tick intervals (1, 2 or 5 times a power of ten) for data of any magnitude.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import warnings
+
+import numpy as np
+
+# 刻度间距的尾数，间距总是这些数乘以 10 的整数次幂
+NICE_NUMBERS = (1.0, 2.0, 5.0, 10.0)
+# 默认的刻度数目
+DEFAULT_COUNT = 5
+
+# 比较浮点数时的相对容差，避免 0.30000000000000004 这样的误差使刻度多出一格
+_TOLERANCE = 1e-9
+# 绝对值超过 _LARGEST 的数据按照 _LARGEST 处理，计算范围以及刻度时不会溢出
+_LARGEST = 1e300
+# 小于 _SMALLEST 的范围 (例如次正规数) 或者小于数值的 _FLAT 倍的范围视为单个数值
+_SMALLEST = 1e-290
+_FLAT = 1e-12
+# 10^0 到 10^308，由整数转换得到，都是最接近的浮点数。NumPy 对数组计算的 10.0 ** k 可能有 1 ulp 的误差
+_POWERS_OF_TEN = np.array([float(10 ** k) for k in range(309)])
+
+
+def nice_step(span, count=DEFAULT_COUNT):
+    """
+    根据数据的范围计算刻度间距，间距为 1、2 或者 5 乘以 10 的整数次幂，并且刻度数目不超过 count
+
+    Args:
+        span(numpy.ndarray or float): 数据的范围，必须大于 0
+        count(int): 期望的刻度数目
+
+    Returns:
+        mantissa(numpy.ndarray): 间距的尾数，为 1、2、5 或者 10
+        exponent(numpy.ndarray): 间距的指数，间距为 mantissa * 10^exponent
+    """
+    raw = np.abs(np.asarray(span, dtype=np.float64)) / count
+    exponent = np.floor(np.log10(raw)).astype(np.int64)
+    residual = raw / _power(np.ones_like(raw), exponent)
+    # 选择不小于 residual 的最小的尾数
+    index = np.searchsorted(NICE_NUMBERS, residual * (1 - _TOLERANCE))
+    mantissa = np.asarray(NICE_NUMBERS)[np.minimum(index, len(NICE_NUMBERS) - 1)]
+
+    return mantissa, exponent
+
+
+def nice_limits(minimum, maximum, count=DEFAULT_COUNT, padding=0.0):
+    """
+    根据最小值和最大值计算整齐的坐标轴范围和刻度间距，对每一列向量化计算
+
+    Notes:
+        1. 范围的两端都是刻度间距的整数倍，并且包含 [minimum, maximum]
+        2. padding 为两端额外留出的空白，为数据范围的比例。数据不跨越 0 时，留白不会使范围跨越 0
+        3. 最小值等于最大值时，以数值的 10% 作为数据的范围，数值为 0 时以 [-0.5, 0.5] 作为数据的范围。
+           范围过小 (例如次正规数，或者与数值相比小于浮点数的精度) 时同样处理，数值接近 0 时视为 0
+        4. 最小值或最大值不是有限值时 (例如没有任何有限值的列)，范围为 [0, 1]
+        5. 绝对值超过 1e300 的数据按照 ±1e300 处理，不会溢出
+
+    Args:
+        minimum(numpy.ndarray or float): 最小值
+        maximum(numpy.ndarray or float): 最大值
+        count(int): 期望的刻度数目
+        padding(float): 两端额外留出的空白，为数据范围的比例
+
+    Returns:
+        limits(numpy.ndarray): 形状为 (..., 3) 的数组，最后一维为最小值、最大值以及间距
+    """
+    minimum, maximum = np.broadcast_arrays(np.asarray(minimum, dtype=np.float64),
+                                           np.asarray(maximum, dtype=np.float64))
+    low, high = np.minimum(minimum, maximum), np.maximum(minimum, maximum)
+
+    # 没有有限值时使用 [0, 1]
+    missing = ~(np.isfinite(low) & np.isfinite(high))
+    low, high = np.where(missing, 0.0, low), np.where(missing, 1.0, high)
+
+    low, high = np.clip(low, -_LARGEST, _LARGEST), np.clip(high, -_LARGEST, _LARGEST)
+
+    # 最小值等于最大值或者范围过小时，以数值的 10% 作为范围
+    center = low / 2 + high / 2
+    flat = high - low <= np.maximum(np.abs(center) * _FLAT, _SMALLEST)
+    half = np.where(np.abs(center) < _SMALLEST, 0.5, np.abs(center) * 0.05)
+    center = np.where(np.abs(center) < _SMALLEST, 0.0, center)
+    low, high = np.where(flat, center - half, low), np.where(flat, center + half, high)
+
+    # 两端留白，不使只有正数或只有负数的数据跨越 0
+    pad = (high - low) * padding
+    low = np.where((low >= 0) & (low - pad < 0), 0.0, low - pad)
+    high = np.where((high <= 0) & (high + pad > 0), 0.0, high + pad)
+
+    mantissa, exponent = nice_step(high - low, count)
+    step = _power(mantissa, exponent)
+    lower = np.floor(low / step + _TOLERANCE)
+    upper = np.ceil(high / step - _TOLERANCE)
+    # 使用整数倍乘以 10 的整数次幂计算，使得 0.1 这样的刻度没有额外的舍入误差
+    lower, upper = _power(lower * mantissa, exponent), _power(upper * mantissa, exponent)
+
+    return np.stack((lower + 0.0, upper + 0.0, step), axis=-1)
+
+
+def data_range(array, percentile=None):
+    """
+    计算数组每一列的范围，可以按照百分位数忽略两端的极端值，例如 Multiwfn 输出中 1E-287 这样的尾部
+
+    Args:
+        array(numpy.ndarray): 形状为 (n,) 或者 (n, k) 的数组
+        percentile(float): 两端各忽略的百分比，例如 0.5 表示使用 0.5% 到 99.5% 分位数作为范围，默认为 None，即最小值和最大值
+
+    Returns:
+        minimum(numpy.ndarray): 每一列的最小值
+        maximum(numpy.ndarray): 每一列的最大值
+    """
+    array = np.asarray(array, dtype=np.float64)
+    array = np.where(np.isfinite(array), array, np.nan)
+
+    with warnings.catch_warnings():
+        # 没有有效值的列为 nan，nice_limits 会将其处理为 [0, 1]
+        warnings.simplefilter("ignore", RuntimeWarning)
+        if percentile is None:
+            return np.nanmin(array, axis=0), np.nanmax(array, axis=0)
+        minimum, maximum = np.nanpercentile(array, [percentile, 100 - percentile], axis=0)
+
+    return minimum, maximum
+
+
+def as_limit(limits):
+    """
+    将 nice_limits 的结果转换为 Spectrum 使用的 [min, max, step] 列表，整数值转换为 int
+
+    Args:
+        limits(numpy.ndarray): 长度为 3 的数组
+
+    Returns:
+        limit(list[float, float, float]): 最小值、最大值以及间距
+    """
+    return [int(value) if float(value).is_integer() and abs(value) < 2 ** 53 else float(value) for value in limits]
+
+
+def _power(mantissa, exponent):
+    # 计算 mantissa * 10^exponent，负指数时除以 10 的正整数次幂，使得 0.1、0.05 这样的结果是最接近的浮点数
+    exponent = np.asarray(exponent)
+    scale = _POWERS_OF_TEN[np.minimum(np.abs(exponent), _POWERS_OF_TEN.size - 1)]
+    # np.where 会计算两个分支，未被选择的分支可能溢出
+    with np.errstate(over="ignore", under="ignore"):
+        return np.where(exponent >= 0, mantissa * scale, mantissa / scale)
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+units.py
+Conversion between the energy units used by Multiwfn spectra: nm, eV and cm^-1.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import numpy as np
+
+# hc，单位为 eV nm
+HC_EV_NM = 1239.84198
+# 波长 (nm) 与波数 (cm^-1) 的乘积
+NM_WAVENUMBER = 1.0e7
+# 1 eV 对应的波数，单位为 cm^-1，由前两个常数得到，使得 nm -> eV -> cm^-1 与 nm -> cm^-1 的结果一致
+EV_TO_WAVENUMBER = NM_WAVENUMBER / HC_EV_NM
+
+# 支持的单位以及它们的别名
+UNITS = ("nm", "eV", "cm-1")
+_ALIASES = {
+    "nm": "nm",
+    "ev": "eV",
+    "cm-1": "cm-1",
+    "cm^-1": "cm-1",
+    "1/cm": "cm-1",
+    "wavenumber": "cm-1",
+}
+
+
+def normalize_unit(unit):
+    """
+    将单位的名称规范化为 nm、eV 或者 cm-1
+
+    Args:
+        unit(str): 单位的名称，例如 nm、eV、cm^-1
+
+    Returns:
+        unit(str): 规范化后的单位
+    """
+    key = str(unit).strip().lower()
+    if key not in _ALIASES:
+        raise ValueError(f"Unsupported unit '{unit}'. Supported units are: {', '.join(UNITS)}")
+    return _ALIASES[key]
+
+
+def convert(values, from_unit, to_unit):
+    """
+    在 nm、eV 以及 cm^-1 之间转换 x 坐标，nm 与另外两个单位之间是倒数关系
+
+    Args:
+        values(numpy.ndarray or float): 需要转换的数值
+        from_unit(str): 原来的单位
+        to_unit(str): 目标单位
+
+    Returns:
+        values(numpy.ndarray or float): 转换后的数值
+    """
+    from_unit, to_unit = normalize_unit(from_unit), normalize_unit(to_unit)
+    values = np.asarray(values, dtype=np.float64)
+    if from_unit == to_unit:
+        return values
+
+    with np.errstate(divide="ignore"):
+        # nm 与 cm^-1 之间直接转换
+        if {from_unit, to_unit} == {"nm", "cm-1"}:
+            return NM_WAVENUMBER / values
+        # 其他情况先统一转换为 eV，再转换为目标单位
+        if from_unit == "nm":
+            energy = HC_EV_NM / values
+        elif from_unit == "cm-1":
+            energy = values / EV_TO_WAVENUMBER
+        else:
+            energy = values
+
+        if to_unit == "nm":
+            return HC_EV_NM / energy
+        if to_unit == "cm-1":
+            return energy * EV_TO_WAVENUMBER
+        return energy
+
+
+# 每个单位默认的坐标轴标签
+LABELS = {
+    "nm": "Wavelength (nm)",
+    "eV": "Energy (eV)",
+    "cm-1": "Wavenumber (cm$^{-1}$)",
+}
+
+
+def is_reciprocal(from_unit, to_unit):
+    """
+    判断两个单位之间是否为倒数关系，即 nm 与 eV 或者 cm^-1 之间
+
+    Args:
+        from_unit(str): 原来的单位
+        to_unit(str): 目标单位
+
+    Returns:
+        reciprocal(bool): 是否为倒数关系
+    """
+    from_unit, to_unit = normalize_unit(from_unit), normalize_unit(to_unit)
+    return from_unit != to_unit and "nm" in (from_unit, to_unit)
+
+
+def jacobian(values, from_unit, to_unit):
+    """
+    计算 |d(from)/d(to)|，用于将单位 x 区间内的强度 (例如每 nm 的强度) 转换为目标单位下的强度
+
+    Notes:
+        1. 倒数关系 from = k / to 的导数为 k / to^2，k 为 hc 或者 1e7
+        2. eV 与 cm^-1 之间为线性关系，导数为常数
+
+    Args:
+        values(numpy.ndarray): 目标单位下的 x
+        from_unit(str): 原来的单位
+        to_unit(str): 目标单位
+
+    Returns:
+        factor(numpy.ndarray): 每个 x 处的系数
+    """
+    from_unit, to_unit = normalize_unit(from_unit), normalize_unit(to_unit)
+    values = np.asarray(values, dtype=np.float64)
+    if from_unit == to_unit:
+        return np.ones_like(values)
+    if is_reciprocal(from_unit, to_unit):
+        constant = NM_WAVENUMBER if "cm-1" in (from_unit, to_unit) else HC_EV_NM
+        with np.errstate(divide="ignore"):
+            return constant / (values * values)
+    # eV 与 cm^-1 之间，cm^-1 = eV * EV_TO_WAVENUMBER
+    return np.full_like(values, EV_TO_WAVENUMBER if to_unit == "eV" else 1.0 / EV_TO_WAVENUMBER)
+
+
+def transforms(from_unit, to_unit):
+    """
+    返回 from_unit 到 to_unit 以及反方向的转换函数，例如用于 proplot 的 dualx 显示另一个单位的坐标轴
+
+    Args:
+        from_unit(str): 原来的单位
+        to_unit(str): 目标单位
+
+    Returns:
+        functions(tuple[callable, callable]): 正向以及反向的转换函数
+    """
+    from functools import partial
+
+    return (partial(convert, from_unit=from_unit, to_unit=to_unit),
+            partial(convert, from_unit=to_unit, to_unit=from_unit))
+
+
+def resample(x, ys, points=None):
+    """
+    将曲线线性插值到均匀的网格上，所有的列共用一次查找
+
+    Notes:
+        网格点在 x 中的位置由一次 np.interp 得到，整数部分为左侧数据点的下标，小数部分为插值的权重。
+        y 转置为每一列连续的布局之后按照下标取出两侧的数据点，原地计算插值
+
+    Args:
+        x(numpy.ndarray): 单调递增的 x
+        ys(numpy.ndarray): 形状为 (len(x), k) 的 y
+        points(int): 网格的点数，默认为 None，即与 x 相同
+
+    Returns:
+        grid(numpy.ndarray): 均匀的网格
+        values(numpy.ndarray): 网格上的 y，形状为 (points, k)
+    """
+    points = x.size if points is None else int(points)
+    if points < 2:
+        raise ValueError("points must be at least 2.")
+    grid = np.linspace(x[0], x[-1], points)
+    position = np.interp(grid, x, np.arange(x.size, dtype=np.float64))
+    index = np.minimum(position.astype(np.int64), x.size - 2)
+    weight = position - index
+
+    columns = np.ascontiguousarray(ys.T)
+    left = np.take(columns, index, axis=1)
+    values = np.take(columns, index + 1, axis=1)
+    values -= left
+    values *= weight
+    values += left
+    return grid, values.T
+
+
+class Conversion:
+    """
+    x 坐标的单位转换，位于读取数据与创建 Spectrum 之间，通常来自 toml 文件中的 [units] 表
+
+    Notes:
+        1. 倒数关系的单位 (nm 与 eV、cm^-1) 转换之后 x 不再均匀并且顺序相反，曲线按照 x 重新排序，
+           默认插值到目标单位下均匀的网格上。x 不大于 0 的点 (例如从 0 cm^-1 开始的红外光谱) 无法转换，会被去掉
+        2. jacobian 为 True 时曲线的 y 乘以 |d(from)/d(to)|，用于单位 x 区间内的强度，使得曲线下的面积不变。
+           摩尔吸光系数、振子强度展宽得到的曲线等与 x 的区间无关的量不需要乘以这个系数，因此默认为 False
+        3. 直线 (跃迁) 只转换位置，强度不变
+
+    Attributes:
+        from_unit (str): 数据中 x 的单位
+        to_unit (str): 绘图使用的单位
+        jacobian (bool): 曲线是否乘以雅可比系数
+        resample (bool): 是否将曲线插值到目标单位下均匀的网格上
+        points (int): 插值网格的点数，为 None 时与原来的曲线相同
+        secondary (str): 图片顶部第二个 x 轴的单位，为 None 时不显示
+    """
+
+    # [units] 表中可以使用的属性
+    KEYS = ("from", "to", "jacobian", "resample", "points", "secondary")
+
+    def __init__(self, from_unit, to_unit, jacobian=False, resample=True, points=None, secondary=None):
+        self.from_unit = normalize_unit(from_unit)
+        self.to_unit = normalize_unit(to_unit)
+        self.jacobian = bool(jacobian)
+        self.resample = bool(resample)
+        self.points = None if points is None else int(points)
+        self.secondary = None if secondary is None else normalize_unit(secondary)
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        根据 toml 文件中的 [units] 表创建
+
+        Args:
+            config(dict): [units] 表的内容，from 以及 to 必须配置
+
+        Returns:
+            conversion(Conversion): 单位转换
+        """
+        unknown = set(config) - set(cls.KEYS)
+        if unknown:
+            raise ValueError(f"Unknown keys in the 'units' configuration: {', '.join(sorted(unknown))}")
+        for key in ("from", "to"):
+            if key not in config:
+                raise ValueError(f"Missing '{key}' in the 'units' configuration. It is required.")
+        return cls(config["from"], config["to"], jacobian=config.get("jacobian", False),
+                   resample=config.get("resample", True), points=config.get("points"),
+                   secondary=config.get("secondary"))
+
+    @property
+    def key(self):
+        """
+        影响转换结果的属性，用于缓存的键
+        """
+        return f"{self.from_unit}>{self.to_unit};jacobian={self.jacobian};resample={self.resample};" \
+               f"points={self.points}"
+
+    @property
+    def identity(self):
+        """
+        单位相同时不需要转换
+        """
+        return self.from_unit == self.to_unit
+
+    def _valid(self, x):
+        # 倒数关系的单位只能转换大于 0 的 x
+        if is_reciprocal(self.from_unit, self.to_unit):
+            return x > 0
+        return np.isfinite(x)
+
+    def curve(self, curve):
+        """
+        转换曲线数据
+
+        Args:
+            curve(numpy.ndarray): 第一列为 x 的曲线数据
+
+        Returns:
+            curve(numpy.ndarray): 转换后的 float64 曲线数据，x 单调递增
+        """
+        curve = np.asarray(curve, dtype=np.float64)
+        if self.identity:
+            return curve
+        curve = curve[self._valid(curve[:, 0])]
+        if curve.shape[0] < 2:
+            raise ValueError(f"The curve has fewer than two points that can be converted from {self.from_unit} "
+                             f"to {self.to_unit}.")
+
+        x = convert(curve[:, 0], self.from_unit, self.to_unit)
+        ys = curve[:, 1:]
+        if self.jacobian:
+            ys = ys * jacobian(x, self.from_unit, self.to_unit)[:, None]
+        # 单调的 x 转换之后仍然单调，递减时直接反转，不需要排序
+        step = np.diff(x)
+        if np.all(step < 0):
+            x, ys = x[::-1], ys[::-1]
+        elif not np.all(step >= 0):
+            order = np.argsort(x, kind="stable")
+            x, ys = x[order], ys[order]
+        if self.resample:
+            x, ys = resample(x, ys, self.points)
+
+        data = np.empty((x.size, ys.shape[1] + 1))
+        data[:, 0] = x
+        data[:, 1:] = ys
+        return data
+
+    def line(self, line):
+        """
+        转换直线数据，只转换跃迁的位置
+
+        Args:
+            line(numpy.ndarray): 第一列为跃迁位置的直线数据
+
+        Returns:
+            line(numpy.ndarray): 转换后的 float64 直线数据
+        """
+        line = np.array(line, dtype=np.float64)
+        if self.identity:
+            return line
+        line = line[self._valid(line[:, 0])]
+        line[:, 0] = convert(line[:, 0], self.from_unit, self.to_unit)
+        return line
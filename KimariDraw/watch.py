@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+watch.py
+Watch mode of `kimaridraw render --watch`, which re-renders only the jobs whose TOML or data files changed.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import glob
+import os
+import time
+
+from KimariDraw.batch import expand_inputs, render_batch
+
+# 一次修改之后等待的时间 (秒)，这段时间内没有新的修改才开始绘制，Multiwfn 分多次写入一个文件时只会绘制一次
+DEBOUNCE = 0.3
+# 没有 inotify 时轮询文件的间隔 (秒)
+POLL_INTERVAL = 0.5
+
+
+def job_inputs(toml_file, _seen=None):
+    """
+    返回一个任务依赖的全部文件，这些文件中任何一个发生变化时都需要重新绘制这个任务
+
+    Notes:
+        1. 包括 toml 文件本身、curve 和 line 的数据文件、ensemble 中的文件以及能量的 csv 文件
+        2. 多子图的图片还包括每个子图的 toml 文件以及它们依赖的文件
+        3. toml 文件无法解析时 (例如正在编辑) 只返回 toml 文件本身，再次修改之后会重新解析
+
+    Args:
+        toml_file(str): toml 文件路径
+
+    Returns:
+        inputs(set[str]): 依赖的文件的绝对路径
+    """
+    from KimariDraw.kimaridraw import load_config
+
+    toml_file = os.path.abspath(toml_file)
+    seen = set() if _seen is None else _seen
+    seen.add(toml_file)
+    inputs = {toml_file}
+    try:
+        config = load_config(toml_file)
+    except Exception:
+        return inputs
+
+    folder = os.path.dirname(toml_file)
+
+    def resolve(path):
+        return os.path.abspath(path if os.path.isabs(path) else os.path.join(folder, path))
+
+    # curve 和 line 的数据文件，以及参数扫描中的数据文件
+    from KimariDraw.sweep import sweep_inputs
+
+    for section in ('curve', 'line'):
+        path = (config.get(section) or {}).get('path')
+        if isinstance(path, str):
+            inputs.add(resolve(path))
+        inputs.update(resolve(path) for path in sweep_inputs(config, section))
+
+    # 构象系综中的文件，通配符按照当前的文件展开
+    ensemble = config.get('ensemble')
+    if isinstance(ensemble, dict):
+        inputs.update(_ensemble_inputs(ensemble, folder, resolve))
+
+    # 多子图中每个子图的 toml 文件
+    for panel in config.get('panels') or []:
+        jobs = panel.get('jobs', panel.get('job')) or []
+        for file in [jobs] if isinstance(jobs, str) else jobs:
+            file = resolve(file)
+            if file not in seen:
+                inputs |= job_inputs(file, seen)
+
+    return inputs
+
+
+def _ensemble_inputs(ensemble, folder, resolve):
+    # ensemble 表中引用的文件，文件暂时不存在或者无法读取时跳过，toml 文件修改之后会重新展开
+    from KimariDraw.ensemble import _expand, read_energies
+
+    inputs = set()
+    for key in ('files', 'lines'):
+        if key in ensemble:
+            try:
+                inputs.update(os.path.abspath(file) for file in _expand(ensemble[key], folder))
+            except ValueError:
+                pass
+
+    energies = ensemble.get('energies')
+    if isinstance(energies, str):
+        csv_file = resolve(energies)
+        inputs.add(csv_file)
+        # 只有 csv 文件时，其中的文件名就是曲线文件
+        if 'files' not in ensemble and 'lines' not in ensemble:
+            try:
+                inputs.update(os.path.abspath(name) for name in read_energies(csv_file))
+            except (OSError, ValueError):
+                pass
+    elif isinstance(energies, dict) and 'files' not in ensemble and 'lines' not in ensemble:
+        inputs.update(resolve(name) for name in energies)
+
+    return inputs
+
+
+class PollingWatcher:
+    """
+    通过定时检查文件的修改时间以及大小发现变化，没有安装 inotify_simple 或者不是 Linux 时使用
+
+    Attributes:
+        interval (float): 轮询的间隔 (秒)
+        files (set[str]): 监视的文件
+        directories (set[str]): 监视其中新增或删除的 toml 文件的文件夹
+    """
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self.files = set()
+        self.directories = set()
+        # 每个文件以及文件夹上一次检查时的状态
+        self._state = {}
+
+    def watch(self, files, directories=()):
+        """
+        设置需要监视的文件以及文件夹，已经在监视的路径保留上一次的状态，绘制期间发生的变化不会丢失
+
+        Args:
+            files(set[str]): 需要监视的文件
+            directories(list[str]): 需要监视其中 toml 文件的文件夹
+        """
+        self.files, self.directories = set(files), set(directories)
+        paths = self.files | self.directories
+        self._state = {path: self._state[path] if path in self._state else self._stat(path) for path in paths}
+
+    def wait(self, timeout=None):
+        """
+        等待文件发生变化
+
+        Args:
+            timeout(float): 最长的等待时间 (秒)，默认为 None，即一直等待
+
+        Returns:
+            changed(set[str]): 发生变化的文件，以及新增或删除的 toml 文件所在的文件夹，超时时为空集合
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval if deadline is None else min(self.interval, max(deadline - time.monotonic(), 0))
+            time.sleep(delay)
+            changed = set()
+            for path, state in self._state.items():
+                current = self._stat(path)
+                if current != state:
+                    self._state[path] = current
+                    changed.add(path)
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        """
+        停止监视
+        """
+        self._state = {}
+
+    def _stat(self, path):
+        # 文件为修改时间和大小，文件夹为其中的 toml 文件，不存在时为 None
+        if path in self.directories:
+            return tuple(sorted(glob.glob(os.path.join(path, "*.toml"))))
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+
+class InotifyWatcher:
+    """
+    通过 Linux 的 inotify 发现变化，需要安装 inotify_simple
+
+    Notes:
+        监视的是文件所在的文件夹而不是文件本身，编辑器以及 Multiwfn 先写入临时文件再重命名时也能发现变化
+
+    Attributes:
+        files (set[str]): 监视的文件
+        directories (set[str]): 监视其中新增或删除的 toml 文件的文件夹
+    """
+
+    def __init__(self):
+        from inotify_simple import INotify, flags
+
+        self._inotify = INotify()
+        self._mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.CREATE | flags.DELETE
+        self.files = set()
+        self.directories = set()
+        # 每个被监视的文件夹的 watch descriptor
+        self._watches = {}
+
+    def watch(self, files, directories=()):
+        """
+        设置需要监视的文件以及文件夹，与 PollingWatcher.watch 相同
+        """
+        self.files, self.directories = set(files), set(directories)
+        folders = {os.path.dirname(path) for path in self.files} | self.directories
+        for folder in set(self._watches) - folders:
+            try:
+                self._inotify.rm_watch(self._watches.pop(folder))
+            except OSError:
+                pass
+        for folder in folders - set(self._watches):
+            try:
+                self._watches[folder] = self._inotify.add_watch(folder, self._mask)
+            except OSError:
+                # 文件夹不存在时无法监视，文件夹出现之后需要修改 toml 文件才会重新监视
+                pass
+
+    def wait(self, timeout=None):
+        """
+        等待文件发生变化，与 PollingWatcher.wait 相同
+        """
+        folders = {descriptor: folder for folder, descriptor in self._watches.items()}
+        events = self._inotify.read(timeout=None if timeout is None else int(timeout * 1000))
+        changed = set()
+        for event in events:
+            folder = folders.get(event.wd)
+            if folder is None or not event.name:
+                continue
+            path = os.path.join(folder, event.name)
+            if path in self.files:
+                changed.add(path)
+            elif folder in self.directories and event.name.endswith('.toml'):
+                changed.add(folder)
+        return changed
+
+    def close(self):
+        """
+        停止监视
+        """
+        self._inotify.close()
+
+
+def make_watcher(polling=False):
+    """
+    创建监视文件的对象，优先使用 inotify，没有安装 inotify_simple 时使用轮询
+
+    Args:
+        polling(bool): 是否强制使用轮询，例如网络文件系统上 inotify 无法收到其它机器的修改
+
+    Returns:
+        watcher(InotifyWatcher or PollingWatcher): 监视文件的对象
+    """
+    if not polling:
+        try:
+            return InotifyWatcher()
+        except (ImportError, OSError):
+            pass
+    return PollingWatcher()
+
+
+def wait_changes(watcher, debounce=DEBOUNCE):
+    """
+    等待文件发生变化，并合并之后 debounce 秒内连续发生的变化
+
+    Args:
+        watcher(InotifyWatcher or PollingWatcher): 监视文件的对象
+        debounce(float): 等待连续变化的时间 (秒)
+
+    Returns:
+        changed(set[str]): 发生变化的路径
+    """
+    changed = watcher.wait()
+    while True:
+        more = watcher.wait(debounce)
+        if not more:
+            return changed
+        changed |= more
+
+
+def watch(patterns, workers=None, save_dir=None, threads=False, polling=False, debounce=DEBOUNCE, report=None):
+    """
+    绘制全部的任务，之后监视 toml 文件及其依赖的数据文件，只重新绘制依赖的文件发生变化的任务，直到按下 Ctrl+C
+
+    Notes:
+        1. 所有任务共用一个监视对象以及一个进程池 (或者线程池)，进程池中的进程只需要导入一次 proplot
+        2. 没有变化的数据文件直接从解析结果的缓存中读取，只有发生变化的文件会被重新解析
+        3. 输入中的文件夹新增 toml 文件时会绘制这个新的任务，toml 文件被删除时不再监视它
+        4. 第一次绘制与 render 相同，按照 toml 文件中的 overwrite 设置决定是否添加编号；之后的重新绘制覆盖
+           这个任务上一次保存的文件，例如第一次保存为 uv_1.png 时之后一直覆盖 uv_1.png，不会覆盖用户已有的 uv.png
+        5. 每次绘制之前先更新监视的文件，绘制期间发生的修改会在绘制完成后触发下一次绘制，不会丢失
+
+    Args:
+        patterns(list[str]): 命令行中输入的文件、通配符或文件夹
+        workers(int): 进程池的进程数或者线程池的线程数，默认为 None，即 CPU 的核数。为 1 时直接在当前进程中绘制
+        save_dir(str): 保存光谱的文件夹，默认为 None，即当前文件夹
+        threads(bool): 是否使用线程池代替进程池，默认为 False
+        polling(bool): 是否强制使用轮询，默认为 False
+        debounce(float): 等待连续变化的时间 (秒)
+        report(profiling.Report): 收集每个任务的性能记录，默认为 None，即不收集
+
+    Returns:
+        exit_code(int): 按下 Ctrl+C 后返回 0
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    directories = sorted({os.path.abspath(pattern) for pattern in patterns if os.path.isdir(pattern)})
+
+    watcher = make_watcher(polling)
+    executor = None
+    if workers > 1:
+        executor = (ThreadPoolExecutor if threads else ProcessPoolExecutor)(max_workers=workers)
+
+    try:
+        files = expand_inputs(patterns)
+        inputs = {os.path.abspath(file): job_inputs(file) for file in files}
+        # 每个任务上一次保存的文件，重新绘制时覆盖这些文件
+        jobs, ledgers = files, {}
+        while True:
+            # 先开始监视再绘制，第一次绘制的过程中修改的文件同样会被发现
+            watcher.watch(set().union(*inputs.values()), directories)
+            if jobs:
+                render_batch(jobs, workers=workers, save_dir=save_dir, report=report, threads=threads,
+                             executor=executor, ledgers=ledgers)
+            print(f"\nWatching {len(watcher.files)} files of {len(inputs)} jobs ({type(watcher).__name__}), "
+                  f"press Ctrl+C to stop.")
+
+            changed = wait_changes(watcher, debounce)
+
+            # 重新展开输入，加入新增的 toml 文件，去掉已经删除的 toml 文件
+            files = [file for file in expand_inputs(patterns) if os.path.isfile(file)]
+            jobs = [file for file in files
+                    if os.path.abspath(file) not in inputs or inputs[os.path.abspath(file)] & changed]
+            # toml 文件可能引用了新的数据文件，重新收集发生变化的任务的依赖
+            rebuilt = {os.path.abspath(file) for file in jobs}
+            inputs = {os.path.abspath(file): job_inputs(file) if os.path.abspath(file) in rebuilt
+                      else inputs[os.path.abspath(file)] for file in files}
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+        return 0
+    finally:
+        watcher.close()
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+xlsx.py
+Fast reader of numeric Excel (.xlsx) sheets into NumPy arrays, with sheet and cell range selection.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import re
+import zipfile
+
+import numpy as np
+
+from KimariDraw.reader import CHUNK_SIZE, _check_columns
+
+# xlsx 中 XML 的命名空间
+_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_RELATIONSHIP = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+# 一行，r 为行号，以 /> 结束的是没有单元格的空行
+_ROW = re.compile(rb'<row\b[^>]*?\br="(\d+)"[^>]*?(/?)>')
+# 一行的起始标签以及内容，只在跳过表头时逐行使用
+_ROW_BLOCK = re.compile(rb'<row\b[^>]*?\br="(\d+)"[^>]*?(?:/>|>(.*?)</row>)', re.S)
+# 单元格的列，只匹配 r 为第一个属性的单元格，其他写法的文件使用 openpyxl 读取
+_REF = re.compile(rb'<c r="([A-Z]{1,3})\d+"')
+# 单元格的值
+_VALUE = re.compile(rb'<v>([^<]*)</v>')
+# 单元格范围，例如 A1:C100、B:D 或者 A2:C
+_RANGE = re.compile(r'^([A-Z]{0,3})([0-9]*)(?::([A-Z]{0,3})([0-9]*))?$')
+
+
+class _Irregular(Exception):
+    # 表格不是规整的数字表格，需要使用 openpyxl 逐个单元格读取
+    pass
+
+
+def load_xlsx(file_path, sheet=None, cells=None, columns=None, xrange=None, chunk_size=CHUNK_SIZE):
+    """
+    读取 Excel 文件中的数字表格，返回一个 C 连续的 float64 数组，不会构造 DataFrame
+
+    Notes:
+        1. 规整的数字表格 (每一行的单元格都相同并且都是数字) 直接分块解析表格的 XML，使用正则表达式以及 NumPy 整体转换，
+           不需要为每个单元格创建 Python 对象。其他的表格使用 openpyxl 的只读模式逐行读取
+        2. 范围开头包含文字的行视为表头，全部跳过。表头之后的空行被忽略，空单元格为 NaN，出现文字时报错
+        3. 公式单元格使用 Excel 保存时计算好的值
+
+    Args:
+        file_path(str): xlsx 文件的路径
+        sheet(str or int): 表格的名字或者从 0 开始的下标，默认为 None，即第一个表格
+        cells(str): 读取的单元格范围，例如 A1:C100、B:D 或者 A2:C，默认为 None，即整个表格
+        columns(list[int]): 需要的列的下标，0 为 x，相对于范围的第一列，默认为 None，即全部的列
+        xrange(list[float, float]): x 的范围，默认为 None，即全部的行
+        chunk_size(int): 每次解压的字节数
+
+    Returns:
+        data(numpy.ndarray): 形状为 (行数, 列数) 的 C 连续 float64 数组
+    """
+    bounds = parse_range(cells)
+    with zipfile.ZipFile(file_path) as archive:
+        member, name = _find_sheet(archive, sheet)
+        try:
+            data = _read_regular(archive, member, bounds, chunk_size)
+        except _Irregular:
+            data = None
+    if data is None:
+        data = _read_openpyxl(file_path, name, bounds)
+
+    if data.shape[0] == 0:
+        raise ValueError("The Excel sheet contains no numeric rows, use cells to select the numeric columns.")
+    if columns is not None:
+        data = data[:, _check_columns(columns, data.shape[1])]
+    if xrange is not None:
+        low, high = sorted(map(float, xrange))
+        data = data[(data[:, 0] >= low) & (data[:, 0] <= high)]
+
+    return np.ascontiguousarray(data, dtype=np.float64)
+
+
+def parse_range(cells):
+    """
+    解析 Excel 风格的单元格范围
+
+    Args:
+        cells(str): 单元格范围，例如 A1:C100、B:D、A2:C 或者 B2，为 None 时为整个表格
+
+    Returns:
+        bounds(tuple[int, int, int, int]): 第一列、第一行、最后一列以及最后一行，从 1 开始，没有限制的一端为 None
+    """
+    if cells is None:
+        return None, None, None, None
+    match = _RANGE.match(str(cells).strip().upper())
+    if match is None or not any(match.groups()):
+        raise ValueError(f"Invalid cell range '{cells}', expected a range such as 'A1:C100' or 'B:D'.")
+    first_column, first_row, last_column, last_row = match.groups()
+    if match.group(0).find(':') < 0:
+        # 只有一个单元格时，范围从这个单元格开始
+        last_column, last_row = None, None
+
+    bounds = (column_index(first_column) if first_column else None, int(first_row) if first_row else None,
+              column_index(last_column) if last_column else None, int(last_row) if last_row else None)
+    if bounds[0] is not None and bounds[2] is not None and bounds[0] > bounds[2] or \
+            bounds[1] is not None and bounds[3] is not None and bounds[1] > bounds[3]:
+        raise ValueError(f"Invalid cell range '{cells}', the end must not be before the start.")
+    return bounds
+
+
+def column_index(letters):
+    """
+    将列的字母转换为从 1 开始的下标，例如 A 为 1，AA 为 27
+
+    Args:
+        letters(str or bytes): 列的字母
+
+    Returns:
+        index(int): 列的下标
+    """
+    if isinstance(letters, bytes):
+        letters = letters.decode()
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index
+
+
+def _find_sheet(archive, sheet):
+    # 根据名字或者下标找到表格在压缩包中的路径以及表格的名字
+    import xml.etree.ElementTree as ElementTree
+
+    workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+    sheets = workbook.findall(f'{_MAIN}sheets/{_MAIN}sheet')
+    names = [element.get('name') for element in sheets]
+    if not sheets:
+        raise ValueError("The Excel file contains no sheets.")
+
+    if sheet is None:
+        index = 0
+    elif isinstance(sheet, int):
+        if not 0 <= sheet < len(sheets):
+            raise ValueError(f"Sheet index {sheet} is out of range, the Excel file has {len(sheets)} sheets.")
+        index = sheet
+    elif sheet in names:
+        index = names.index(sheet)
+    else:
+        raise ValueError(f"Sheet '{sheet}' not found, the Excel file has sheets: {', '.join(names)}.")
+
+    relationships = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    targets = {element.get('Id'): element.get('Target') for element in relationships}
+    target = targets[sheets[index].get(_RELATIONSHIP)]
+    # Target 可以是相对于 xl 文件夹的路径，也可以是以 / 开头的绝对路径
+    member = target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+    return member, names[index]
+
+
+def _read_regular(archive, member, bounds, chunk_size):
+    # 分块解压表格的 XML，每一块在完整的行处截断，表格不规整时抛出 _Irregular
+    first_column, first_row, last_column, last_row = bounds
+    blocks = []
+    # 第一行数据每个单元格的列，之后的每一行都必须相同
+    letters = None
+    keep = None
+    header = True
+
+    with archive.open(member) as stream:
+        pending = b''
+        finished = False
+        while not finished:
+            chunk = stream.read(chunk_size)
+            text = pending + chunk
+            if chunk:
+                cut = text.rfind(b'</row>')
+                if cut < 0:
+                    pending = text
+                    continue
+                cut += len(b'</row>')
+                text, pending = text[:cut], text[cut:]
+            else:
+                finished = True
+
+            start = text.find(b'<row')
+            if start < 0:
+                continue
+            body = text[start:]
+
+            # 跳过范围之前的行以及开头的表头
+            if header:
+                body = _skip_header(body, first_row, last_row)
+                if body is None:
+                    continue
+                header = False
+
+            numbers, values, refs = _parse_rows(body)
+            if not numbers.size:
+                continue
+            count = numbers.size
+            if len(refs) != count * (len(refs) // count) or not refs:
+                raise _Irregular
+            width = len(refs) // count
+            refs = np.array(refs).reshape(count, width)
+            if letters is None:
+                letters = refs[0]
+                columns = np.array([column_index(letter) for letter in letters])
+                keep = np.ones(width, dtype=bool)
+                if first_column is not None:
+                    keep &= columns >= first_column
+                if last_column is not None:
+                    keep &= columns <= last_column
+                if not keep.any():
+                    raise ValueError("The cell range contains no columns of the Excel sheet.")
+            if refs.shape[1] != letters.size or np.any(refs != letters):
+                raise _Irregular
+
+            try:
+                values = np.array(values).astype(np.float64).reshape(count, width)
+            except ValueError:
+                raise _Irregular from None
+
+            rows = numbers <= last_row if last_row is not None else slice(None)
+            blocks.append(values[rows][:, keep])
+            if last_row is not None and numbers[-1] > last_row:
+                break
+
+    if letters is None:
+        # 没有只包含数字的行，例如每一行都有一列文字，交给 openpyxl 按照范围逐个单元格判断
+        raise _Irregular
+    return np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+
+
+def _skip_header(body, first_row, last_row):
+    # 逐行跳过范围之前的行以及包含文字的表头，返回从第一行数据开始的内容，这一块中没有数据时返回 None
+    count = 0
+    for count, match in enumerate(_ROW_BLOCK.finditer(body), start=1):
+        number, content = int(match.group(1)), match.group(2)
+        if first_row is not None and number < first_row:
+            continue
+        if last_row is not None and number > last_row:
+            return None
+        if not content or b'<v>' not in content or _has_text(content):
+            continue
+        return body[match.start():]
+    if body.count(b'<row') != count:
+        # 有的行没有被匹配，例如没有行号，交给 openpyxl 处理
+        raise _Irregular
+    return None
+
+
+def _has_text(body):
+    # 是否包含不是数字的单元格，例如共享字符串 s、内联字符串 inlineStr、公式字符串 str、布尔值 b 以及错误 e
+    return body.count(b' t="') != body.count(b' t="n"')
+
+
+def _parse_rows(body):
+    # 一次性取出这一块中全部的行号、单元格的值以及单元格的列
+    tags = _ROW.findall(body)
+    if body.count(b'<row') != len(tags) or _has_text(body):
+        raise _Irregular
+    numbers = np.array([int(number) for number, empty in tags if not empty], dtype=np.int64)
+    values = _VALUE.findall(body)
+    refs = _REF.findall(body)
+    # 每个单元格都必须有值，并且 r 为第一个属性
+    if len(values) != len(refs) or body.count(b'<c ') != len(refs):
+        raise _Irregular
+    return numbers, values, refs
+
+
+def _read_openpyxl(file_path, sheet_name, bounds):
+    # 使用 openpyxl 的只读模式逐行读取，用于包含空单元格、文字或者其他写法的表格
+    import openpyxl
+
+    first_column, first_row, last_column, last_row = bounds
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook[sheet_name].iter_rows(min_row=first_row, max_row=last_row, min_col=first_column,
+                                              max_col=last_column, values_only=True)
+        data = []
+        header = True
+        for number, row in enumerate(rows, start=first_row or 1):
+            if all(value is None for value in row):
+                continue
+            if not all(value is None or isinstance(value, (int, float)) and not isinstance(value, bool)
+                       for value in row):
+                # 开头包含文字的行为表头，之后出现文字时报错
+                if header:
+                    continue
+                raise ValueError(f"The Excel sheet contains a non-numeric value in row {number}.")
+            header = False
+            data.append(row)
+    finally:
+        workbook.close()
+
+    width = max((len(row) for row in data), default=0)
+    array = np.full((len(data), width), np.nan)
+    for i, row in enumerate(data):
+        array[i, :len(row)] = [np.nan if value is None else value for value in row]
+    return array
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+bench_broaden.py
+Scaling and accuracy benchmark of the dense, the chunked and the truncated broadening of every profile.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+
+Usage:
+    python benchmark/bench_broaden.py [--states 100 1000 5000 20000] [--points 20000]
+                                      [--profile gaussian lorentzian pseudo-voigt] [--cutoff 50]
+
+uv 为以 eV 展宽、nm 作图的 UV-Vis 光谱，ir 为 500 到 3500 cm^-1、半峰全宽 8 cm^-1 的红外光谱。
+auto 为默认的展宽 (数据量较大时分块计算，只截断高斯线型)，cutoff 为指定截断半径时的展宽。
+error 为与完整的线型矩阵相比的最大误差，以峰高为单位；tail 为曲线在峰高 1e-8 到 1e-2 之间的部分中最大的相对误差。
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KimariDraw import broaden as broadening  # noqa: E402
+from synthetic import make_sticks  # noqa: E402
+
+# 完整的线型矩阵超过这个大小 (MB) 时不再运行密集的方法
+DENSE_MEMORY_LIMIT = 2048
+# 测试的光谱：跃迁的范围以及展宽的参数
+SPECTRA = {
+    "uv": {"sticks": (150.0, 450.0),
+           "options": dict(fwhm=0.333, fwhm_unit="eV", x_unit="nm", x_range=(100.0, 500.0))},
+    "ir": {"sticks": (500.0, 3500.0), "options": dict(fwhm=8.0, x_range=(500.0, 3500.0))},
+}
+
+
+def measure(function, *args, **kwargs):
+    # 返回耗时、tracemalloc 记录的峰值内存 (MB) 以及结果
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 ** 2, result
+
+
+def errors(result, dense):
+    # 以峰高为单位的最大误差，以及曲线尾部 (峰高的 1e-8 到 1e-2 之间) 的最大相对误差
+    peak = dense[:, 1].max()
+    error = np.abs(result[:, 1] - dense[:, 1])
+    tail = (dense[:, 1] > 1e-8 * peak) & (dense[:, 1] < 1e-2 * peak)
+    relative = (error[tail] / dense[tail, 1]).max() if tail.any() else 0.0
+    return error.max() / peak, relative
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the broadening engine.")
+    parser.add_argument("--states", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--profile", nargs="+", default=list(broadening.PROFILES), choices=broadening.PROFILES)
+    parser.add_argument("--cutoff", type=float, default=50.0)
+    args = parser.parse_args()
+
+    print(f"{'spectrum':>8} {'profile':>12} {'states':>7} {'dense':>9} {'dense mem':>10} {'auto':>9} {'auto mem':>9} {'error':>9} "
+          f"{'tail':>9} {'cutoff':>9} {'error':>9} {'tail':>9}")
+    for kind, profile in itertools.product(SPECTRA, args.profile):
+        options = dict(SPECTRA[kind]["options"], profile=profile, points=args.points)
+        for n_states in args.states:
+            sticks = make_sticks(n_states, x_range=SPECTRA[kind]["sticks"])
+            positions, strengths = sticks[:, 0], sticks[:, 1]
+
+            auto_time, auto_memory, auto = measure(broadening.broaden, positions, strengths, **options)
+            cutoff_time, _, cutoff = measure(broadening.broaden, positions, strengths, cutoff=args.cutoff, **options)
+
+            if args.points * n_states * 8 / 1024 ** 2 > DENSE_MEMORY_LIMIT:
+                print(f"{kind:>8} {profile:>12} {n_states:>7} {'skipped':>9} {'':>10} {auto_time * 1000:7.1f}ms "
+                      f"{auto_memory:7.1f}MB {'':>9} {'':>9} {cutoff_time * 1000:7.1f}ms")
+                continue
+
+            # 将 DENSE_LIMIT 设为无穷大，强制使用完整的线型矩阵
+            dense_limit = broadening.DENSE_LIMIT
+            broadening.DENSE_LIMIT = float("inf")
+            try:
+                dense_time, dense_memory, dense = measure(broadening.broaden, positions, strengths, **options)
+            finally:
+                broadening.DENSE_LIMIT = dense_limit
+
+            auto_error, auto_tail = errors(auto, dense)
+            cutoff_error, cutoff_tail = errors(cutoff, dense)
+            print(f"{kind:>8} {profile:>12} {n_states:>7} {dense_time * 1000:7.1f}ms {dense_memory:8.1f}MB "
+                  f"{auto_time * 1000:7.1f}ms {auto_memory:7.1f}MB {auto_error:9.1e} {auto_tail:9.1e} "
+                  f"{cutoff_time * 1000:7.1f}ms {cutoff_error:9.1e} {cutoff_tail:9.1e}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+bench_downsample.py
+Benchmark of the render time and output file size of draw_spectrum with and without downsampling.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+
+Usage:
+    python benchmark/bench_downsample.py [--rows 3000 100000 1000000] [--columns 6] [--formats png svg pdf]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KimariDraw.kimaridraw import Spectrum  # noqa: E402
+from synthetic import make_curve, make_sticks  # noqa: E402
+
+
+def render(curve, save_format, downsample, directory):
+    # 绘制一张光谱，返回耗时以及文件大小 (KB)
+    spectrum = Spectrum(curveData=curve, curve_colors=["black"] * (curve.shape[1] - 1),
+                        curve_style=["-"] * (curve.shape[1] - 1), legend_text=[None] * (curve.shape[1] - 1),
+                        is_legend=False, save_format=save_format, downsample=downsample)
+    start = time.perf_counter()
+    save_name = spectrum.draw_spectrum(save_dir=directory, verbose=False)
+    elapsed = time.perf_counter() - start
+    spectrum.close()
+    size = os.path.getsize(save_name) / 1024
+    os.remove(save_name)
+    return elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of downsampling dense curves before plotting.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[3000, 100000, 1000000])
+    parser.add_argument("--columns", type=int, default=6)
+    parser.add_argument("--formats", nargs="+", default=["png", "svg", "pdf"])
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'format':>6} {'full':>10} {'full size':>11} {'downsampled':>12} {'size':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        # 预热，避免将 proplot 的导入以及字体缓存计入第一次绘制的时间
+        warm = pd.DataFrame(make_curve(100, 2, make_sticks(1)))
+        render(warm, "png", True, directory)
+
+        for n_rows in args.rows:
+            curve = pd.DataFrame(make_curve(n_rows, args.columns, make_sticks(max(args.columns - 2, 1))))
+            for save_format in args.formats:
+                full_time, full_size = render(curve, save_format, False, directory)
+                fast_time, fast_size = render(curve, save_format, True, directory)
+                print(f"{n_rows:>8} {save_format:>6} {full_time * 1000:8.1f}ms {full_size:9.1f}KB "
+                      f"{fast_time * 1000:10.1f}ms {fast_size:9.1f}KB")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+bench_ensemble.py
+Benchmark of Boltzmann-weighted ensemble aggregation: streaming with parallel loading against loading every file first.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+
+Usage:
+    python benchmark/bench_ensemble.py [--conformers 1000] [--rows 3000] [--columns 2] [--workers 1 4 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KimariDraw.ensemble import load_array, aggregate_curves, boltzmann_weights, interpolate  # noqa: E402
+from synthetic import make_curve, make_sticks, write_curve  # noqa: E402
+
+
+def load_all(files, weights):
+    # 对照：先读取全部的文件，再插值并求和
+    arrays = [load_array(file) for file in files]
+    grid = arrays[0][:, 0]
+    total = sum(weight * interpolate(grid, data[:, 0], data[:, 1:]) for weight, data in zip(weights, arrays))
+    return np.column_stack((grid, total))
+
+
+def measure(function, *args, **kwargs):
+    # 返回耗时 (秒)、内存峰值 (MB) 以及结果
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 ** 2, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of Boltzmann-weighted ensemble aggregation.")
+    parser.add_argument("--conformers", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=3000)
+    parser.add_argument("--columns", type=int, default=2)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as directory:
+        files = []
+        for i in range(args.conformers):
+            # 每个构象的 x 范围略有不同，需要插值
+            shift = rng.uniform(-5, 5)
+            curve = make_curve(args.rows, args.columns, make_sticks(10, seed=i), x_range=(100 + shift, 500 + shift))
+            files.append(os.path.join(directory, f"conf{i}.txt"))
+            write_curve(files[-1], curve)
+        weights = boltzmann_weights(rng.uniform(0, 3, args.conformers), unit="kcal/mol")
+        print(f"conformers: {args.conformers}, rows: {args.rows}, columns: {args.columns}")
+
+        print(f"{'case':>16} {'time (s)':>10} {'peak (MB)':>11}")
+        elapsed, peak, expected = measure(load_all, files, weights)
+        print(f"{'load all':>16} {elapsed:>10.3f} {peak:>11.1f}")
+        for workers in args.workers:
+            elapsed, peak, result = measure(aggregate_curves, files, weights, workers=workers)
+            assert np.allclose(result, expected)
+            print(f"{f'stream x{workers}':>16} {elapsed:>10.3f} {peak:>11.1f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
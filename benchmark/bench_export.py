@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+bench_export.py
+Benchmark of saving one spectrum in several formats from one figure against one full render per format.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+
+Usage:
+    python benchmark/bench_export.py [--toml example/uv.toml] [--formats png svg pdf] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from KimariDraw.kimaridraw import create_spectrum  # noqa: E402
+
+
+def separate(toml_file, formats, directory):
+    # 原来的方式：每一种格式都重新创建 Spectrum 并绘制一次
+    for save_format in formats:
+        spectrum = create_spectrum(toml_file)
+        spectrum.save_format = save_format
+        spectrum.draw_spectrum(save_dir=directory, verbose=False)
+        spectrum.close()
+
+
+def single_pass(toml_file, formats, directory):
+    # 一次绘制，保存为全部的格式
+    spectrum = create_spectrum(toml_file)
+    spectrum.save_format = list(formats)
+    spectrum.draw_spectrum(save_dir=directory, verbose=False)
+    spectrum.close()
+
+
+def best_of(function, toml_file, formats, repeat):
+    times = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            function(toml_file, formats, directory)
+            times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of multi-format export.")
+    parser.add_argument("--toml", default=os.path.join(ROOT, "example", "uv.toml"))
+    parser.add_argument("--formats", nargs="+", default=["png", "svg", "pdf"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # 预热，避免将 proplot 的导入以及字体缓存计入第一次绘制的时间
+    best_of(single_pass, args.toml, ["png"], 1)
+
+    separate_time = best_of(separate, args.toml, args.formats, args.repeat)
+    single_time = best_of(single_pass, args.toml, args.formats, args.repeat)
+    print(f"formats: {', '.join(args.formats)}")
+    print(f"{len(args.formats)} separate renders: {separate_time * 1000:8.1f} ms")
+    print(f"single pass:        {single_time * 1000:8.1f} ms ({separate_time / single_time:.2f}x)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+bench_grid.py
+Benchmark of one multi-panel grid render against separate renders of every panel.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+
+Usage:
+    python benchmark/bench_grid.py [--panels 16] [--rows 3000] [--columns 4] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KimariDraw import cache  # noqa: E402
+from KimariDraw.kimaridraw import create_job  # noqa: E402
+from synthetic import make_dataset  # noqa: E402
+
+
+def separate(toml_files, directory):
+    # 每个子图单独绘制并保存一张图片
+    for toml_file in toml_files:
+        spectrum = create_job(toml_file)
+        spectrum.draw_spectrum(save_dir=directory, verbose=False)
+        spectrum.close()
+
+
+def grid(grid_file, directory):
+    # 所有子图绘制在一张图片中
+    job = create_job(grid_file)
+    job.draw_spectrum(save_dir=directory, verbose=False)
+    job.close()
+
+
+def best_of(function, argument, repeat):
+    times = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            function(argument, directory)
+            times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of multi-panel grid figures.")
+    parser.add_argument("--panels", type=int, default=16)
+    parser.add_argument("--rows", type=int, default=3000)
+    parser.add_argument("--columns", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # 只比较绘制的时间，不使用解析结果的缓存
+    cache.set_enabled(False)
+    with tempfile.TemporaryDirectory() as data:
+        toml_files = [make_dataset(os.path.join(data, f"panel{i}"), args.rows, args.columns, 20, seed=i)
+                      for i in range(args.panels)]
+        grid_file = os.path.join(data, "grid.toml")
+        with open(grid_file, "w") as file:
+            file.write("[grid]\n\n")
+            for toml_file in toml_files:
+                file.write(f'[[panels]]\njobs = ["{toml_file}"]\n\n')
+
+        # 预热，避免将 proplot 的导入以及字体缓存计入第一次绘制的时间
+        best_of(separate, toml_files[:1], 1)
+
+        separate_time = best_of(separate, toml_files, args.repeat)
+        grid_time = best_of(grid, grid_file, args.repeat)
+
+    print(f"panels: {args.panels}, rows: {args.rows}, columns: {args.columns}")
+    print(f"{args.panels} separate renders: {separate_time * 1000:8.1f} ms")
+    print(f"one grid render:     {grid_time * 1000:8.1f} ms ({separate_time / grid_time:.2f}x)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
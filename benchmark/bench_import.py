@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+bench_import.py
+Import-time benchmark of the KimariDraw command line entry point, driven by `python -X importtime`.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+
+Usage:
+    python benchmark/bench_import.py [--repeat 5]
+
+对于 kimaridraw --version 以及 toml 文件的验证，打印导入耗时最多的模块，并检查 wx、proplot、matplotlib、pandas 等重量级模块没有被导入。
+如果重量级模块被导入，则脚本返回 1。
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# 仓库的根目录以及示例 toml 文件
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE = os.path.join(ROOT, "example", "uv.toml")
+
+# 这些模块只应该在绘图或者 GUI 的路径中导入
+HEAVY_MODULES = ("wx", "proplot", "matplotlib", "pandas", "numpy", "toml")
+
+# 需要测试的命令行路径
+CASES = {
+    "kimaridraw --version": (
+        "import sys\n"
+        "sys.argv = ['kimaridraw', '--version']\n"
+        "from KimariDraw.kimaridraw import main\n"
+        "try:\n"
+        "    main()\n"
+        "except SystemExit:\n"
+        "    pass\n"
+    ),
+    "validate(toml)": (
+        "from KimariDraw.kimaridraw import validate\n"
+        f"validate({EXAMPLE!r})\n"
+    ),
+}
+
+
+def parse_importtime(stderr):
+    """
+    解析 python -X importtime 的输出
+
+    Args:
+        stderr(str): 子进程的标准错误输出
+
+    Returns:
+        modules(dict[str, int]): 模块名以及该模块的累计导入时间 (us)
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def run_case(code, repeat):
+    # 运行多次，取墙钟时间的中位数，以最后一次的 importtime 结果作为模块统计
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    walls = []
+    stderr = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env,
+                                capture_output=True, text=True)
+        walls.append(time.perf_counter() - start)
+        stderr = result.stderr
+    return statistics.median(walls), parse_importtime(stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--repeat", type=int, default=5, help="Number of interpreter starts per case")
+    parser.add_argument("--top", type=int, default=8, help="Number of slowest modules to show")
+    args = parser.parse_args()
+
+    # 作为参考，先测量一个空的解释器启动
+    baseline, _ = run_case("pass", args.repeat)
+    print(f"{'bare interpreter':<24} {baseline * 1000:8.1f} ms")
+
+    exit_code = 0
+    for name, code in CASES.items():
+        wall, modules = run_case(code, args.repeat)
+        heavy = sorted({m.split(".")[0] for m in modules} & set(HEAVY_MODULES))
+        print(f"{name:<24} {wall * 1000:8.1f} ms  (+{(wall - baseline) * 1000:.1f} ms over bare interpreter)")
+        top_level = {m: t for m, t in modules.items() if "." not in m}
+        for module, cumulative in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {module:<28} {cumulative / 1000:8.2f} ms")
+        if heavy:
+            exit_code = 1
+            print(f"    heavy modules imported: {', '.join(heavy)}")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+bench_memory.py
+Benchmark of the memory taken by many spectra held at once, as DataFrames and as CurveData containers.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+
+Usage:
+    python benchmark/bench_memory.py [--spectra 200] [--rows 3000] [--columns 4]
+
+内存由 tracemalloc 统计，为保存全部光谱之后相对开始时增加的内存，以及构造过程中的峰值。
+DataFrame 一项为每个光谱保存一个 read_path 返回的 DataFrame，也就是之前 Spectrum 的保存方式。
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from KimariDraw.data import CurveData  # noqa: E402
+from KimariDraw.kimaridraw import Spectrum  # noqa: E402
+
+
+def measure(build):
+    # 返回 build 的结果占用的内存以及构造过程中的峰值 (MB)
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    held = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return (current - start) / 1024 ** 2, (peak - start) / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the memory taken by many spectra.")
+    parser.add_argument("--spectra", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=3000)
+    parser.add_argument("--columns", type=int, default=4, help="Number of y columns of every spectrum")
+    args = parser.parse_args()
+
+    # 所有光谱使用同一个网格，例如构象系综中插值到同一个网格上的曲线
+    rng = np.random.default_rng(0)
+    x = np.linspace(100.0, 400.0, args.rows)
+    blocks = [rng.random((args.rows, args.columns)) for _ in range(args.spectra)]
+
+    def frames():
+        return [pd.DataFrame(np.column_stack((x, y))) for y in blocks]
+
+    def curves(dtype):
+        return lambda: [CurveData.from_array(np.column_stack((x, y)), dtype) for y in blocks]
+
+    def shared(dtype):
+        # 共用同一个 x，y 直接作为连续的数组保存
+        return lambda: [CurveData(x, y.astype(dtype)) for y in blocks]
+
+    def spectra(dtype):
+        return lambda: [Spectrum(curveData=CurveData(x, y.astype(dtype)), x_limit=[100, 400, 50],
+                                 left_y_limit=[0, 1, 0.2], right_y_limit=[0, 1, 0.2]) for y in blocks]
+
+    cases = [
+        ("DataFrame", frames),
+        ("CurveData float64", curves("float64")),
+        ("CurveData float32", curves("float32")),
+        ("shared x float64", shared(np.float64)),
+        ("shared x float32", shared(np.float32)),
+        ("Spectrum float32", spectra(np.float32)),
+    ]
+
+    print(f"spectra: {args.spectra}, rows: {args.rows}, y columns: {args.columns}")
+    print(f"{'representation':>20} {'held MB':>10} {'peak MB':>10} {'ratio':>7}")
+    baseline = None
+    for name, build in cases:
+        held, peak = measure(build)
+        baseline = held if baseline is None else baseline
+        print(f"{name:>20} {held:>10.2f} {peak:>10.2f} {held / baseline:>6.2f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
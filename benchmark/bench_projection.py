@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+bench_projection.py
+Benchmark of the peak memory and time of reading a large curve file in full and with column and x-range projection.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+
+Usage:
+    python benchmark/bench_projection.py [--rows 100000] [--columns 200] [--keep 1 2 3] [--xrange 200 300]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KimariDraw.reader import load_columns, load_txt  # noqa: E402
+from synthetic import make_curve, make_sticks, write_curve  # noqa: E402
+
+
+def measure(function, *args, **kwargs):
+    # 返回耗时 (秒)、内存峰值 (MB) 以及结果的形状
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 ** 2, result.shape
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of streaming a curve file with column projection.")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--columns", type=int, default=200)
+    parser.add_argument("--keep", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--xrange", type=float, nargs=2, default=[200.0, 300.0])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "curve.txt")
+        write_curve(path, make_curve(args.rows, args.columns, make_sticks(args.columns)))
+        print(f"file: {args.rows} rows x {args.columns} columns, {os.path.getsize(path) / 1024 ** 2:.1f} MB")
+
+        columns = [0] + args.keep
+        cases = [
+            ("full", load_txt, {}),
+            ("columns", load_columns, {"columns": columns}),
+            ("xrange", load_columns, {"xrange": args.xrange}),
+            ("columns+xrange", load_columns, {"columns": columns, "xrange": args.xrange}),
+        ]
+        print(f"{'case':>16} {'time (s)':>10} {'peak (MB)':>11} {'shape':>16}")
+        for name, function, kwargs in cases:
+            elapsed, peak, shape = measure(function, path, **kwargs)
+            print(f"{name:>16} {elapsed:>10.3f} {peak:>11.1f} {str(shape):>16}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+bench_reader.py
+Benchmark of the native Multiwfn text loader against the pandas read_csv path.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+
+Usage:
+    python benchmark/bench_reader.py [--rows 20000] [--columns 2 50 200] [--repeat 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KimariDraw.reader import load_txt  # noqa: E402
+from synthetic import make_curve, make_sticks, write_curve  # noqa: E402
+
+
+def read_pandas(path):
+    # 原来 read_path 的读取方法
+    return pd.read_csv(path, sep=r"\s+", header=None).to_numpy()
+
+
+def best_of(function, path, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(path)
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the Multiwfn text loader.")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--columns", type=int, nargs="+", default=[2, 50, 200])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'file':<22} {'size':>9} {'pandas':>10} {'load_txt':>10} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for columns in args.columns:
+            path = os.path.join(directory, f"curve_{columns}.txt")
+            write_curve(path, make_curve(args.rows, columns, make_sticks(columns - 2 or 1)))
+            size = os.path.getsize(path) / 1024 ** 2
+
+            pandas_time, _, expected = best_of(read_pandas, path, args.repeat)
+            native_time, _, result = best_of(load_txt, path, args.repeat)
+            if not np.allclose(result, expected, rtol=1e-14, atol=1e-300):
+                print(f"{path}: results differ from pandas")
+                return 1
+            print(f"{args.rows}x{columns:<16} {size:7.1f}MB {pandas_time * 1000:8.1f}ms {native_time * 1000:8.1f}ms "
+                  f"{pandas_time / native_time:7.2f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+bench_sweep.py
+Benchmark of a [sweep] table against one TOML file per variant, i.e. the cost of re-reading data and re-building figures.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+
+Usage:
+    python benchmark/bench_sweep.py [--rows 20000] [--columns 4] [--limits 4] [--titles 3] [--repeat 3]
+
+每一种组合使用不同的 x 轴范围以及标题，两种方法都在当前进程中依次绘制，并且不使用解析结果的缓存，
+因此差别来自参数扫描中只读取一次数据以及原地修改同一张图片。
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KimariDraw import cache  # noqa: E402
+from KimariDraw.batch import render_batch  # noqa: E402
+from synthetic import make_dataset  # noqa: E402
+
+
+def best_of(toml_files, repeat):
+    times = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            failed = render_batch(toml_files, workers=1, save_dir=directory)
+            times.append(time.perf_counter() - start)
+        if failed:
+            raise RuntimeError(f"{len(failed)} jobs failed: {failed[0][1]}")
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of parameter sweeps against separate TOML files.")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--columns", type=int, default=4)
+    parser.add_argument("--limits", type=int, default=4, help="Number of x axis windows")
+    parser.add_argument("--titles", type=int, default=3, help="Number of titles")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cache.set_enabled(False)
+    limits = [[100 + 20 * i, 500 - 20 * i, 50] for i in range(args.limits)]
+    titles = [f"Title {i}" for i in range(args.titles)]
+    with tempfile.TemporaryDirectory() as data:
+        base = make_dataset(data, args.rows, args.columns, 20)
+        with open(base) as file:
+            config = file.read()
+
+        # 每一种组合一个 toml 文件
+        separate = []
+        for i, (limit, title) in enumerate(itertools.product(limits, titles)):
+            path = os.path.join(data, f"variant{i}.toml")
+            with open(path, "w") as file:
+                file.write(f'{config}\n[spectrum]\nx_limit = {limit}\ntitle = "{title}"\n')
+            separate.append(path)
+
+        # 一个包含 [sweep] 表的 toml 文件
+        sweep = os.path.join(data, "sweep.toml")
+        with open(sweep, "w") as file:
+            file.write(f'{config}\n[sweep.spectrum]\nx_limit = {limits}\ntitle = {titles}\n')
+
+        separate_time = best_of(separate, args.repeat)
+        sweep_time = best_of([sweep], args.repeat)
+
+    count = len(separate)
+    print(f"variants: {count}, rows: {args.rows}, columns: {args.columns}")
+    print(f"separate files: {separate_time * 1000:8.1f} ms ({separate_time / count * 1000:.1f} ms per variant)")
+    print(f"[sweep]:        {sweep_time * 1000:8.1f} ms ({sweep_time / count * 1000:.1f} ms per variant, "
+          f"{separate_time / sweep_time:.2f}x)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+bench_threads.py
+Benchmark of `render` in a process pool against a thread pool that shares the imported libraries and font cache.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+
+Usage:
+    python benchmark/bench_threads.py [--files 32] [--rows 3000] [--columns 4] [--jobs 4] [--repeat 3]
+
+进程池的时间包含每个进程导入 proplot 以及加载字体的时间，这正是大量小任务时线程池节省的部分。
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KimariDraw import cache  # noqa: E402
+from KimariDraw.batch import render_batch  # noqa: E402
+from synthetic import make_dataset  # noqa: E402
+
+
+def best_of(toml_files, workers, threads, repeat):
+    times = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            failed = render_batch(toml_files, workers=workers, save_dir=directory, threads=threads)
+            times.append(time.perf_counter() - start)
+        if failed:
+            raise RuntimeError(f"{len(failed)} jobs failed: {failed[0][1]}")
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of process pool against thread pool rendering.")
+    parser.add_argument("--files", type=int, default=32)
+    parser.add_argument("--rows", type=int, default=3000)
+    parser.add_argument("--columns", type=int, default=4)
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # 只比较绘制的时间，不使用解析结果的缓存
+    cache.set_enabled(False)
+    with tempfile.TemporaryDirectory() as data:
+        toml_files = [make_dataset(os.path.join(data, f"job{i}"), args.rows, args.columns, 20, seed=i)
+                      for i in range(args.files)]
+
+        process_time = best_of(toml_files, args.jobs, False, args.repeat)
+        thread_time = best_of(toml_files, args.jobs, True, args.repeat)
+
+    print(f"files: {args.files}, rows: {args.rows}, columns: {args.columns}, workers: {args.jobs}")
+    print(f"process pool: {process_time * 1000:8.1f} ms")
+    print(f"thread pool:  {thread_time * 1000:8.1f} ms ({process_time / thread_time:.2f}x)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
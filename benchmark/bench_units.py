@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+bench_units.py
+Benchmark of converting curves between nm, eV and cm^-1: per-column interpolation, the vectorized conversion and the cached read.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+
+Usage:
+    python benchmark/bench_units.py [--rows 100000 1000000] [--columns 6] [--repeat 3]
+
+per-column 一项为逐列调用 np.interp 插值到均匀网格上，vectorized 为 units.Conversion.curve，
+cached 为缓存中已经存在转换后的数组时 read_array 的时间，即同一个单位第二次以及之后的读取。
+列数较少时两种插值的耗时相近，列数越多 (例如 --columns 40) 共用一次查找的优势越明显。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from KimariDraw import units  # noqa: E402
+from KimariDraw.kimaridraw import read_array  # noqa: E402
+from synthetic import make_curve, make_sticks, write_curve  # noqa: E402
+
+
+def per_column(curve, from_unit, to_unit):
+    # 逐列转换并插值的写法，每一列都重新查找网格点的位置
+    x = units.convert(curve[:, 0], from_unit, to_unit)
+    order = np.argsort(x)
+    x = x[order]
+    grid = np.linspace(x[0], x[-1], x.size)
+    columns = [grid]
+    for i in range(1, curve.shape[1]):
+        columns.append(np.interp(grid, x, curve[order, i]))
+    return np.column_stack(columns)
+
+
+def best_of(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of converting curves between units.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--columns", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    conversion = units.Conversion("nm", "eV")
+    print(f"{'rows':>8} {'per-column':>11} {'vectorized':>11} {'cached':>9} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["KIMARIDRAW_CACHE_DIR"] = os.path.join(directory, "cache")
+        sticks = make_sticks(100)
+        for rows in args.rows:
+            curve = make_curve(rows, args.columns, sticks)
+            path = os.path.join(directory, f"curve_{rows}.txt")
+            write_curve(path, curve)
+
+            loop_time, expected = best_of(lambda: per_column(curve, "nm", "eV"), args.repeat)
+            vector_time, result = best_of(lambda: conversion.curve(curve), args.repeat)
+            assert np.allclose(result, expected)
+
+            # 第一次读取写入缓存，之后的读取直接得到转换后的数组
+            read_array(path, conversion=conversion)
+            cached_time, result = best_of(lambda: read_array(path, conversion=conversion), args.repeat)
+            assert np.allclose(result, expected)
+
+            print(f"{rows:>8} {loop_time * 1000:>9.1f}ms {vector_time * 1000:>9.1f}ms {cached_time * 1000:>7.1f}ms "
+                  f"{loop_time / cached_time:>7.1f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
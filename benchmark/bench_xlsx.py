@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+bench_xlsx.py
+Benchmark of reading large Excel (.xlsx) sheets: pandas, openpyxl read-only, the XML reader and the cached read.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+
+Usage:
+    python benchmark/bench_xlsx.py [--rows 100000 200000] [--columns 6] [--repeat 3]
+
+生成 xlsx 文件本身需要较长的时间 (十万行约 10 秒)，不计入结果。
+cached 一项为缓存中已经存在时 read_array 的时间，即同一个文件第二次以及之后的读取。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from KimariDraw.kimaridraw import read_array  # noqa: E402
+from KimariDraw.xlsx import _read_openpyxl, load_xlsx  # noqa: E402
+from synthetic import make_curve, make_sticks, write_xlsx  # noqa: E402
+
+
+def read_pandas(path):
+    # 原来 read_path 的读取方法
+    return pd.read_excel(path, sheet_name=0).to_numpy(dtype=np.float64)
+
+
+def read_openpyxl(path):
+    # 只使用 openpyxl 的只读模式逐行读取
+    return _read_openpyxl(path, "Sheet1", (None, None, None, None))
+
+
+def best_of(function, path, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(path)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of reading large Excel sheets.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 200000])
+    parser.add_argument("--columns", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'size':>9} {'pandas':>9} {'openpyxl':>9} {'xml':>9} {'cached':>9} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["KIMARIDRAW_CACHE_DIR"] = os.path.join(directory, "cache")
+        sticks = make_sticks(100)
+        for rows in args.rows:
+            path = os.path.join(directory, f"curve_{rows}.xlsx")
+            write_xlsx(path, make_curve(rows, args.columns, sticks))
+
+            pandas_time, expected = best_of(read_pandas, path, 1)
+            openpyxl_time, result = best_of(read_openpyxl, path, 1)
+            assert np.array_equal(result, expected)
+            xml_time, result = best_of(load_xlsx, path, args.repeat)
+            assert np.array_equal(result, expected)
+
+            # 第一次读取写入缓存，之后的读取直接从缓存中读取
+            read_array(path)
+            cached_time, result = best_of(read_array, path, args.repeat)
+            assert np.array_equal(result, expected)
+
+            size = os.path.getsize(path) / 1024 ** 2
+            print(f"{rows:>8} {size:>7.1f}MB {pandas_time:>8.2f}s {openpyxl_time:>8.2f}s {xml_time:>8.2f}s "
+                  f"{cached_time * 1000:>7.1f}ms {pandas_time / xml_time:>7.1f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
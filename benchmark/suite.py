@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+suite.py
+Benchmark suite over synthetic Multiwfn-like datasets, with JSON results that can be compared between runs.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+
+Usage:
+    python benchmark/suite.py [--preset quick|full] [--formats png svg pdf] [--repeat 3] [--only read_path auto_limit]
+                              [--data-dir DIR] [--output results.json] [--compare baseline.json] [--threshold 0.1]
+
+每个数据集为 (行数, 列数, 跃迁数)，测试 read_path、create_spectrum、Spectrum 的构造、auto_limit 以及每一种格式的 draw_spectrum。
+结果保存为 JSON，其中记录了 Python 以及各个依赖的版本。使用 --compare 与之前保存的结果比较，
+任何一项变慢超过 threshold 时脚本返回 1，可以用于检查升级 proplot、pandas 或者 KimariDraw 本身之后是否变慢。
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KimariDraw import cache  # noqa: E402
+from KimariDraw.kimaridraw import Spectrum, __version__, create_spectrum, read_path  # noqa: E402
+from synthetic import make_dataset  # noqa: E402
+
+# 行数、列数以及跃迁数的取值，full 预设使用它们的组合
+ROWS = (1000, 10000, 100000, 1000000)
+COLUMNS = (2, 10, 100, 500)
+STICKS = (10, 100, 1000)
+
+# 记录版本的依赖
+PACKAGES = ("numpy", "pandas", "matplotlib", "proplot", "toml", "openpyxl")
+
+
+def datasets(preset, max_cells):
+    """
+    返回需要测试的数据集
+
+    Args:
+        preset(str): quick 为几个小数据集，full 为行数和列数的组合，再加上不同的跃迁数
+        max_cells(int): 行数乘以列数的上限，超过上限的组合会被跳过
+
+    Returns:
+        cases(list[tuple[int, int, int]]): 每个数据集的行数、列数以及跃迁数
+    """
+    if preset == "quick":
+        return [(1000, 2, 10), (10000, 10, 100), (100000, 2, 100)]
+
+    cases = [(rows, columns, max(10, min(columns, STICKS[-1]))) for rows in ROWS for columns in COLUMNS
+             if rows * columns <= max_cells]
+    cases.extend((10000, 2, sticks) for sticks in STICKS if (10000, 2, sticks) not in cases)
+    return cases
+
+
+def dataset_name(rows, columns, sticks):
+    # 数据集的名字，用于比较两次的结果
+    return f"{rows}x{columns}_{sticks}"
+
+
+def timeit(function, repeat):
+    """
+    运行 function 若干次，返回最短以及中位数的耗时 (秒)
+
+    Args:
+        function(callable): 需要测试的函数，每次调用之前需要的准备工作由 function 自己完成并且不计时，
+            因此 function 返回需要计时的函数
+        repeat(int): 运行的次数
+
+    Returns:
+        best(float): 最短的耗时
+        median(float): 耗时的中位数
+    """
+    times = []
+    for _ in range(repeat):
+        target = function()
+        start = time.perf_counter()
+        target()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times)
+
+
+def benchmarks(toml_file, curve_file, line_file, formats, directory):
+    """
+    返回一个数据集上的所有测试
+
+    Args:
+        toml_file(str): 数据集的 toml 文件
+        curve_file(str): 曲线文件
+        line_file(str): 直线文件
+        formats(list[str]): draw_spectrum 测试的格式
+        directory(str): 保存图片的文件夹
+
+    Returns:
+        cases(dict[str, callable]): 测试的名字以及准备函数，准备函数返回需要计时的函数
+    """
+    curve_data, line_data = read_path(curve_file), read_path(line_file)
+
+    curves = curve_data.shape[1] - 1
+
+    def spectrum():
+        return Spectrum(curveData=curve_data, lineData=line_data, curve_colors=["black"] * curves,
+                        curve_style=["-"] * curves, legend_text=[None] * curves)
+
+    def draw(save_format):
+        def prepare():
+            figure = spectrum()
+            figure.save_format = save_format
+            figure.overwrite = True
+
+            def run():
+                figure.draw_spectrum(save_dir=directory, verbose=False)
+                figure.close()
+            return run
+        return prepare
+
+    cases = {
+        "read_path": lambda: lambda: read_path(curve_file),
+        "create_spectrum": lambda: lambda: create_spectrum(toml_file),
+        "Spectrum": lambda: spectrum,
+        "auto_limit": lambda: spectrum().auto_limit,
+    }
+    for save_format in formats:
+        cases[f"draw_spectrum.{save_format}"] = draw(save_format)
+
+    return cases
+
+
+def environment():
+    """
+    记录运行测试的环境，比较结果时需要确认环境是否相同
+
+    Returns:
+        environment(dict): Python、平台以及依赖的版本
+    """
+    from importlib import metadata
+
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+
+    return {
+        "kimaridraw": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "packages": versions,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    与之前保存的结果比较，打印每一项的变化
+
+    Args:
+        results(dict): 本次的结果
+        baseline(dict): 之前保存的结果
+        threshold(float): 变慢超过这个比例时视为性能退化，例如 0.1 为 10%
+
+    Returns:
+        regressions(int): 性能退化的项数
+    """
+    old = {(entry["dataset"], entry["name"]): entry for entry in baseline["results"]}
+    regressions = 0
+    print(f"\nCompared with {baseline['environment']['date']} (KimariDraw {baseline['environment']['kimaridraw']}):")
+    print(f"{'dataset':>16} {'benchmark':>22} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+    for entry in results["results"]:
+        key = (entry["dataset"], entry["name"])
+        if key not in old:
+            continue
+        ratio = entry["best"] / old[key]["best"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions += 1
+            flag = "  SLOWER"
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{entry['dataset']:>16} {entry['name']:>22} {old[key]['best'] * 1000:>10.2f} "
+              f"{entry['best'] * 1000:>10.2f} {ratio:>6.2f}x{flag}")
+
+    # 依赖的版本不同时提示，便于判断变慢的原因
+    for package, version in results["environment"]["packages"].items():
+        previous = baseline["environment"]["packages"].get(package)
+        if previous != version:
+            print(f"{package}: {previous} -> {version}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite over synthetic Multiwfn-like datasets.")
+    parser.add_argument("--preset", choices=["quick", "full"], default="quick")
+    parser.add_argument("--max-cells", type=int, default=20000000,
+                        help="Skip datasets whose rows times columns exceed this number")
+    parser.add_argument("--formats", nargs="+", default=["png", "svg", "pdf"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", default=None, help="Run only these benchmarks")
+    parser.add_argument("--data-dir", default=None,
+                        help="Folder to keep the generated datasets between runs, default is a temporary folder")
+    parser.add_argument("--output", default=None, help="Save the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="Compare with the results saved in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    # 测试解析器本身，不使用解析结果的缓存
+    cache.set_enabled(False)
+    results = {"environment": environment(), "repeat": args.repeat, "results": []}
+
+    with tempfile.TemporaryDirectory() as temporary:
+        data_dir = args.data_dir or os.path.join(temporary, "data")
+        output_dir = os.path.join(temporary, "figures")
+        os.makedirs(output_dir)
+
+        print(f"{'dataset':>16} {'benchmark':>22} {'best ms':>10} {'median ms':>10}")
+        for rows, columns, sticks in datasets(args.preset, args.max_cells):
+            name = dataset_name(rows, columns, sticks)
+            # 生成的数据集由参数决定，已经存在时直接使用
+            directory = os.path.join(data_dir, name)
+            toml_file = os.path.join(directory, f"synthetic_{rows}x{columns}_{sticks}.toml")
+            if not os.path.isfile(toml_file):
+                toml_file = make_dataset(directory, rows, columns, sticks)
+            stem = os.path.splitext(toml_file)[0]
+
+            cases = benchmarks(toml_file, f"{stem}_curve.txt", f"{stem}_line.txt", args.formats, output_dir)
+            for benchmark, prepare in cases.items():
+                if args.only is not None and benchmark not in args.only:
+                    continue
+                best, median = timeit(prepare, args.repeat)
+                results["results"].append({"dataset": name, "rows": rows, "columns": columns, "sticks": sticks,
+                                           "name": benchmark, "best": best, "median": median})
+                print(f"{name:>16} {benchmark:>22} {best * 1000:>10.2f} {median * 1000:>10.2f}")
+
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+    if args.compare is not None:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+synthetic.py
+Generator of synthetic Multiwfn-like spectrum_curve.txt / spectrum_line.txt files for the benchmarks.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import os
+
+import numpy as np
+
+
+def format_fortran(value):
+    """
+    按照 Multiwfn 的 Fortran 格式 (E18.8，三位指数) 格式化一个数字，例如 '   1.01941334E-118'
+
+    Args:
+        value(float): 需要格式化的数字
+
+    Returns:
+        text(str): 格式化后的字符串
+    """
+    mantissa, exponent = f"{value:.8E}".split("E")
+    return f"{mantissa}E{int(exponent):+04d}".rjust(18)
+
+
+def make_sticks(n_sticks, x_range=(150.0, 450.0), seed=0):
+    """
+    生成随机的跃迁位置和强度
+
+    Args:
+        n_sticks(int): 跃迁的个数
+        x_range(tuple[float, float]): 跃迁位置的范围
+        seed(int): 随机数种子
+
+    Returns:
+        sticks(numpy.ndarray): 形状为 (n_sticks, 2) 的数组，第一列为位置，第二列为强度
+    """
+    rng = np.random.default_rng(seed)
+    positions = np.sort(rng.uniform(*x_range, n_sticks))
+    strengths = rng.exponential(0.05, n_sticks)
+    return np.column_stack((positions, strengths))
+
+
+def make_curve(n_rows, n_columns, sticks, x_range=(100.0, 500.0), fwhm=20.0):
+    """
+    使用高斯函数展宽跃迁，生成与 Multiwfn 相同布局的曲线数据：第一列为 x，第二列为总的曲线，其余列为单个跃迁的贡献
+
+    Args:
+        n_rows(int): 行数
+        n_columns(int): 列数，至少为 2
+        sticks(numpy.ndarray): make_sticks 生成的跃迁
+        x_range(tuple[float, float]): x 的范围
+        fwhm(float): 半峰全宽
+
+    Returns:
+        curve(numpy.ndarray): 形状为 (n_rows, n_columns) 的数组
+    """
+    x = np.linspace(*x_range, n_rows)
+    curve = np.empty((n_rows, n_columns))
+    curve[:, 0] = x
+    curve[:, 1] = 0.0
+    # 分块计算，避免 n_rows * n_sticks 的矩阵过大
+    for start in range(0, len(sticks), 256):
+        block = sticks[start:start + 256]
+        profile = np.exp(-4 * np.log(2) * ((x[:, None] - block[:, 0]) / fwhm) ** 2) * block[:, 1] * 2.87e4
+        curve[:, 1] += profile.sum(axis=1)
+        columns = np.arange(start, start + len(block)) + 2
+        selected = columns < n_columns
+        curve[:, columns[selected]] = profile[:, selected]
+    # 跃迁的个数比列数少时，剩余的列使用总曲线的缩放
+    for column in range(len(sticks) + 2, n_columns):
+        curve[:, column] = curve[:, 1] * (column / n_columns)
+    return curve
+
+
+def write_curve(path, curve):
+    """
+    按照 Multiwfn 的格式写入曲线文件
+
+    Args:
+        path(str): 文件路径
+        curve(numpy.ndarray): 曲线数据
+    """
+    with open(path, "w") as file:
+        for row in curve:
+            file.write(f"{row[0]:13.5f}" + "".join(format_fortran(value) for value in row[1:]) + "\n")
+
+
+def write_xlsx(path, curve, sheet="Sheet1"):
+    """
+    将曲线数据写入 xlsx 文件，第一行为表头，与手动整理的 Excel 表格相同
+
+    Args:
+        path(str): 文件路径
+        curve(numpy.ndarray): 曲线数据
+        sheet(str): 表格的名字
+    """
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet)
+    worksheet.append(["x"] + [f"y{column}" for column in range(1, curve.shape[1])])
+    for row in curve.tolist():
+        worksheet.append(row)
+    workbook.save(path)
+
+
+def write_line(path, sticks):
+    """
+    按照 Multiwfn 的格式写入直线文件，每个跃迁写三行：(x, 0)、(x, 强度)、(x, 0)
+
+    Args:
+        path(str): 文件路径
+        sticks(numpy.ndarray): make_sticks 生成的跃迁
+    """
+    with open(path, "w") as file:
+        for position, strength in sticks:
+            for value in (0.0, strength, 0.0):
+                file.write(f"{position:16.5f}{format_fortran(value)}\n")
+
+
+def make_dataset(directory, n_rows, n_columns, n_sticks, seed=0):
+    """
+    在 directory 中生成一组曲线文件、直线文件以及对应的 toml 文件
+
+    Args:
+        directory(str): 输出的文件夹
+        n_rows(int): 曲线的行数
+        n_columns(int): 曲线的列数
+        n_sticks(int): 跃迁的个数
+        seed(int): 随机数种子
+
+    Returns:
+        toml_path(str): 生成的 toml 文件路径
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = f"synthetic_{n_rows}x{n_columns}_{n_sticks}"
+    sticks = make_sticks(n_sticks, seed=seed)
+    write_curve(os.path.join(directory, f"{name}_curve.txt"), make_curve(n_rows, n_columns, sticks))
+    write_line(os.path.join(directory, f"{name}_line.txt"), sticks)
+
+    toml_path = os.path.join(directory, f"{name}.toml")
+    with open(toml_path, "w") as file:
+        file.write(f'[curve]\npath = "{name}_curve.txt"\ncolor = "red"\n\n[line]\npath = "{name}_line.txt"\ncolor = "black"\n')
+    return toml_path
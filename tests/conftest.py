@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+conftest.py
+Shared fixtures of the test suite.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path_factory, monkeypatch):
+    # 每个测试使用单独的缓存文件夹，不读取用户缓存中旧版本解析器的结果，也不写入用户的缓存
+    monkeypatch.setenv("KIMARIDRAW_CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
+    monkeypatch.delenv("KIMARIDRAW_NO_CACHE", raising=False)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+test_batch.py
+Tests of the headless rendering of batches of TOML jobs.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import os
+
+import toml
+
+from KimariDraw.batch import expand_inputs, render_batch
+
+
+def test_failures_are_reported(tmp_path, capsys):
+    invalid_sweep = tmp_path / "sweep.toml"
+    invalid_sweep.write_text("[sweep.colour]\nfwhm = [0.2, 0.3]\n")
+    broken = tmp_path / "broken.toml"
+    broken.write_text("title = = 1\n")
+    missing = tmp_path / "missing.toml"
+
+    files = [str(invalid_sweep), str(broken), str(missing)]
+    failed = dict(render_batch(files, workers=1))
+
+    # 无效的 [sweep] 表、无法解析以及不存在的文件都出现在报告中，不会中断整个批次
+    assert list(failed) == files
+    assert isinstance(failed[str(invalid_sweep)], ValueError)
+    assert "Unknown table 'colour'" in str(failed[str(invalid_sweep)])
+    assert isinstance(failed[str(broken)], toml.TomlDecodeError)
+    assert isinstance(failed[str(missing)], OSError)
+
+    output = capsys.readouterr().out.splitlines()
+    assert [line.split(":")[0] for line in output] == [f"[FAILED] {file}" for file in files]
+
+
+def test_expand_inputs(tmp_path):
+    for name in ("b.toml", "a.toml", "notes.txt"):
+        (tmp_path / name).write_text("")
+    a, b = str(tmp_path / "a.toml"), str(tmp_path / "b.toml")
+    # 文件夹中的 toml 文件按照名称排序，重复的文件只保留第一次出现的那一个
+    assert expand_inputs([b, str(tmp_path), os.path.join(str(tmp_path), "*.toml")]) == [b, a]
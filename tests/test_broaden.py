@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+test_broaden.py
+Tests of the broadening of stick data into curves.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import numpy as np
+import pytest
+
+from KimariDraw import broaden as broaden_module
+from KimariDraw.broaden import broaden, broaden_line
+
+
+@pytest.fixture
+def sticks():
+    rng = np.random.default_rng(0)
+    positions = np.sort(rng.uniform(3.0, 6.0, 400))
+    strengths = rng.uniform(0.0, 0.2, 400)
+    return positions, strengths
+
+
+@pytest.mark.parametrize("profile", ["gaussian", "lorentzian", "pseudo-voigt"])
+@pytest.mark.parametrize("normalize", ["height", "area"])
+def test_windowed_matches_dense(sticks, monkeypatch, profile, normalize):
+    positions, strengths = sticks
+    options = dict(profile=profile, normalize=normalize, points=2000, x_range=[2.5, 6.5], states=[1, 200])
+    dense = broaden(positions, strengths, 0.1, **options)
+
+    # 网格点数与跃迁数的乘积超过 DENSE_LIMIT 时自动分块，高斯线型截断在 GAUSSIAN_CUTOFF 倍半峰全宽以内
+    monkeypatch.setattr(broaden_module, "DENSE_LIMIT", 0)
+    windowed = broaden(positions, strengths, 0.1, chunk=97, **options)
+
+    assert windowed.shape == dense.shape == (2000, 4)
+    np.testing.assert_allclose(windowed, dense, rtol=1e-12, atol=1e-12)
+
+
+def test_cutoff_is_an_approximation(sticks):
+    positions, strengths = sticks
+    dense = broaden(positions, strengths, 0.1, profile="lorentzian", points=2000, x_range=[2.5, 6.5])
+    windowed = broaden(positions, strengths, 0.1, profile="lorentzian", points=2000, x_range=[2.5, 6.5],
+                       cutoff=20, chunk=128)
+    # 截断洛伦兹线型的尾部，每个跃迁的误差不超过其强度的 1/(1 + 4 cutoff^2)，并且只会偏小
+    error = dense[:, 1] - windowed[:, 1]
+    assert np.all(error > -1e-12) and error.max() > 0
+    assert error.max() <= strengths.sum() / (1 + 4 * 20 ** 2)
+
+
+def test_height_and_area():
+    grid_range = [0.0, 10.0]
+    height = broaden([5.0], [2.0], 0.5, points=10001, x_range=grid_range)
+    assert height[5000, 0] == pytest.approx(5.0)
+    assert height[:, 1].max() == pytest.approx(2.0)
+    # 半峰全宽处为峰高的一半
+    assert np.interp(5.25, height[:, 0], height[:, 1]) == pytest.approx(1.0)
+
+    # 峰面积等于跃迁强度
+    area = broaden([5.0], [2.0], 0.5, points=10001, x_range=grid_range, normalize="area")
+    assert np.sum(area[:, 1]) * (area[1, 0] - area[0, 0]) == pytest.approx(2.0, rel=1e-6)
+
+
+def test_fwhm_in_another_unit():
+    # x 为 nm，半峰全宽为 eV，峰的位置不变
+    curve = broaden([300.0], [1.0], 0.3, points=4001, x_unit="nm", fwhm_unit="eV")
+    assert curve[:, 0].min() > 0
+    assert np.all(np.diff(curve[:, 0]) > 0)
+    assert curve[np.argmax(curve[:, 1]), 0] == pytest.approx(300.0, abs=0.1)
+
+
+def test_broaden_line_checks_keys():
+    line = np.array([[4.0, 0.1], [5.0, 0.2]])
+    assert broaden_line(line, fwhm=0.2, range=[3, 6], points=100).shape == (100, 2)
+    with pytest.raises(ValueError, match="Unknown keys"):
+        broaden_line(line, fwhm=0.2, width=1)
+    with pytest.raises(ValueError, match="fwhm"):
+        broaden_line(line)
+
+
+@pytest.mark.parametrize("kwargs", [
+    dict(positions=[], strengths=[], fwhm=0.1),
+    dict(positions=[1.0], strengths=[1.0], fwhm=0.0),
+    dict(positions=[1.0], strengths=[1.0], fwhm=0.1, profile="voigt"),
+    dict(positions=[1.0], strengths=[1.0], fwhm=0.1, normalize="max"),
+    dict(positions=[1.0], strengths=[1.0], fwhm=0.1, states=[2]),
+    dict(positions=[1.0], strengths=[1.0], fwhm=0.1, cutoff=0),
+])
+def test_invalid_arguments(kwargs):
+    with pytest.raises(ValueError):
+        broaden(**kwargs)
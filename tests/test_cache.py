@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+test_cache.py
+Tests of the on-disk cache of parsed spectrum data.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import os
+
+import numpy as np
+import pytest
+
+from KimariDraw import cache
+
+
+class Loader:
+    # 记录调用次数的解析函数
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, file_path):
+        self.calls += 1
+        return np.loadtxt(file_path, ndmin=2)
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "uv_curve.txt"
+    path.write_text("200 0.1 0.2\n300 0.5 0.6\n400 0.3 0.4\n")
+    return str(path)
+
+
+def test_hit_after_first_load(data_file):
+    loader = Loader()
+    first = cache.load(data_file, loader)
+    second = cache.load(data_file, loader)
+    assert loader.calls == 1
+    np.testing.assert_array_equal(first, second)
+
+
+def test_cached_data_is_read_only(data_file):
+    loader = Loader()
+    cache.load(data_file, loader)
+    data = cache.load(data_file, loader)
+    assert not data.flags.writeable
+    with pytest.raises(ValueError):
+        data[0, 0] = 1.0
+
+
+def test_hit_after_touch(data_file):
+    loader = Loader()
+    cache.load(data_file, loader)
+    # 修改时间变化但内容相同，通过内容的哈希值命中
+    stat = os.stat(data_file)
+    os.utime(data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    cache.load(data_file, loader)
+    assert loader.calls == 1
+
+
+def test_miss_after_content_change(data_file):
+    loader = Loader()
+    cache.load(data_file, loader)
+    with open(data_file, "a") as file:
+        file.write("500 0.0 0.1\n")
+    data = cache.load(data_file, loader)
+    assert loader.calls == 2
+    assert data.shape == (4, 3)
+
+
+def test_variants_are_separate(data_file):
+    loader = Loader()
+    cache.load(data_file, lambda path: loader(path)[:, :2], variant="columns=1")
+    second = cache.load(data_file, lambda path: loader(path)[:, [0, 2]], variant="columns=2")
+    assert loader.calls == 2
+    np.testing.assert_array_equal(second[:, 1], [0.2, 0.6, 0.4])
+    # 两个变体都已经缓存
+    first = cache.load(data_file, loader, variant="columns=1")
+    assert loader.calls == 2
+    np.testing.assert_array_equal(first[:, 1], [0.1, 0.5, 0.3])
+
+
+def test_disabled(data_file, monkeypatch):
+    loader = Loader()
+    monkeypatch.setenv("KIMARIDRAW_NO_CACHE", "1")
+    cache.load(data_file, loader)
+    cache.load(data_file, loader)
+    assert loader.calls == 2
+    assert not os.listdir(cache.cache_dir())
+
+
+def test_clear(data_file):
+    loader = Loader()
+    cache.load(data_file, loader)
+    cache.clear()
+    cache.load(data_file, loader)
+    assert loader.calls == 2
+
+
+def test_evict_oldest(tmp_path, data_file):
+    loader = Loader()
+    other = tmp_path / "ir_curve.txt"
+    other.write_text("1000 1.0\n2000 2.0\n")
+    cache.load(data_file, loader)
+    cache.load(str(other), loader)
+    entries = sorted(name for name in os.listdir(cache.cache_dir()) if name.endswith(".npy"))
+    assert len(entries) == 2
+
+    # 将第一个文件的缓存标记为较早使用，超过上限时先被删除，指向它的索引也一起删除
+    directory = cache.cache_dir()
+    first = os.path.join(directory, entries[0])
+    os.utime(first, (1, 1))
+    cache.evict(limit=os.path.getsize(os.path.join(directory, entries[1])))
+    remaining = [name for name in os.listdir(directory) if name.endswith(".npy")]
+    assert remaining == [entries[1]]
+    assert len([name for name in os.listdir(directory) if name.endswith(".key")]) == 1
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+test_config.py
+Tests of creating spectra from TOML configurations.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import copy
+import os
+
+import numpy as np
+import pytest
+
+from KimariDraw.kimaridraw import load_config, read_array, spectrum_from_config
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "example")
+
+
+def uv_with(columns):
+    config = copy.deepcopy(load_config(os.path.join(EXAMPLE, "uv.toml")))
+    config['curve']['columns'] = columns
+    return spectrum_from_config(config, EXAMPLE)
+
+
+@pytest.mark.parametrize("columns", [[3, 5], ["S0 to S5", "S0 to S13"]])
+def test_columns_select_legend_color_and_style(columns):
+    # 下标以及图例文本两种选择方式都按照相同的下标挑选图例、颜色以及样式
+    spectrum = uv_with(columns)
+    assert spectrum.legend_text == ["S0 to S5", "S0 to S13"]
+    assert spectrum.curve_colors == ["orange", "blue"]
+    assert spectrum.curve_style == ["--", "--"]
+    full = read_array(os.path.join(EXAMPLE, "uv_curve.txt"))
+    assert np.array_equal(spectrum.curve.y, full[:, [3, 5]])
+
+
+def test_columns_with_selected_options():
+    # 只列出被选择的曲线的属性按照选择之后的曲线排列
+    config = {'curve': {'path': 'uv_curve.txt', 'columns': [4], 'legend': ["S0 to S11"], 'color': "green"}}
+    spectrum = spectrum_from_config(config, EXAMPLE)
+    assert spectrum.legend_text == ["S0 to S11"]
+    assert spectrum.curve_colors == ["green"]
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+test_data.py
+Tests of the columnar containers and of sharing loaded data between spectra.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import os
+
+import numpy as np
+
+from KimariDraw.data import CurveData, LineData
+from KimariDraw.kimaridraw import read_array, read_path, spectrum_from_config
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "example")
+
+
+def test_versions_are_not_reused():
+    # 对象被回收之后 id 可能被新的对象使用，版本号不会
+    versions = set()
+    for _ in range(100):
+        versions.add(CurveData.from_array(np.ones((3, 2))).version)
+    assert len(versions) == 100
+
+
+def test_coerce_keeps_version():
+    line = LineData.from_array(np.ones((3, 2)))
+    assert LineData.coerce(line).version == line.version
+    assert CurveData.coerce(CurveData(line.x, line.y), "float32").version != line.version
+
+
+def test_loaded_data_is_shared():
+    # 参数相同的配置得到同一个 CurveData 以及 LineData 对象，展宽的结果也只计算一次
+    loaded = {}
+    for config in ({'curve': {'path': 'uv_curve.txt'}, 'line': {'path': 'uv_line.txt'}},
+                   {'line': {'path': 'uv_line.txt'}, 'broaden': {'fwhm': 0.5}}):
+        first = spectrum_from_config(config, EXAMPLE, loaded=loaded)
+        second = spectrum_from_config(config, EXAMPLE, loaded=loaded)
+        assert first.curve is second.curve and first.line is second.line
+    assert first.line is spectrum_from_config(config, EXAMPLE, loaded=loaded).line
+
+    other = spectrum_from_config({'line': {'path': 'uv_line.txt'}, 'broaden': {'fwhm': 0.3}}, EXAMPLE, loaded=loaded)
+    assert other.curve.version != first.curve.version
+
+
+def test_read_path_wraps_read_array():
+    # 内部使用的数组与对外接口返回的 DataFrame 内容相同
+    path = os.path.join(EXAMPLE, 'uv_line.txt')
+    array = read_array(path)
+    assert isinstance(array, np.ndarray)
+    assert np.array_equal(read_path(path).to_numpy(), array)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+test_ensemble.py
+Tests of reading the conformer files of an ensemble.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from KimariDraw.ensemble import ensemble_from_config
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "example")
+
+
+@pytest.fixture
+def conformers(tmp_path, monkeypatch):
+    monkeypatch.setenv("KIMARIDRAW_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("KIMARIDRAW_NO_CACHE", raising=False)
+    for i in range(3):
+        shutil.copy(os.path.join(EXAMPLE, "uv_curve.txt"), tmp_path / f"conf{i}.txt")
+    return tmp_path
+
+
+def cache_entries(folder):
+    cache = folder / "cache"
+    return sorted(os.listdir(cache)) if cache.exists() else []
+
+
+def test_members_bypass_cache(conformers):
+    # 默认不写入磁盘缓存，结果与 cache = true 时相同
+    config = {'files': "conf*.txt", 'energies': [0.0, 0.0, 0.0]}
+    curve, _ = ensemble_from_config(config, str(conformers))
+    assert cache_entries(conformers) == []
+
+    cached, _ = ensemble_from_config(dict(config, cache=True), str(conformers))
+    assert any(name.endswith(".npy") for name in cache_entries(conformers))
+    assert np.array_equal(curve, cached)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+test_grid.py
+Tests of reading multi-panel figure configurations.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import numpy as np
+import pytest
+
+from KimariDraw import grid
+from KimariDraw.data import CurveData
+from KimariDraw.grid import Grid, grid_from_config
+from KimariDraw.kimaridraw import Spectrum
+
+
+@pytest.mark.parametrize("config, key", [
+    ({'grid': {'colls': 2}, 'panels': [{'jobs': 'uv.toml'}]}, "'grid' configuration: colls"),
+    ({'panels': [{'jobs': 'uv.toml', 'titel': 'UV'}]}, "'panels' configuration: titel"),
+])
+def test_unknown_keys(config, key, tmp_path):
+    # 拼写错误的属性直接报错，而不是被忽略
+    with pytest.raises(ValueError, match=key):
+        grid_from_config(config, str(tmp_path))
+
+
+@pytest.fixture
+def figures(monkeypatch):
+    # 不依赖 proplot：坐标轴的 line 返回真实的 Line2D，记录每次创建的图片以及曲线
+    from contextlib import nullcontext
+    from unittest import mock
+
+    from matplotlib.lines import Line2D
+
+    created = []
+
+    def new_figure(figure_size, share=False, nrows=1, ncols=1):
+        lines = []
+        ax = mock.MagicMock()
+        ax.line.side_effect = lambda x, y, **kwargs: lines.append(Line2D(x, y, **kwargs)) or [lines[-1]]
+        created.append(lines)
+        return mock.MagicMock(), [ax]
+
+    monkeypatch.setattr(grid, "new_figure", new_figure)
+    monkeypatch.setattr(grid, "style_context", lambda *args: nullcontext())
+    return created
+
+
+def make_grid():
+    x = np.linspace(200, 400, 101)
+    primary = Spectrum(curveData=np.column_stack((x, np.sin(x / 20))), legend_text=["primary"], downsample=False)
+    overlay = Spectrum(curveData=np.column_stack((x, np.cos(x / 20))), legend_text=["overlay"], downsample=False)
+    return Grid([[primary, overlay]]), overlay
+
+
+def test_overlay_data_updated_in_place(figures):
+    panel_grid, overlay = make_grid()
+    panel_grid.prepare_figure(100)
+    overlay_curve = figures[0][0]
+
+    x = np.linspace(250, 350, 51)
+    overlay.curve = CurveData.coerce(np.column_stack((x, x / 100)))
+    panel_grid.prepare_figure(100)
+
+    # 没有重新创建图片，保留的叠加曲线得到新的数据
+    assert len(figures) == 1
+    np.testing.assert_array_equal(overlay_curve.get_xdata(), x)
+    np.testing.assert_array_equal(overlay_curve.get_ydata(), x / 100)
+
+
+def test_overlay_legend_change_rebuilds(figures):
+    panel_grid, overlay = make_grid()
+    panel_grid.prepare_figure(100)
+    overlay.legend_text = ["changed"]
+    panel_grid.prepare_figure(100)
+
+    assert len(figures) == 2
+    assert [curve.get_label() for curve in figures[1]] == ["changed", "primary"]
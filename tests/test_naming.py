@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+test_naming.py
+Tests of the allocation of output file names.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import os
+
+from KimariDraw.naming import claim
+
+
+def names(paths):
+    return [os.path.basename(path) for path in paths]
+
+
+def test_numbers_increase(tmp_path):
+    assert names(claim(str(tmp_path), "uv", ["png"])) == ["uv.png"]
+    assert names(claim(str(tmp_path), "uv", ["png"])) == ["uv_1.png"]
+    assert names(claim(str(tmp_path), "uv", ["png", "svg"])) == ["uv_2.png", "uv_2.svg"]
+
+
+def test_stems_ending_in_digits(tmp_path):
+    # GenData 生成的 conf1、conf12、conf13 互不影响，conf1 的编号不会占用 conf13 的文件名
+    for stem in ("conf1", "conf12", "conf13"):
+        claim(str(tmp_path), stem, ["png"])
+    assert names(claim(str(tmp_path), "conf1", ["png"])) == ["conf1_1.png"]
+    assert names(claim(str(tmp_path), "conf13", ["png"])) == ["conf13_1.png"]
+
+
+def test_overwrite(tmp_path):
+    (tmp_path / "uv.png").write_bytes(b"old")
+    assert names(claim(str(tmp_path), "uv", ["png"], overwrite=True)) == ["uv.png"]
+    assert (tmp_path / "uv.png").read_bytes() == b"old"
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+test_profiling.py
+Tests of the per-stage profiling of render jobs.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import json
+
+import pytest
+
+from KimariDraw import profiling
+
+
+def make_record(index, milliseconds, stages):
+    return {'job': f"job{index}.toml", 'ok': True, 'total': milliseconds / 1000, 'peak_mb': index / 10,
+            'stages': {name: {'time': milliseconds / 1000 / 2, 'calls': 1, 'peak_mb': 1.0} for name in stages}}
+
+
+def rows(summary):
+    # 表格中每一行的阶段名以及数值
+    table = {}
+    for line in summary.splitlines()[2:-1]:
+        name, *values = line.split()
+        table[name] = [float(value) for value in values]
+    return table
+
+
+def test_summary_percentiles():
+    report = profiling.Report()
+    for index in range(1, 101):
+        # 只有一半的任务有 save.svg 阶段
+        report.add(make_record(index, index, ['read', 'save.svg'] if index % 2 else ['read']))
+
+    summary = report.summary()
+    lines = summary.splitlines()
+    assert lines[0] == "Profile of 100 jobs:"
+    assert lines[1].split() == ["stage", "jobs", "p50", "ms", "p90", "ms", "p99", "ms", "max", "ms", "peak", "MB"]
+    assert lines[-1] == "Slowest job: job100.toml (100.0 ms)"
+
+    table = rows(summary)
+    assert list(table) == ["read", "save.svg", "total"]
+    # 1 ms 到 100 ms 线性插值的百分位数，表格中保留一位小数
+    assert table["total"] == pytest.approx([100, 50.5, 90.1, 99.01, 100.0, 10.0], abs=0.06)
+    assert table["read"] == pytest.approx([100, 25.25, 45.05, 49.505, 50.0, 1.0], abs=0.06)
+    assert table["save.svg"][0] == 50
+
+
+def test_summary_without_records():
+    assert profiling.Report().summary() == "No profiled jobs."
+
+
+def test_add_ignores_none_and_writes_jsonl(tmp_path):
+    path = tmp_path / "profile.jsonl"
+    report = profiling.Report(str(path))
+    report.add(None)
+    report.add(make_record(1, 5, ['read']))
+    assert len(report.records) == 1
+    assert [json.loads(line) for line in path.read_text().splitlines()] == report.records
+
+
+def test_job_records_stages(monkeypatch):
+    monkeypatch.setenv("KIMARIDRAW_PROFILE", "1")
+    monkeypatch.delenv("KIMARIDRAW_PROFILE_DIR", raising=False)
+    with profiling.job("uv.toml") as record:
+        for _ in range(3):
+            with profiling.stage('read'):
+                pass
+    assert record['job'] == "uv.toml" and record['ok']
+    assert record['stages']['read']['calls'] == 3
+    assert record['total'] >= record['stages']['read']['time']
+
+
+def test_job_disabled(monkeypatch):
+    monkeypatch.delenv("KIMARIDRAW_PROFILE", raising=False)
+    with profiling.job("uv.toml") as record:
+        with profiling.stage('read'):
+            pass
+    assert record is None
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+test_reader.py
+Tests of the Multiwfn text parser against Python's float().
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import os
+import re
+
+import numpy as np
+import pytest
+from hypothesis import given, settings, strategies as st
+
+from KimariDraw.reader import load_columns, load_txt, parse_txt
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "example")
+
+
+def reference(raw):
+    # 逐个使用 float() 解析，省略了 E 的 Fortran 指数先补上 E
+    rows = []
+    for line in raw.splitlines():
+        if line.strip():
+            rows.append([float(re.sub(rb"(?<=[0-9.])([+-]\d{2,3})$", rb"E\1", token.replace(b"D", b"E")))
+                         for token in line.split()])
+    return np.array(rows)
+
+
+@pytest.mark.parametrize("raw, expected", [
+    (b"0.10497539-286 1.0\n", [1.0497539e-287, 1.0]),
+    (b"0.30000000+002 3.0\n", [30.0, 3.0]),
+    (b"  0.10000000-280  0.20000000E-005\n  0.10100000-279  0.20100000E-005\n", [1e-281, 2e-6]),
+])
+def test_missing_exponent_letter(raw, expected):
+    # 数字之后的正负号是省略了 E 的指数，不是尾数的符号
+    assert parse_txt(raw)[0].tolist() == expected
+
+
+@pytest.mark.parametrize("name", ["uv_curve.txt", "uv_line.txt", "ecd_curve.txt", "ecd_line.txt"])
+def test_examples_match_float(name):
+    with open(os.path.join(EXAMPLE, name), "rb") as f:
+        raw = f.read()
+    assert np.array_equal(parse_txt(raw), reference(raw))
+
+
+@settings(max_examples=200, deadline=None)
+@given(st.lists(st.floats(allow_nan=False, allow_infinity=False), min_size=2, max_size=60),
+       st.sampled_from(["%17.8E", "%17.8D", "%15.6E", "%20.12E", "%14.5f"]))
+def test_fixed_width_matches_float(values, layout):
+    # 固定列宽的文件与 float() 的结果完全相同，包括次正规数以及很大的指数
+    text = "".join(
+        f"{index:8d} " + (layout.replace("D", "E") % value).replace("E", "D" if "D" in layout else "E") + "\n"
+        for index, value in enumerate(values)
+    ).encode()
+    assert np.array_equal(parse_txt(text), reference(text))
+
+
+@pytest.mark.parametrize("columns, xrange", [
+    ([0, 3, 5], None),
+    ([5, 2], [300.0, 150.0]),
+    (None, [100.0, 200.0]),
+    ([0, 1], [1e6, 2e6]),
+])
+@pytest.mark.parametrize("chunk_size", [97, 4096])
+def test_streaming_matches_full_load(columns, xrange, chunk_size):
+    # 分块读取的结果与读取整个文件之后再筛选的结果完全相同，包括块的边界落在一行中间的情况
+    path = os.path.join(EXAMPLE, "uv_curve.txt")
+    full = load_txt(path)
+    expected = full if columns is None else full[:, columns]
+    if xrange is not None:
+        low, high = sorted(xrange)
+        expected = expected[(full[:, 0] >= low) & (full[:, 0] <= high)]
+    result = load_columns(path, columns=columns, xrange=xrange, chunk_size=chunk_size)
+    assert result.flags.c_contiguous
+    assert np.array_equal(result, expected)
+
+
+@pytest.mark.parametrize("columns", [[0, 6], [0, -1]])
+def test_column_out_of_range(columns):
+    with pytest.raises(ValueError, match="Column indices"):
+        load_columns(os.path.join(EXAMPLE, "uv_curve.txt"), columns=columns, chunk_size=97)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+test_render.py
+Tests of the render API that encodes spectra in memory.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import io
+
+import numpy as np
+import pytest
+
+pytest.importorskip("proplot")
+
+from KimariDraw import Spectrum, render
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.fixture
+def spectrum():
+    x = np.linspace(200, 400, 201)
+    y = np.exp(-((x - 300) / 20) ** 2)
+    spectrum = Spectrum(curveData=np.column_stack((x, y)), title=None)
+    yield spectrum
+    spectrum.close()
+
+
+def test_render_returns_png(spectrum, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    image = render(spectrum, "png")
+    assert image.startswith(PNG_SIGNATURE)
+    # 不会在当前文件夹中创建文件，也不会打印任何信息
+    assert list(tmp_path.iterdir()) == []
+    assert capsys.readouterr().out == ""
+
+
+def test_render_into_target(spectrum, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    buffer = io.BytesIO()
+    assert render(spectrum, "png", target=buffer) is None
+    assert buffer.getvalue().startswith(PNG_SIGNATURE)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_render_again_after_change(spectrum):
+    # 保留的图片原地修改之后再次编码
+    first = render(spectrum, "png")
+    spectrum.title = "Changed"
+    second = render(spectrum, "png")
+    assert second.startswith(PNG_SIGNATURE)
+    assert second != first
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+test_server.py
+Tests of the serve subcommand that do not need a render backend.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import socket
+
+import pytest
+
+from KimariDraw.server import remove_stale_socket, serve_main
+
+unix = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets are not supported")
+
+
+@unix
+def test_stale_socket_is_removed(tmp_path):
+    path = tmp_path / "kimaridraw.sock"
+    server = socket.socket(socket.AF_UNIX)
+    server.bind(str(path))
+    server.close()
+
+    remove_stale_socket(str(path))
+    assert not path.exists()
+    # 不存在的路径什么也不做
+    remove_stale_socket(str(path))
+
+
+@unix
+def test_regular_file_is_kept(tmp_path):
+    path = tmp_path / "uv_curve.txt"
+    path.write_text("data")
+
+    with pytest.raises(FileExistsError):
+        remove_stale_socket(str(path))
+    assert serve_main(["--socket", str(path)]) == 2
+    assert path.read_text() == "data"
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+test_sweep.py
+Tests of the parameter sweeps declared in a [sweep] table.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import pytest
+
+from KimariDraw.sweep import expand, groups, name_fields, parameters, sweep_template, variant_config
+
+
+def test_groups_split_on_data_parameters():
+    # fwhm 影响展宽的数据，颜色只影响显示，同一个 fwhm 的组合共用数据
+    params, variants = expand({"broaden": {"fwhm": [0.2, 0.3]}, "curve": {"color": ["red", "blue"]}})
+    assert variants == [(0.2, "red"), (0.2, "blue"), (0.3, "red"), (0.3, "blue")]
+    assert groups(params, variants) == [[0, 1], [2, 3]]
+
+
+def test_groups_of_display_only_sweep():
+    # [spectrum] 中除 dtype 之外的属性只影响显示，全部组合为一组
+    params, variants = expand({"spectrum": {"x_limit": [[200, 400, 50], [300, 500, 50]], "width": [8, 10]}})
+    assert groups(params, variants) == [[0, 1, 2, 3]]
+
+
+def test_groups_split_on_dtype():
+    params, variants = expand({"spectrum": {"dtype": ["UV", "IR"], "width": [8, 10]}})
+    assert groups(params, variants) == [[0, 1], [2, 3]]
+
+
+def test_name_fields():
+    params = parameters({"broaden": {"fwhm": [0.30]}, "spectrum": {"x_limit": [[200, 400, 50]]}})
+    fields = name_fields(params, (0.30, [200, 400, 50]), 0)
+    assert fields == {
+        "broaden_fwhm": "0.3",
+        "fwhm": "0.3",
+        "spectrum_x_limit": "200-400-50",
+        "x_limit": "200-400-50",
+        "params": "fwhm0.3_x_limit200-400-50",
+        "index": "1",
+    }
+
+
+def test_name_fields_with_repeated_keys():
+    # 两个表中有同名的属性时只能使用表名加属性名
+    params = parameters({"curve": {"color": ["red"]}, "line": {"color": ["blue"]}})
+    fields = name_fields(params, ("red", "blue"), 2)
+    assert "color" not in fields
+    assert fields["curve_color"] == "red" and fields["line_color"] == "blue"
+    assert fields["params"] == "curve_colorred_line_colorblue"
+    assert fields["index"] == "3"
+
+
+def test_sweep_template():
+    fields = name_fields(parameters({"broaden": {"fwhm": [0.2]}}), (0.2,), 0)
+    assert sweep_template("{name}_{fwhm}", fields) == "{name}_{fwhm}"
+    assert sweep_template("{name}_{index}", fields) == "{name}_{index}"
+    # 没有引用扫描的字段时添加 _{params}，每个组合的文件名不同
+    assert sweep_template("{name}", fields) == "{name}_{params}"
+
+
+def test_variant_config_does_not_modify_input():
+    toml_data = {"broaden": {"fwhm": 0.2, "shape": "gaussian"}, "sweep": {"broaden": {"fwhm": [0.3]}}}
+    params = parameters(toml_data["sweep"])
+    config = variant_config(toml_data, params, (0.3,))
+    assert config == {"broaden": {"fwhm": 0.3, "shape": "gaussian"}}
+    assert toml_data["broaden"]["fwhm"] == 0.2
+
+
+@pytest.mark.parametrize("sweep", [
+    {},
+    {"colour": {"fwhm": [0.2]}},
+    {"broaden": [0.2]},
+    {"broaden": {"fwhm": []}},
+    {"broaden": {"fwhm": 0.2}},
+])
+def test_invalid_sweep(sweep):
+    with pytest.raises(ValueError):
+        parameters(sweep)
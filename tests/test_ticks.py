@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+test_ticks.py
+Property-based tests of the nice-number axis limits.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import math
+import warnings
+
+import numpy as np
+import pytest
+from hypothesis import given, settings, strategies as st
+
+from KimariDraw.ticks import DEFAULT_COUNT, as_limit, data_range, nice_limits, nice_step
+
+# 任意的有限值，包括次正规数以及接近 float64 上限的数
+finite = st.floats(allow_nan=False, allow_infinity=False)
+# nice_limits 不做截断的范围
+bounded = st.floats(min_value=-1e300, max_value=1e300, allow_nan=False, allow_infinity=False)
+padding = st.floats(min_value=0.0, max_value=1.0)
+
+
+def limits_of(low, high, **kwargs):
+    # 计算时不允许出现任何 RuntimeWarning
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        return nice_limits(low, high, **kwargs)
+
+
+def is_nice(step):
+    # 间距为 1、2 或者 5 乘以 10 的整数次幂
+    exponent = math.floor(math.log10(step))
+    return any(math.isclose(step, mantissa * 10.0 ** exponent, rel_tol=1e-9) for mantissa in (1, 2, 5, 10))
+
+
+@settings(max_examples=500)
+@given(finite, finite, padding)
+def test_limits_are_finite_and_ordered(a, b, pad):
+    lower, upper, step = limits_of(a, b, padding=pad)
+    assert np.isfinite([lower, upper, step]).all()
+    assert lower < upper
+    assert step > 0 and is_nice(step)
+
+
+@settings(max_examples=500)
+@given(bounded, bounded)
+def test_limits_contain_data(a, b):
+    lower, upper, step = limits_of(a, b)
+    slack = step * 1e-6
+    assert lower <= min(a, b) + slack
+    assert upper >= max(a, b) - slack
+
+
+@settings(max_examples=500)
+@given(bounded, bounded)
+def test_limits_are_multiples_of_step(a, b):
+    lower, upper, step = limits_of(a, b)
+    intervals = (upper - lower) / step
+    assert abs(intervals - round(intervals)) < 1e-6
+    assert 1 <= round(intervals) <= DEFAULT_COUNT + 2
+    for end in (lower, upper):
+        assert abs(end / step - round(end / step)) < 1e-6
+
+
+@settings(max_examples=300)
+@given(st.floats(min_value=0.0, max_value=1e300), st.floats(min_value=0.0, max_value=1e300), padding)
+def test_padding_does_not_cross_zero(a, b, pad):
+    # 只有正数的数据留白之后仍然从 0 以上开始，除非数据接近 0
+    lower, _, _ = limits_of(a, b, padding=pad)
+    if max(a, b) > 1e-280:
+        assert lower >= 0
+
+
+@settings(max_examples=200)
+@given(st.lists(st.tuples(finite, finite), min_size=1, max_size=8))
+def test_vectorized_matches_scalar(pairs):
+    low, high = np.array(pairs).T
+    vectorized = limits_of(low, high)
+    for i, (a, b) in enumerate(pairs):
+        assert np.array_equal(vectorized[i], limits_of(a, b))
+
+
+@settings(max_examples=300)
+@given(st.floats(min_value=1e-280, max_value=1e280), st.integers(min_value=1, max_value=20))
+def test_nice_step_is_smallest_nice_number(span, count):
+    mantissa, exponent = nice_step(span, count)
+    step = float(mantissa) * 10.0 ** int(exponent)
+    assert step * count >= span * (1 - 1e-9)
+    assert step / 2.5 * count < span * (1 + 1e-9)
+
+
+@pytest.mark.parametrize("a, b", [(0, 1e-320), (-5e-324, 5e-324), (1e-300, 1e300), (-1e308, 1e308), (0, 0)])
+def test_degenerate_ranges(a, b):
+    lower, upper, step = limits_of(a, b)
+    assert np.isfinite([lower, upper, step]).all() and lower < upper
+
+
+def test_missing_values():
+    assert limits_of(np.nan, np.inf).tolist() == [0.0, 1.0, 0.2]
+
+
+def test_small_magnitude():
+    # 振子强度这样的小数据得到合适的刻度，而不是间距 10
+    assert as_limit(limits_of(0.0, 1.2e-3)) == [0, 0.0015, 0.0005]
+
+
+def test_data_range_clips_tails():
+    column = np.concatenate(([1e-287], np.linspace(1.0, 2.0, 998), [1e6]))
+    low, high = data_range(column[:, None], percentile=0.5)
+    assert 1.0 <= low[0] and high[0] <= 2.0
+    low, high = data_range(np.array([[np.nan, 1.0], [np.inf, 3.0]]))
+    assert np.isnan(low[0]) and low[1] == 1.0 and high[1] == 3.0
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+test_units.py
+Tests of converting spectra between nm, eV and cm^-1.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import itertools
+
+import numpy as np
+import pytest
+
+from KimariDraw import units
+
+PAIRS = list(itertools.permutations(units.UNITS, 2))
+
+
+def trapezoid(x, y):
+    return float(np.sum((y[1:] + y[:-1]) * np.diff(x)) / 2)
+
+
+@pytest.mark.parametrize("from_unit, to_unit", PAIRS)
+def test_round_trip(from_unit, to_unit):
+    # 每一对单位之间来回转换之后回到原来的值，nm、eV、cm^-1 三者首尾相接也回到原来的值
+    values = units.convert(np.linspace(150.0, 600.0, 50), "nm", from_unit)
+    back = units.convert(units.convert(values, from_unit, to_unit), to_unit, from_unit)
+    assert np.allclose(back, values, rtol=1e-12)
+    third, = set(units.UNITS) - {from_unit, to_unit}
+    chained = units.convert(units.convert(units.convert(values, from_unit, to_unit), to_unit, third), third,
+                            from_unit)
+    assert np.allclose(chained, values, rtol=1e-12)
+
+
+def test_known_values():
+    assert units.convert(1239.84198, "nm", "eV") == pytest.approx(1.0)
+    assert units.convert(1.0, "eV", "cm-1") == pytest.approx(8065.54394, rel=1e-8)
+    assert units.convert(500.0, "nm", "cm^-1") == pytest.approx(20000.0)
+    with pytest.raises(ValueError):
+        units.normalize_unit("Hz")
+
+
+@pytest.mark.parametrize("from_unit, to_unit", PAIRS)
+def test_transforms_are_inverse(from_unit, to_unit):
+    forward, backward = units.transforms(from_unit, to_unit)
+    values = units.convert(np.array([200.0, 350.0, 480.0]), "nm", from_unit)
+    assert np.allclose(forward(values), units.convert(values, from_unit, to_unit))
+    assert np.allclose(backward(forward(values)), values, rtol=1e-12)
+
+
+@pytest.mark.parametrize("from_unit, to_unit", PAIRS)
+def test_jacobian_preserves_integral(from_unit, to_unit):
+    # 单位区间内的强度乘以雅可比系数之后，曲线下的面积不变
+    x = units.convert(np.linspace(200.0, 400.0, 20001), "nm", from_unit)
+    x = np.sort(x)
+    center, width = x[x.size // 2], (x[-1] - x[0]) / 20
+    y = np.exp(-((x - center) / width) ** 2)
+    curve = np.column_stack((x, y, 2 * y))
+
+    converted = units.Conversion(from_unit, to_unit, jacobian=True, resample=False).curve(curve)
+    assert np.all(np.diff(converted[:, 0]) > 0)
+    for column in (1, 2):
+        assert trapezoid(converted[:, 0], converted[:, column]) == pytest.approx(
+            trapezoid(x, curve[:, column]), rel=1e-4)
+
+
+def test_without_jacobian_keeps_heights():
+    curve = np.column_stack((np.linspace(200.0, 400.0, 101), np.linspace(0.0, 1.0, 101)))
+    converted = units.Conversion("nm", "eV", resample=False).curve(curve)
+    assert np.array_equal(converted[:, 1], curve[::-1, 1])
+
+
+def test_sticks_move_and_keep_strength():
+    # 直线只转换位置，强度不变，无法转换的 0 nm 被去掉
+    line = np.array([[0.0, 0.5], [250.0, 0.1], [500.0, 0.3]])
+    converted = units.Conversion("nm", "eV").line(line)
+    assert np.allclose(converted[:, 0], [1239.84198 / 250.0, 1239.84198 / 500.0])
+    assert np.array_equal(converted[:, 1], [0.1, 0.3])
+    assert line[1, 0] == 250.0
+
+
+@pytest.mark.parametrize("points", [None, 7, 1000])
+def test_resample_is_uniform(points):
+    x = np.sort(np.random.default_rng(0).uniform(1.0, 10.0, 200))
+    ys = np.column_stack((3 * x + 1, -x))
+    grid, values = units.resample(x, ys, points)
+    assert grid.size == (x.size if points is None else points)
+    assert np.allclose(np.diff(grid), (x[-1] - x[0]) / (grid.size - 1))
+    assert grid[0] == x[0] and grid[-1] == x[-1]
+    # 线性的数据插值之后完全不变，与逐列 np.interp 的结果相同
+    assert np.allclose(values, np.column_stack((3 * grid + 1, -grid)))
+    for i in range(ys.shape[1]):
+        assert np.allclose(values[:, i], np.interp(grid, x, ys[:, i]))
+    with pytest.raises(ValueError):
+        units.resample(x, ys, 1)
+
+
+def test_curve_resampled_onto_uniform_grid():
+    curve = np.column_stack((np.linspace(200.0, 400.0, 300), np.linspace(1.0, 2.0, 300)))
+    converted = units.Conversion("nm", "cm-1", points=128).curve(curve)
+    assert converted.shape == (128, 2)
+    assert np.allclose(np.diff(converted[:, 0]), np.diff(converted[:, 0])[0])
+    assert converted[0, 0] == pytest.approx(1e7 / 400.0) and converted[-1, 0] == pytest.approx(1e7 / 200.0)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+test_watch.py
+Tests of the order of watching and rendering in watch mode, and of the files that re-renders overwrite.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+from KimariDraw import batch, naming, watch
+
+
+class RecordingWatcher(watch.PollingWatcher):
+    # 记录调用的顺序，每次等待都报告 toml 文件发生了变化，绘制 passes 次之后相当于按下 Ctrl+C
+    def __init__(self, events, passes=2):
+        super().__init__(interval=0.01)
+        self.events = events
+        self.passes = passes
+
+    def watch(self, files, directories=()):
+        self.events.append(('watch', sorted(files)))
+        super().watch(files, directories)
+
+    def wait(self, timeout=None):
+        if sum(event[0] == 'render' for event in self.events) >= self.passes:
+            raise KeyboardInterrupt
+        return {path for path in self.files if path.endswith('.toml')} if timeout is None else set()
+
+
+def test_watch_before_first_render(tmp_path, monkeypatch):
+    toml_file = tmp_path / "uv.toml"
+    toml_file.write_text("[curve]\npath = 'uv_curve.txt'\n")
+    events = []
+    monkeypatch.setattr(watch, 'make_watcher', lambda polling=False: RecordingWatcher(events))
+    monkeypatch.setattr(watch, 'render_batch', lambda jobs, **kwargs: events.append(('render', kwargs)))
+
+    assert watch.watch([str(toml_file)], workers=1) == 0
+    # 第一次绘制之前已经开始监视，每次绘制都使用 toml 文件中的 overwrite 设置
+    assert [event[0] for event in events] == ['watch', 'render', 'watch', 'render']
+    assert events[0][1] == sorted([str(toml_file), str(tmp_path / "uv_curve.txt")])
+    assert all(event[1].get('overwrite') is None for event in events if event[0] == 'render')
+
+
+def test_rerender_overwrites_first_output(tmp_path, monkeypatch):
+    # 已经存在 uv.png 时第一次保存为 uv_1.png，之后的重新绘制覆盖 uv_1.png，不会覆盖已有的 uv.png
+    toml_file = tmp_path / "uv.toml"
+    toml_file.write_text("[curve]\npath = 'uv_curve.txt'\n")
+    (tmp_path / "uv.png").write_text("user")
+    events = []
+
+    def render_job(toml_file, save_dir, overwrite=None, variants=None):
+        count = sum(event[0] == 'render' for event in events)
+        events.append(('render', None))
+        path, = naming.claim(save_dir, "uv", ["png"], overwrite=bool(overwrite))
+        with open(path, "w") as f:
+            f.write(f"pass {count}")
+        return path
+
+    monkeypatch.setattr(watch, 'make_watcher', lambda polling=False: RecordingWatcher(events, passes=3))
+    monkeypatch.setattr(batch, 'render_job', render_job)
+
+    assert watch.watch([str(toml_file)], workers=1, save_dir=str(tmp_path)) == 0
+    assert (tmp_path / "uv.png").read_text() == "user"
+    assert (tmp_path / "uv_1.png").read_text() == "pass 2"
+    assert not (tmp_path / "uv_2.png").exists()
+
+
+def test_ledger_keeps_order_of_equal_stems(tmp_path):
+    # 同一个任务中文件名相同的多次保存，重新绘制时各自覆盖上一次对应的文件
+    with naming.reuse() as first:
+        paths = [naming.claim(str(tmp_path), "uv", ["png"])[0] for _ in range(2)]
+    with naming.reuse(first):
+        assert [naming.claim(str(tmp_path), "uv", ["png"])[0] for _ in range(3)] == paths + [
+            str(tmp_path / "uv_2.png")]
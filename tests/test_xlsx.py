@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+test_xlsx.py
+Tests of reading numeric tables from Excel files, the XML fast path against openpyxl.
+
+This file is part of KimariDraw.
+KimariDraw is a Python script that processes Multiwfn spectral data and plots various spectra.
+
+@author:
+Kimariyb (kimariyb@163.com)
+
+@license:
+Licensed under the MIT License.
+For details, see the LICENSE file.
+
+@Data:
+2023-09-01
+"""
+import zipfile
+
+import numpy as np
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from KimariDraw.xlsx import _find_sheet, _read_openpyxl, _read_regular, load_xlsx, parse_range  # noqa: E402
+
+ROWS = 300
+
+
+def table(columns=3):
+    # 第一列为 x，其余列为不同量级的 y，包括整数以及很小、很大的数
+    x = np.linspace(200.0, 500.0, ROWS)
+    ys = [np.sin(x / (i + 3)) * 10.0 ** (4 * i - 6) for i in range(columns - 1)]
+    data = np.column_stack([x] + ys)
+    data[::7, 1] = np.round(data[::7, 1] * 1e6)
+    # openpyxl 写入时只保留有限的有效数字，保留 10 位使得写入再读取之后完全相同
+    return np.vectorize(lambda value: float(f"{value:.10g}"))(data)
+
+
+def write(path, sheets):
+    # sheets 为 (表格的名字, 行的列表)，行中的 None 为空单元格
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for name, rows in sheets:
+        worksheet = workbook.create_sheet(name)
+        for row in rows:
+            worksheet.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    data = table()
+    rows = [["x", "y1", "y2"]] + data.tolist()
+    other = [["energy", "intensity"]] + (data[:, :2] * 2).tolist()
+    return write(tmp_path / "spectra.xlsx", [("Data", rows), ("Other", other)]), data
+
+
+@pytest.mark.parametrize("cells", [None, "A2:C", "B:C", "A3:B10", "B5", "A1:C40"])
+@pytest.mark.parametrize("chunk_size", [512, 1 << 20])
+def test_fast_path_matches_openpyxl(workbook, cells, chunk_size):
+    # 按行分块解析 XML 的结果与 openpyxl 逐个单元格读取的结果完全相同
+    path, _ = workbook
+    bounds = parse_range(cells)
+    with zipfile.ZipFile(path) as archive:
+        member, name = _find_sheet(archive, "Data")
+        fast = _read_regular(archive, member, bounds, chunk_size)
+    assert np.array_equal(fast, _read_openpyxl(path, name, bounds))
+
+
+def test_ranges(workbook):
+    path, data = workbook
+    assert np.array_equal(load_xlsx(path), data)
+    # 从第二行开始，第一行的表头不在范围内
+    assert np.array_equal(load_xlsx(path, cells="A2:C"), data)
+    assert np.array_equal(load_xlsx(path, cells="B:C"), data[:, 1:])
+    assert np.array_equal(load_xlsx(path, cells="A3:B10"), data[1:9, :2])
+
+
+def test_sheet_by_name_and_index(workbook):
+    path, data = workbook
+    assert np.array_equal(load_xlsx(path, sheet="Other"), data[:, :2] * 2)
+    assert np.array_equal(load_xlsx(path, sheet=1), load_xlsx(path, sheet="Other"))
+    assert np.array_equal(load_xlsx(path, sheet=0), data)
+    with pytest.raises(ValueError, match="not found"):
+        load_xlsx(path, sheet="Missing")
+    with pytest.raises(ValueError, match="out of range"):
+        load_xlsx(path, sheet=2)
+
+
+def test_columns_and_xrange(workbook):
+    path, data = workbook
+    result = load_xlsx(path, columns=[0, 2], xrange=[400.0, 300.0])
+    expected = data[(data[:, 0] >= 300.0) & (data[:, 0] <= 400.0)][:, [0, 2]]
+    assert result.flags.c_contiguous and np.array_equal(result, expected)
+
+
+def test_empty_cell(tmp_path):
+    # 有空单元格的表格交给 openpyxl 读取，空单元格为 NaN
+    data = table()
+    rows = [["x", "y1", "y2"]] + data.tolist()
+    rows[10][2] = None
+    path = write(tmp_path / "gap.xlsx", [("Sheet1", rows)])
+    result = load_xlsx(path)
+    assert np.isnan(result[9, 2])
+    mask = np.ones(data.shape, dtype=bool)
+    mask[9, 2] = False
+    assert np.array_equal(result[mask], data[mask])
+
+
+def test_text_after_data(tmp_path):
+    # 表头之后出现文字时报错，而不是把这一行当作表头跳过
+    rows = [["x", "y"]] + table(2).tolist() + [["total", 1.0]]
+    path = write(tmp_path / "text.xlsx", [("Sheet1", rows)])
+    with pytest.raises(ValueError, match="non-numeric value in row"):
+        load_xlsx(path)